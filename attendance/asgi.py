@@ -3,6 +3,9 @@ ASGI config for attendance project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve it with any ASGI server, e.g. ``uvicorn attendance.asgi:application``.
+The dashboard and check-in pages are routed to their async views here.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -12,5 +15,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'attendance.settings')
+os.environ.setdefault('ATTENDANCE_ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
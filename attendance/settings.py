@@ -47,14 +47,19 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'employees',
+    'worktrack',
 ]
 
 MIDDLEWARE = [
+    'employees.instrumentation.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'employees.staticfiles.StaticFilesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'employees.middleware.SlidingSessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'employees.middleware.EmployeeMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -63,7 +68,9 @@ ROOT_URLCONF = 'attendance.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates with per-request render timing
+        'BACKEND': 'employees.instrumentation.TimedTemplates',
+        'NAME': 'django',
         'DIRS': [BASE_DIR / 'templates'],  # THIS LINE MUST BE HERE
         'APP_DIRS': True,
         'OPTIONS': {
@@ -79,16 +86,64 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'attendance.wsgi.application'
 
+# Route the dashboard and check-in pages to their async views (asgi.py turns
+# this on; under WSGI the sync views avoid an event loop per request)
+ATTENDANCE_ASYNC_VIEWS = os.environ.get('ATTENDANCE_ASYNC_VIEWS', '0') == '1'
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
+# The backend is chosen with DATABASE: 'sqlite' (default, for development) or
+# 'postgres' (needs psycopg[pool]). PostgreSQL uses Django's native pool unless
+# DB_POOL=0, in which case connections persist for DB_CONN_MAX_AGE seconds.
+DB_POOL = os.environ.get('DB_POOL', '1') == '1'
+DATABASE_BACKENDS = {
+    'sqlite': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
+        'OPTIONS': {
+            # Take the write lock at BEGIN so busy_timeout applies instead of
+            # failing with "database is locked" when a read upgrades to a write
+            'transaction_mode': 'IMMEDIATE',
+        },
+    },
+    'postgres': {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ.get('DB_NAME', 'attendance'),
+        'USER': os.environ.get('DB_USER', 'attendance'),
+        'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+        'HOST': os.environ.get('DB_HOST', '127.0.0.1'),
+        'PORT': os.environ.get('DB_PORT', '5432'),
+        'CONN_MAX_AGE': 0 if DB_POOL else int(os.environ.get('DB_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'pool': {
+                'min_size': int(os.environ.get('DB_POOL_MIN', '2')),
+                'max_size': int(os.environ.get('DB_POOL_MAX', '10')),
+                'timeout': 10,
+            },
+        } if DB_POOL else {},
+    },
+}
+
+DATABASES = {
+    'default': DATABASE_BACKENDS[os.environ.get('DATABASE', 'sqlite')],
+}
+
+# PRAGMAs applied to every new SQLite connection (see employees/sqlite.py).
+# journal_mode is written into the database file itself, so WAL is only
+# switched on with SQLITE_WAL=1 (the default when DB_NAME names a database),
+# never implicitly for the db.sqlite3 checked into the repository.
+SQLITE_PRAGMAS = {
+    'busy_timeout': 20000,
+    'temp_store': 'MEMORY',
 }
+if os.environ.get('SQLITE_WAL', '1' if 'DB_NAME' in os.environ else '0') == '1':
+    SQLITE_PRAGMAS.update({
+        'journal_mode': 'WAL',  # readers no longer block the writer
+        'synchronous': 'NORMAL',  # safe with WAL, fsyncs only at checkpoints
+    })
 
 
 # Password validation
@@ -127,6 +182,19 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+# collectstatic writes content-hashed names plus gzip/brotli variants, which
+# employees.staticfiles.StaticFilesMiddleware serves with immutable caching.
+# Files without a hash in their name are cached for STATIC_FALLBACK_MAX_AGE.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'employees.staticfiles.CompressedManifestStaticFilesStorage',
+    },
+}
+STATIC_FALLBACK_MAX_AGE = 60
 
 LOGIN_REDIRECT_URL = 'dashboard'
 LOGOUT_REDIRECT_URL = 'login'
@@ -135,22 +203,120 @@ LOGIN_URL = 'login'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Threads generating profile picture thumbnails in the background
+THUMBNAIL_WORKERS = 2
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
-# Session settings
+# Session settings. The session store is chosen with SESSION_STORE: 'db'
+# (default), 'cached_db' (reads served from the default cache; only use it
+# with a cache shared by every process) or 'signed_cookies' (nothing stored
+# server side, so a logout can't revoke a copied cookie).
+SESSION_BACKENDS = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+SESSION_ENGINE = SESSION_BACKENDS[os.environ.get('SESSION_STORE', 'db')]
 SESSION_COOKIE_AGE = 1209600  # 2 weeks in seconds
-SESSION_SAVE_EVERY_REQUEST = True
 SESSION_EXPIRE_AT_BROWSER_CLOSE = False
-
-# Authentication backends
+# Sliding expiry (employees.middleware.SlidingSessionMiddleware): an active
+# session's expiry is pushed forward at most once per SESSION_REFRESH_AFTER
+# seconds, instead of saving the session on every request
+SESSION_SAVE_EVERY_REQUEST = False
+SESSION_REFRESH_AFTER = 24 * 60 * 60
+
+# Authentication backends. ModelBackend stays listed so sessions created
+# before EmployeeBackend existed (which store its path) remain valid.
 AUTHENTICATION_BACKENDS = [
+    'employees.backends.EmployeeBackend',
     'django.contrib.auth.backends.ModelBackend',
 ]
 
+# Default working hours for employees with no Shift assigned
+ATTENDANCE_SHIFT_START = '09:00'
+ATTENDANCE_SHIFT_END = '17:00'
+ATTENDANCE_LATE_GRACE_MINUTES = 10
+ATTENDANCE_STANDARD_DAY_MINUTES = 8 * 60
+
+# Caches. The dashboard fragment cache backend is chosen with DASHBOARD_CACHE:
+# 'locmem' (default, per process), 'file' (shared on one host) or 'redis'.
+DASHBOARD_CACHE_ALIAS = 'dashboard'
+DASHBOARD_CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'dashboard',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('DASHBOARD_CACHE_DIR', str(BASE_DIR / 'cache' / 'dashboard')),
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/1'),
+    },
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    DASHBOARD_CACHE_ALIAS: {
+        **DASHBOARD_CACHE_BACKENDS[os.environ.get('DASHBOARD_CACHE', 'locmem')],
+        'TIMEOUT': 60 * 60,  # entries are invalidated on change, this only bounds staleness
+    },
+}
+
+# Request metrics (employees/instrumentation.py). /metrics/ is readable by
+# staff and by scrapers sending "Authorization: Bearer <METRICS_TOKEN>" (no
+# token, no scraping). METRICS_ALLOWED_IPS (comma separated) also lets those
+# addresses in, but it checks REMOTE_ADDR: behind a reverse proxy on the same
+# host every request comes from 127.0.0.1, so never list loopback there.
+# Server-Timing headers are added when enabled.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+METRICS_ALLOWED_IPS = [ip for ip in os.environ.get('METRICS_ALLOWED_IPS', '').split(',') if ip]
+METRICS_SERVER_TIMING = os.environ.get('METRICS_SERVER_TIMING', '1' if DEBUG else '0') == '1'
+METRICS_SLOW_REQUEST_MS = 500
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'keyvalue': {
+            'format': 'time=%(asctime)s level=%(levelname)s logger=%(name)s %(message)s',
+        },
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'keyvalue',
+        },
+    },
+    'loggers': {
+        'employees': {
+            'handlers': ['console'],
+            'level': os.environ.get('ATTENDANCE_LOG_LEVEL', 'INFO'),
+        },
+    },
+}
+
+# Badge gateway API (POST /api/attendance/events/); disabled while the token is empty
+ATTENDANCE_API_TOKEN = os.environ.get('ATTENDANCE_API_TOKEN', '')
+ATTENDANCE_API_MAX_EVENTS = 5000
+
+# Work time tracking (worktrack). Clients post timer events in batches
+# (POST /worktrack/events/); rollup_work folds them into daily totals.
+WORKTRACK_MAX_EVENTS = 1000
+# A running timer with no events for this long is credited no further
+WORKTRACK_IDLE_TIMEOUT = 15 * 60
+WORKTRACK_ROLLUP_BATCH = 5000
+# Events younger than this are left for the next rollup (see worktrack/rollup.py)
+WORKTRACK_ROLLUP_SETTLE_SECONDS = 5
+
 # CSRF settings
 CSRF_TRUSTED_ORIGINS = ['http://localhost:8000', 'http://127.0.0.1:8000']
 
@@ -5,22 +5,43 @@ from django.shortcuts import redirect
 from django.conf import settings
 from django.conf.urls.static import static
 from employees import views
+from worktrack import views as worktrack_views
 
 def home(request):
     return redirect('login')
 
+# Under ASGI the busiest pages are served by their async versions
+if settings.ATTENDANCE_ASYNC_VIEWS:
+    dashboard_view, mark_attendance_view = views.adashboard, views.amark_attendance
+else:
+    dashboard_view, mark_attendance_view = views.dashboard, views.mark_attendance
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', home, name='home'),
     path('login/', views.custom_login, name='login'),
     path('logout/', views.custom_logout, name='logout'),
     path('register/', views.register, name='register'),
-    path('dashboard/', views.dashboard, name='dashboard'),
-    path('mark-attendance/', views.mark_attendance, name='mark_attendance'),
+    path('dashboard/', dashboard_view, name='dashboard'),
+    path('mark-attendance/', mark_attendance_view, name='mark_attendance'),
     path('attendance-history/', views.attendance_history, name='attendance_history'),
     path('profile/', views.profile, name='profile'),
+    path('reports/department/', views.department_report, name='department_report'),
+    path('reports/timesheets/', views.timesheets, name='timesheets'),
+    path('export/attendance/', views.export_attendance, name='export_attendance'),
+    path('metrics/cache/', views.cache_stats, name='cache_stats'),
+    path('metrics/', views.metrics, name='metrics'),
+    path('api/attendance/events/', views.attendance_events_api, name='attendance_events_api'),
+    path('worktrack/events/', worktrack_views.work_events, name='work_events'),
+    path('worktrack/totals/', worktrack_views.work_totals, name='work_totals'),
+    path('reports/work/', worktrack_views.project_totals, name='project_totals'),
 ]
 
-# Add media URLs in development
+# Add media URLs in development. In production the web server serves
+# MEDIA_ROOT itself, with "Cache-Control: public, max-age=31536000, immutable"
+# for thumbs/ (thumbnail names change whenever the picture does).
 if settings.DEBUG:
+    urlpatterns += [
+        path(f"{settings.MEDIA_URL.lstrip('/')}thumbs/<path:path>", views.thumbnail, name='thumbnail'),
+    ]
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
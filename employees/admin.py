@@ -1,7 +1,16 @@
-from django.contrib import admin
+from collections import Counter
+from datetime import date
+
+from django.contrib import admin, messages
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.models import User
-from .models import Employee, Department, Attendance
+from django.db import transaction
+from django.db.models import Max, Min
+
+from . import dashboard_cache
+from .exports import month_range
+from .models import Employee, Department, Attendance, AttendanceSummary, Shift, worked_minutes_expression
+from .pagination import EstimatedCountPaginator
 
 class EmployeeInline(admin.StackedInline):
     model = Employee
@@ -11,27 +20,129 @@ class EmployeeInline(admin.StackedInline):
 class CustomUserAdmin(UserAdmin):
     inlines = (EmployeeInline,)
     list_display = ('username', 'email', 'first_name', 'last_name', 'get_employee_id', 'get_department', 'is_staff')
+    # Profiles and departments come in the same query as the users
+    list_select_related = ('employee__department',)
     
+    @admin.display(description='Employee ID', ordering='employee__employee_id')
     def get_employee_id(self, obj):
-        return obj.employee.employee_id
-    get_employee_id.short_description = 'Employee ID'
+        try:
+            return obj.employee.employee_id
+        except Employee.DoesNotExist:
+            return None
     
+    @admin.display(description='Department', ordering='employee__department__name')
     def get_department(self, obj):
-        return obj.employee.department
-    get_department.short_description = 'Department'
+        try:
+            return obj.employee.department
+        except Employee.DoesNotExist:
+            return None
+
+@admin.register(Shift)
+class ShiftAdmin(admin.ModelAdmin):
+    list_display = ('name', 'start_time', 'end_time', 'grace_minutes')
+    search_fields = ('name',)
 
 @admin.register(Department)
 class DepartmentAdmin(admin.ModelAdmin):
-    list_display = ('name', 'description')
+    list_display = ('name', 'description', 'shift')
+    list_select_related = ('shift',)
     search_fields = ('name',)
 
+class MonthListFilter(admin.SimpleListFilter):
+    """
+    Month drill-down for large tables. The choices come from the first and
+    last dates (two index lookups) rather than a DISTINCT over every row.
+    """
+    title = 'month'
+    parameter_name = 'month'
+    
+    def lookups(self, request, model_admin):
+        bounds = model_admin.get_queryset(request).aggregate(first=Min('date'), last=Max('date'))
+        if not bounds['first']:
+            return []
+        months = []
+        year, month = bounds['last'].year, bounds['last'].month
+        while (year, month) >= (bounds['first'].year, bounds['first'].month):
+            months.append((f"{year}-{month:02d}", date(year, month, 1).strftime('%B %Y')))
+            year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+        return months
+    
+    def queryset(self, request, queryset):
+        if not self.value():
+            return queryset
+        try:
+            start, end = month_range(self.value())
+        except ValueError:
+            return queryset.none()
+        return queryset.filter(date__range=(start, end))
+
 @admin.register(Attendance)
 class AttendanceAdmin(admin.ModelAdmin):
-    list_display = ('employee', 'date', 'check_in', 'check_out', 'status')
-    list_filter = ('date', 'status', 'employee__department')
+    list_display = ('employee_name', 'employee_code', 'department_name', 'date', 'check_in', 'check_out', 'status')
+    list_filter = (MonthListFilter, 'date', 'status', 'employee__department')
     search_fields = ('employee__user__first_name', 'employee__user__last_name', 'employee__employee_id')
-    date_hierarchy = 'date'
+    actions = ('mark_absent', 'mark_late', 'set_check_out')
+    # Large table: no unfiltered COUNT(*) next to the filtered one, and counts are capped
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+    
+    # The row checkbox labels use str(record), which needs the employee and user too
+    list_select_related = ('employee__user', 'employee__department')
+    
+    @admin.display(description='Employee', ordering='employee__user__first_name')
+    def employee_name(self, obj):
+        return obj.employee.user.get_full_name()
+    
+    @admin.display(description='Employee ID', ordering='employee__employee_id')
+    def employee_code(self, obj):
+        return obj.employee.employee_id
+    
+    @admin.display(description='Department', ordering='employee__department__name')
+    def department_name(self, obj):
+        return obj.employee.department
+    
+    def _set_status(self, request, queryset, status):
+        """Move the selected records to a status with one UPDATE, keeping summaries in step"""
+        with transaction.atomic():
+            changing = queryset.exclude(status=status)
+            # Lock and read the old statuses first; the update itself stays one statement
+            rows = list(changing.select_for_update().values_list('employee_id', 'date', 'status'))
+            fields = {'status': status}
+            if status == 'ABSENT':
+                # An absent day has no times or worked hours to show
+                fields.update(check_in=None, check_out=None, worked_minutes=None)
+            updated = changing.update(**fields)
+            deltas = Counter()
+            for employee_id, day, old_status in rows:
+                deltas[(employee_id, day, old_status)] -= 1
+                deltas[(employee_id, day, status)] += 1
+            AttendanceSummary.objects.apply_deltas(deltas)
+        dashboard_cache.invalidate(*{employee_id for employee_id, _, _ in rows})
+        self.message_user(request, f"{updated} record(s) marked {status.replace('_', ' ').lower()}.", messages.SUCCESS)
+    
+    @admin.action(description='Mark selected records as absent')
+    def mark_absent(self, request, queryset):
+        self._set_status(request, queryset, 'ABSENT')
+    
+    @admin.action(description='Mark selected records as late')
+    def mark_late(self, request, queryset):
+        self._set_status(request, queryset, 'LATE')
+    
+    @admin.action(description="Set check-out to the shift end (where missing)")
+    def set_check_out(self, request, queryset):
+        missing = queryset.filter(check_in__isnull=False, check_out__isnull=True)
+        employee_ids = set(missing.values_list('employee_id', flat=True))
+        updated = 0
+        with transaction.atomic():
+            # One UPDATE per shift rather than one per record
+            for shift, assigned in Shift.objects.assignments():
+                updated += Attendance.objects.filter(pk__in=missing.filter(assigned).values('pk')).update(
+                    check_out=shift.end_time,
+                    worked_minutes=worked_minutes_expression(check_out=shift.end_time),
+                )
+        dashboard_cache.invalidate(*employee_ids)
+        self.message_user(request, f"Set check-out on {updated} record(s).", messages.SUCCESS)
 
 # Re-register UserAdmin
 admin.site.unregister(User)
-admin.site.register(User, CustomUserAdmin)
\ No newline at end of file
+admin.site.register(User, CustomUserAdmin)
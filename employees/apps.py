@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class EmployeesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'employees'
+
+    def ready(self):
+        # Connect the connection_created and archive receivers
+        from . import archive, instrumentation, sqlite  # noqa: F401
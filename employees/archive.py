@@ -0,0 +1,167 @@
+"""
+Attendance archiving.
+
+Records older than a cutoff month are moved out of Attendance into one table
+per year, employees_attendance_archive_<year>, so the live table (and its
+indexes) only hold recent months. Each table has the same columns as
+Attendance, keeps the original ids and is indexed on (employee_id, date).
+The tables aren't known to migrations: their models are built on demand in a
+registry of their own, and ArchivedYear lists the years that exist.
+
+Moving doesn't touch AttendanceSummary, so counters keep covering archived
+days, and Attendance refuses new records dated before the archived cutoff
+(they would be counted twice). Readers that need old records (attendance
+history, exports) ask archive_querysets() for the tables their date range
+reaches.
+"""
+import threading
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.apps.registry import Apps
+from django.db import connections, models, transaction
+from django.db.models import Min
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from . import dashboard_cache
+from .models import ArchivedYear, Attendance, AttendanceQuerySet, Employee
+
+ARCHIVE_CHUNK_SIZE = 2000
+
+FIELDS = ('id', 'employee_id', 'date', 'check_in', 'check_out', 'status', 'notes', 'worked_minutes')
+
+_apps = Apps(installed_apps=())
+_models = {}
+_lock = threading.Lock()
+
+
+def archive_model(year):
+    """The (unmanaged) model for a year's archive table"""
+    with _lock:
+        model = _models.get(year)
+        if model is None:
+            meta = type('Meta', (), {
+                'apps': _apps,
+                'app_label': 'employees',
+                'managed': False,
+                'db_table': f'employees_attendance_archive_{year}',
+                'constraints': [
+                    models.UniqueConstraint(fields=['employee_id', 'date'], name=f'attendance_archive_{year}_day'),
+                ],
+            })
+            model = _models[year] = type(f'ArchivedAttendance{year}', (models.Model,), {
+                '__module__': __name__,
+                'Meta': meta,
+                'id': models.BigIntegerField(primary_key=True),
+                'employee_id': models.BigIntegerField(),
+                'date': models.DateField(),
+                'check_in': models.TimeField(null=True),
+                'check_out': models.TimeField(null=True),
+                'status': models.CharField(max_length=10, choices=Attendance.ATTENDANCE_STATUS),
+                'notes': models.TextField(blank=True),
+                'worked_minutes': models.PositiveIntegerField(null=True),
+                'objects': AttendanceQuerySet.as_manager(),
+            })
+        return model
+
+
+def ensure_table(year, using='default'):
+    """
+    Create a year's archive table if it doesn't exist yet. SQLite can't
+    change the schema inside a transaction, so call this outside one.
+    """
+    model = archive_model(year)
+    connection = connections[using]
+    if model._meta.db_table not in connection.introspection.table_names():
+        with connection.schema_editor() as editor:
+            editor.create_model(model)
+    return model
+
+
+def archive_querysets(start=None, end=None):
+    """
+    (last date, queryset) for each archive table that may hold records
+    between start and end (inclusive), newest first.
+    """
+    years = ArchivedYear.objects.all()
+    if start:
+        years = years.filter(last_date__gte=start)
+    if end:
+        years = years.filter(first_date__lte=end)
+    return [
+        (archived.last_date, archive_model(archived.year).objects.in_range(start, end))
+        for archived in years.order_by('-year')
+    ]
+
+
+def _record_year(year, rows, cutoff):
+    """Widen a year's registry entry to cover newly archived rows"""
+    dates = [row[FIELDS.index('date')] for row in rows]
+    archived, _ = ArchivedYear.objects.select_for_update().get_or_create(
+        year=year, defaults={'first_date': min(dates), 'last_date': max(dates), 'archived_before': cutoff}
+    )
+    archived.first_date = min(archived.first_date, *dates)
+    archived.last_date = max(archived.last_date, *dates)
+    archived.archived_before = max(archived.archived_before, cutoff)
+    archived.records += len(rows)
+    archived.save()
+
+
+def _delete_live(ids):
+    """
+    Delete moved records with plain DELETE statements: no per-row delete
+    signals, so the summaries keep counting them.
+    """
+    connection = connections[Attendance.objects.db]
+    table = connection.ops.quote_name(Attendance._meta.db_table)
+    batch_size = connection.ops.bulk_batch_size(['id'], ids)
+    with connection.cursor() as cursor:
+        for offset in range(0, len(ids), batch_size):
+            batch = ids[offset:offset + batch_size]
+            cursor.execute(f"DELETE FROM {table} WHERE id IN ({', '.join(['%s'] * len(batch))})", batch)
+
+
+def archive_before(cutoff, chunk_size=ARCHIVE_CHUNK_SIZE):
+    """
+    Move Attendance records dated before cutoff into the archive tables,
+    chunk_size records per transaction. Returns the count moved per year.
+    """
+    first = Attendance.objects.filter(date__lt=cutoff).aggregate(first=Min('date'))['first']
+    if first is None:
+        return Counter()
+    for year in range(first.year, (cutoff - timedelta(days=1)).year + 1):
+        ensure_table(year)
+
+    moved = Counter()
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                Attendance.objects.select_for_update()
+                .filter(date__lt=cutoff, pk__gt=last_pk)
+                .order_by('pk')
+                .values_list(*FIELDS)[:chunk_size]
+            )
+            if not rows:
+                break
+            by_year = defaultdict(list)
+            for row in rows:
+                by_year[row[FIELDS.index('date')].year].append(row)
+            for year, year_rows in by_year.items():
+                model = archive_model(year)
+                model.objects.bulk_create([model(**dict(zip(FIELDS, row))) for row in year_rows])
+                _record_year(year, year_rows, cutoff)
+                moved[year] += len(year_rows)
+            last_pk = rows[-1][0]
+            _delete_live([row[0] for row in rows])
+
+    dashboard_cache.clear()
+    return moved
+
+
+@receiver(post_delete, sender=Employee)
+def delete_archived_records(sender, instance, **kwargs):
+    # Live records cascade with the employee; archived ones have no foreign key
+    for _, queryset in archive_querysets():
+        queryset.filter(employee_id=instance.pk).delete()
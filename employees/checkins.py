@@ -0,0 +1,140 @@
+"""
+Batch check-in/check-out processing for badge readers and kiosks.
+
+Events are applied with the same rules as the mark_attendance view, but the
+whole batch is resolved with a fixed number of queries: one lookup for the
+employees (and their shift assignments), one for the existing attendance
+rows, then bulk writes. Check-in status comes from the cached shifts.
+"""
+from collections import Counter
+from datetime import timezone as dt_timezone
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import dashboard_cache
+from .models import ArchivedYear, Attendance, AttendanceSummary, Employee, Shift
+
+CHECK_IN = 'check_in'
+CHECK_OUT = 'check_out'
+
+
+def _parse_event(raw):
+    """Validate one raw event, returning (employee_code, moment, action) or an error string"""
+    if not isinstance(raw, dict):
+        return "Event must be an object"
+    employee_code = raw.get('employee_id')
+    action = raw.get('action')
+    if not employee_code or not isinstance(employee_code, str):
+        return "Missing employee_id"
+    if action not in (CHECK_IN, CHECK_OUT):
+        return "Action must be 'check_in' or 'check_out'"
+    try:
+        moment = parse_datetime(raw.get('timestamp') or '')
+    except (TypeError, ValueError):
+        moment = None
+    if moment is None:
+        return "Invalid timestamp"
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    # Same clock as mark_attendance, which works from timezone.now()
+    return employee_code, moment.astimezone(dt_timezone.utc), action
+
+
+def apply_events(raw_events):
+    """
+    Apply a batch of check-in/check-out events in one transaction.
+
+    Returns one result dict per event, in the order they were given.
+    """
+    results = [None] * len(raw_events)
+    parsed = []
+    for index, raw in enumerate(raw_events):
+        event = _parse_event(raw)
+        if isinstance(event, str):
+            results[index] = {'index': index, 'ok': False, 'result': 'invalid', 'detail': event}
+        else:
+            parsed.append((index, *event))
+
+    employees = {}
+    shifts = {}
+    for code, employee_id, shift_id, department_shift_id in Employee.objects.filter(
+        employee_id__in={code for _, code, _, _ in parsed}
+    ).values_list('employee_id', 'id', 'shift_id', 'department__shift_id'):
+        employees[code] = employee_id
+        shifts[employee_id] = Shift.objects.resolve(shift_id, department_shift_id)
+    archived = ArchivedYear.objects.archived_dates({moment.date() for _, _, moment, _ in parsed})
+
+    with transaction.atomic():
+        records = {
+            (record.employee_id, record.date): record
+            for record in Attendance.objects.select_for_update().filter(
+                employee_id__in=set(employees.values()),
+                date__in={moment.date() for _, _, moment, _ in parsed},
+            )
+        }
+        created = {}
+        changed = {}
+        deltas = Counter()
+
+        # Apply in time order so a check-out after a check-in in the same batch works
+        for index, code, moment, action in sorted(parsed, key=lambda event: event[2]):
+            result = {'index': index, 'employee_id': code, 'action': action}
+            employee_id = employees.get(code)
+            if employee_id is None:
+                results[index] = {**result, 'ok': False, 'result': 'unknown_employee'}
+                continue
+
+            if moment.date() in archived:
+                results[index] = {**result, 'ok': False, 'result': 'archived'}
+                continue
+
+            key = (employee_id, moment.date())
+            record = records.get(key)
+            check_time = moment.time()
+
+            if action == CHECK_IN:
+                status = shifts[employee_id].status_for(check_time)
+                if record is None:
+                    record = Attendance(
+                        employee_id=employee_id, date=key[1], check_in=check_time, status=status
+                    )
+                    records[key] = created[key] = record
+                    deltas[(employee_id, key[1], record.status)] += 1
+                    outcome = 'checked_in'
+                elif record.check_in is None:
+                    deltas[(employee_id, key[1], record.status)] -= 1
+                    record.check_in = check_time
+                    record.status = status
+                    deltas[(employee_id, key[1], record.status)] += 1
+                    changed.setdefault(key, record)
+                    outcome = 'checked_in'
+                else:
+                    outcome = 'already_checked_in'
+            else:
+                if record is None or record.check_in is None:
+                    outcome = 'not_checked_in'
+                elif record.check_out is None:
+                    record.check_out = check_time
+                    record.worked_minutes = Attendance.minutes_between(record.check_in, check_time)
+                    changed.setdefault(key, record)
+                    outcome = 'checked_out'
+                else:
+                    outcome = 'already_checked_out'
+
+            ok = outcome in ('checked_in', 'checked_out')
+            results[index] = {**result, 'ok': ok, 'result': outcome, 'time': check_time.isoformat() if ok else None}
+            if outcome == 'checked_in':
+                results[index]['status'] = record.status
+
+        Attendance.objects.bulk_create(created.values(), batch_size=500)
+        Attendance.objects.bulk_update(
+            [record for key, record in changed.items() if key not in created],
+            ['check_in', 'check_out', 'status', 'worked_minutes'],
+            batch_size=500,
+        )
+        AttendanceSummary.objects.apply_deltas(deltas)
+
+    dashboard_cache.invalidate(*{employee_id for employee_id, _ in changed.keys() | created.keys()})
+    return results
@@ -0,0 +1,66 @@
+"""
+End-of-day attendance closing.
+
+For one date: employees with no record get an ABSENT row, records with a
+check-in but no check-out become HALF_DAY, and PRESENT records that checked
+in after their shift start plus grace become LATE. Check-ins are classified
+when written, so that last step only catches records entered by other means.
+Every step is a set-based statement (one per shift for lateness) or a bulk
+insert, and summaries are shifted in bulk.
+"""
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from . import dashboard_cache
+from .models import ArchivedYear, Attendance, AttendanceSummary, Employee, Shift
+
+BATCH_SIZE = 2000
+
+
+def _reclassify(records, date, to_status):
+    """
+    Set records to a new status and shift the summary counters to match;
+    returns the ids of the employees whose record changed.
+    """
+    moved = {}
+    for employee_id, status in records.values_list('employee_id', 'status'):
+        moved.setdefault(status, []).append(employee_id)
+    records.update(status=to_status)
+    for status, employee_ids in moved.items():
+        AttendanceSummary.objects.shift(employee_ids, date, status, to_status)
+    return [employee_id for employee_ids in moved.values() for employee_id in employee_ids]
+
+
+def close_day(date):
+    ArchivedYear.objects.check_not_archived([date])
+    with transaction.atomic():
+        # Employees who were on staff that day but have no record at all (anti-join)
+        missing = (
+            Employee.objects.filter(user__is_active=True, date_joined__lte=date)
+            .exclude(Exists(Attendance.objects.filter(employee=OuterRef('pk'), date=date)))
+            .values_list('id', flat=True)
+        )
+        absent_ids = list(missing)
+        Attendance.objects.bulk_create(
+            [Attendance(employee_id=employee_id, date=date, status='ABSENT') for employee_id in absent_ids],
+            batch_size=BATCH_SIZE,
+        )
+        AttendanceSummary.objects.shift(absent_ids, date, None, 'ABSENT')
+
+        day = Attendance.objects.filter(date=date).select_for_update()
+
+        # Checked in but never checked out
+        half_day_ids = _reclassify(
+            day.filter(check_in__isnull=False, check_out__isnull=True).exclude(status='HALF_DAY'),
+            date, 'HALF_DAY',
+        )
+
+        # Checked in after their shift start plus grace
+        late_ids = []
+        for shift, assigned in Shift.objects.assignments():
+            late_ids += _reclassify(
+                day.filter(assigned, shift.late_q(shift.grace_minutes), status='PRESENT'), date, 'LATE'
+            )
+
+    dashboard_cache.invalidate(*absent_ids, *half_day_ids, *late_ids)
+    return {'absent': len(absent_ids), 'half_day': len(half_day_ids), 'late': len(late_ids)}
@@ -0,0 +1,81 @@
+"""
+Per-employee cache for the dashboard's stats and recent-attendance fragments.
+
+Entries are invalidated whenever that employee's Attendance or Employee rows
+change (see the receivers in models.py and the bulk write paths), so they can
+live for a long time. Hit/miss counters are kept per process for monitoring.
+"""
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+FRAGMENTS = ('stats', 'recent')
+
+_counters = Counter()
+_lock = threading.Lock()
+
+
+def _cache():
+    return caches[settings.DASHBOARD_CACHE_ALIAS]
+
+
+def _key(fragment, employee_id):
+    return f"dashboard:{fragment}:{employee_id}"
+
+
+def _count(fragment, outcome):
+    with _lock:
+        _counters[(fragment, outcome)] += 1
+
+
+def get_fragment(fragment, employee_id, build):
+    """Return the cached fragment for an employee, building and storing it on a miss"""
+    cache = _cache()
+    key = _key(fragment, employee_id)
+    value = cache.get(key)
+    if value is None:
+        _count(fragment, 'miss')
+        value = build()
+        cache.set(key, value)
+    else:
+        _count(fragment, 'hit')
+    return value
+
+
+async def aget_fragment(fragment, employee_id, build):
+    """Async get_fragment(); build is a coroutine function"""
+    cache = _cache()
+    key = _key(fragment, employee_id)
+    value = await cache.aget(key)
+    if value is None:
+        _count(fragment, 'miss')
+        value = await build()
+        await cache.aset(key, value)
+    else:
+        _count(fragment, 'hit')
+    return value
+
+
+def invalidate(*employee_ids):
+    """Drop every cached fragment for the given employees once the current transaction commits"""
+    keys = [_key(fragment, employee_id) for employee_id in employee_ids for fragment in FRAGMENTS]
+    if keys:
+        # Deleting before commit would let a concurrent request re-cache the old rows
+        transaction.on_commit(lambda: _cache().delete_many(keys))
+
+
+def clear():
+    """Drop every cached fragment, e.g. after rebuilding summaries for everyone"""
+    transaction.on_commit(lambda: _cache().clear())
+
+
+def stats():
+    """Hit/miss counts per fragment since this process started"""
+    with _lock:
+        return {
+            fragment: {'hits': _counters[(fragment, 'hit')], 'misses': _counters[(fragment, 'miss')]}
+            for fragment in FRAGMENTS
+        }
@@ -0,0 +1,109 @@
+"""
+Attendance export for payroll.
+
+Rows are generated lazily from a server-side iterator so a whole month for
+every employee can be streamed without holding it in memory. Ranges that
+reach archived years merge the archive tables in, still in order.
+"""
+import calendar
+import csv
+import heapq
+from datetime import date
+
+from .archive import archive_querysets
+from .models import Attendance, Employee
+
+EXPORT_CHUNK_SIZE = 2000
+
+HEADER = [
+    'Employee ID', 'Name', 'Department', 'Date', 'Check In', 'Check Out',
+    'Working Hours', 'Status', 'Notes',
+]
+
+
+class Echo:
+    """File-like object whose write() just hands back the value, for csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+def month_range(value):
+    """Turn 'YYYY-MM' into (first_day, last_day); raises ValueError if malformed"""
+    year, month = (int(part) for part in value.split('-'))
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+
+def export_queryset(start=None, end=None, department_id=None):
+    queryset = Attendance.objects.in_range(start, end).select_related(
+        'employee__user', 'employee__department'
+    )
+    if department_id:
+        queryset = queryset.filter(employee__department_id=department_id)
+    return queryset.order_by('employee_id', 'date')
+
+
+def _with_employees(queryset, department_id=None):
+    """Iterate archived records with .employee loaded, a chunk at a time"""
+    if department_id:
+        queryset = queryset.filter(
+            employee_id__in=Employee.objects.filter(department_id=department_id).values('pk')
+        )
+    chunk = []
+    for record in queryset.order_by('employee_id', 'date').iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        chunk.append(record)
+        if len(chunk) == EXPORT_CHUNK_SIZE:
+            yield from _attach_employees(chunk)
+            chunk = []
+    yield from _attach_employees(chunk)
+
+
+def _attach_employees(records):
+    employees = Employee.objects.select_related('user', 'department').in_bulk(
+        {record.employee_id for record in records}
+    )
+    for record in records:
+        record.employee = employees.get(record.employee_id)
+        if record.employee is not None:
+            yield record
+
+
+def export_records(start=None, end=None, department_id=None):
+    """Records to export ordered by employee and date, archived ones included"""
+    records = export_queryset(start, end, department_id).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    archived = [_with_employees(queryset, department_id) for _, queryset in archive_querysets(start, end)]
+    if not archived:
+        return records
+    return heapq.merge(records, *archived, key=lambda record: (record.employee_id, record.date))
+
+
+def working_hours(record):
+    """Worked time as decimal hours, or '' when incomplete"""
+    if not record.worked_minutes:
+        return ''
+    return f"{record.worked_minutes / 60:.2f}"
+
+
+def attendance_rows(records):
+    """Yield the header followed by one list per attendance record"""
+    yield HEADER
+    for record in records:
+        employee = record.employee
+        yield [
+            employee.employee_id,
+            employee.user.get_full_name(),
+            employee.department.name if employee.department else '',
+            record.date.isoformat(),
+            record.check_in.strftime('%H:%M') if record.check_in else '',
+            record.check_out.strftime('%H:%M') if record.check_out else '',
+            working_hours(record),
+            record.status,
+            record.notes,
+        ]
+
+
+def stream_csv(records):
+    """Yield CSV-encoded lines for the given records"""
+    writer = csv.writer(Echo())
+    for row in attendance_rows(records):
+        yield writer.writerow(row)
@@ -0,0 +1,235 @@
+"""
+Per-view request instrumentation.
+
+RequestMetricsMiddleware times every request and collects its database query
+count and time (through an execute wrapper on every connection) and its
+template render time (through the TimedTemplates backend). The figures for
+the current request live in a context variable, so they follow the request
+into sync_to_async threads under ASGI.
+
+Totals are aggregated per view in this process and exported by the metrics
+view in Prometheus text format. Each response also gets a Server-Timing
+header when METRICS_SERVER_TIMING is on.
+"""
+import logging
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template.backends.django import DjangoTemplates
+
+from . import dashboard_cache
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    __slots__ = ('queries', 'db_time', 'template_time')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+
+
+class ViewStats:
+    __slots__ = ('requests', 'latency', 'buckets', 'queries', 'db_time', 'template_time')
+
+    def __init__(self):
+        self.requests = 0
+        self.latency = 0.0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+
+
+_stats = {}
+_lock = threading.Lock()
+
+
+def _record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_time += time.perf_counter() - started
+        metrics.queries += 1
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+class TimedTemplate:
+    """Wraps a backend template to add its render time to the current request"""
+
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None:
+            return self.template.render(context, request)
+        started = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            metrics.template_time += time.perf_counter() - started
+
+
+class TimedTemplates(DjangoTemplates):
+    """The Django template engine, with render times recorded per request"""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else 'unresolved'
+
+
+def _record(request, response, metrics, latency):
+    key = (_view_name(request), request.method, f'{response.status_code // 100}xx')
+    with _lock:
+        stats = _stats.get(key)
+        if stats is None:
+            stats = _stats[key] = ViewStats()
+        stats.requests += 1
+        stats.latency += latency
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if latency <= bound:
+                stats.buckets[i] += 1
+        stats.queries += metrics.queries
+        stats.db_time += metrics.db_time
+        stats.template_time += metrics.template_time
+
+    if settings.METRICS_SERVER_TIMING:
+        response['Server-Timing'] = (
+            f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.queries} queries", '
+            f'tpl;dur={metrics.template_time * 1000:.1f}, '
+            f'total;dur={latency * 1000:.1f}'
+        )
+    if latency * 1000 >= settings.METRICS_SLOW_REQUEST_MS:
+        logger.warning(
+            "slow request view=%s method=%s status=%s total_ms=%.1f db_ms=%.1f queries=%d template_ms=%.1f",
+            key[0], request.method, response.status_code, latency * 1000,
+            metrics.db_time * 1000, metrics.queries, metrics.template_time * 1000,
+        )
+
+
+class RequestMetricsMiddleware:
+    """
+    Record latency, query count, DB time and template time per view. Should
+    be first in MIDDLEWARE so the latency covers the whole stack.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        _record(request, response, metrics, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        _record(request, response, metrics, time.perf_counter() - started)
+        return response
+
+
+def reset():
+    """Forget everything recorded so far in this process"""
+    with _lock:
+        _stats.clear()
+
+
+def _labels(**labels):
+    return ','.join(f'{name}="{value}"' for name, value in labels.items())
+
+
+def prometheus_text():
+    """Everything recorded in this process, in the Prometheus text exposition format"""
+    with _lock:
+        snapshot = {
+            key: (stats.requests, stats.latency, list(stats.buckets), stats.queries, stats.db_time, stats.template_time)
+            for key, stats in _stats.items()
+        }
+
+    lines = [
+        '# HELP attendance_requests_total Requests handled, by view, method and status class.',
+        '# TYPE attendance_requests_total counter',
+    ]
+    for (view, method, status), (requests, *_) in sorted(snapshot.items()):
+        lines.append(f'attendance_requests_total{{{_labels(view=view, method=method, status=status)}}} {requests}')
+
+    lines += [
+        '# HELP attendance_request_duration_seconds Request latency through the whole middleware stack.',
+        '# TYPE attendance_request_duration_seconds histogram',
+    ]
+    for (view, method, status), (requests, latency, buckets, *_) in sorted(snapshot.items()):
+        labels = _labels(view=view, method=method, status=status)
+        for bound, count in zip(LATENCY_BUCKETS, buckets):
+            lines.append(f'attendance_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+        lines.append(f'attendance_request_duration_seconds_bucket{{{labels},le="+Inf"}} {requests}')
+        lines.append(f'attendance_request_duration_seconds_sum{{{labels}}} {latency:.6f}')
+        lines.append(f'attendance_request_duration_seconds_count{{{labels}}} {requests}')
+
+    for name, index, kind, help_text in (
+        ('attendance_db_queries_total', 3, 'counter', 'Database queries run by requests.'),
+        ('attendance_db_duration_seconds_total', 4, 'counter', 'Time spent in database queries.'),
+        ('attendance_template_duration_seconds_total', 5, 'counter', 'Time spent rendering templates.'),
+    ):
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+        for (view, method, status), values in sorted(snapshot.items()):
+            value = values[index]
+            value = f'{value:.6f}' if isinstance(value, float) else value
+            lines.append(f'{name}{{{_labels(view=view, method=method, status=status)}}} {value}')
+
+    lines += [
+        '# HELP attendance_dashboard_cache_total Dashboard fragment cache lookups.',
+        '# TYPE attendance_dashboard_cache_total counter',
+    ]
+    for fragment, counts in dashboard_cache.stats().items():
+        lines.append(f'attendance_dashboard_cache_total{{{_labels(fragment=fragment, result="hit")}}} {counts["hits"]}')
+        lines.append(f'attendance_dashboard_cache_total{{{_labels(fragment=fragment, result="miss")}}} {counts["misses"]}')
+    return '\n'.join(lines) + '\n'
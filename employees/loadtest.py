@@ -0,0 +1,337 @@
+"""
+In-process load testing for the check-in pages.
+
+Requests go through Django's real WSGIHandler (a thread pool, like a threaded
+WSGI server) or ASGIHandler (one event loop, like a single uvicorn worker)
+without a network server, against a throwaway database seeded with employees
+and some attendance history. Each employee optionally logs in, then replays
+the shift-start sequence in STORM. Every request is timed and its database
+queries and writes counted, and the results are summarized per endpoint.
+"""
+import asyncio
+import io
+import secrets
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from datetime import timedelta
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+from django.test import Client
+from django.utils import timezone
+
+from .middleware import SESSION_REFRESHED_KEY
+from .models import Attendance, AttendanceSummary, Department, Employee
+
+HOST = 'testserver'
+PASSWORD = 'load-test-password'
+
+# The request sequence each employee sends, as (method, path, form data)
+STORM = [
+    ('GET', '/dashboard/', None),
+    ('POST', '/mark-attendance/', {'action': 'check_in'}),
+    ('GET', '/mark-attendance/', None),
+    ('GET', '/dashboard/', None),
+    ('GET', '/attendance-history/', None),
+]
+
+# Statements counted as writes
+WRITES = ('INSERT', 'UPDATE', 'DELETE')
+
+# [queries, writes] for the request running in the current context. Context
+# variables follow a request into sync_to_async threads, so this works for
+# both handlers even though each thread has its own connection.
+_request_queries = ContextVar('loadtest_request_queries', default=None)
+
+
+def _count_query(execute, sql, params, many, context):
+    counter = _request_queries.get()
+    # Connection setup PRAGMAs (employees/sqlite.py) are only seen on reused
+    # connections, so they're left out to keep the servers comparable
+    if counter is not None and not sql.startswith('PRAGMA'):
+        counter[0] += 1
+        if sql.lstrip().upper().startswith(WRITES):
+            counter[1] += 1
+    return execute(sql, params, many, context)
+
+
+def _install_counter(sender, connection, **kwargs):
+    if _count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_query)
+
+
+def count_queries():
+    """Count queries on every connection, including ones opened later by worker threads"""
+    connection_created.connect(_install_counter)
+    for conn in connections.all():
+        _install_counter(None, conn)
+
+
+class LoadClient:
+    """Cookies and CSRF token for one simulated browser"""
+
+    def __init__(self, username, session_key=None):
+        self.username = username
+        self.cookies = SimpleCookie()
+        self.cookies[settings.CSRF_COOKIE_NAME] = secrets.token_hex(16)
+        if session_key:
+            self.cookies[settings.SESSION_COOKIE_NAME] = session_key
+
+    def headers(self):
+        return {
+            'cookie': self.cookies.output(header='', sep=';').strip(),
+            'x-csrftoken': self.cookies[settings.CSRF_COOKIE_NAME].value,
+        }
+
+    def update(self, set_cookies):
+        for header in set_cookies:
+            self.cookies.load(header)
+
+
+def seed(employee_count, history_days=30, log_in=True):
+    """
+    Create employees with history_days of past attendance. Unless log_in is
+    False, sessions are created directly so the storm starts logged in.
+    """
+    department = Department.objects.create(name='Load test')
+    # One hash for everyone: hashing per user would dominate seeding
+    password = make_password(PASSWORD)
+    User.objects.bulk_create([
+        User(username=f'load{i}', email=f'load{i}@example.com', first_name='Load', last_name=str(i), password=password)
+        for i in range(employee_count)
+    ])
+    users = list(User.objects.filter(username__startswith='load').order_by('pk'))
+    employees = Employee.objects.bulk_create([
+        Employee(user=user, employee_id=f'LOAD{user.pk:05d}', department=department) for user in users
+    ])
+
+    today = timezone.now().date()
+    Attendance.objects.bulk_create(
+        [
+            Attendance(employee=employee, date=today - timedelta(days=day), status='PRESENT')
+            for employee in employees
+            for day in range(1, history_days + 1)
+        ],
+        batch_size=2000,
+    )
+    AttendanceSummary.objects.rebuild()
+
+    clients = []
+    for user in users:
+        session_key = None
+        if log_in:
+            client = Client()
+            client.force_login(user)
+            # Stamped as the login view's response would be, so the storm sees steady state
+            session = client.session
+            session[SESSION_REFRESHED_KEY] = int(time.time())
+            session.save()
+            session_key = session.session_key
+        clients.append(LoadClient(user.username, session_key))
+    return clients
+
+
+def _encode(data):
+    return urlencode(data).encode() if data else b''
+
+
+def _wsgi_call(app, method, path, data, client):
+    body = _encode(data)
+    headers = client.headers()
+    environ = {
+        'REQUEST_METHOD': method,
+        'PATH_INFO': path,
+        'QUERY_STRING': '',
+        'SERVER_NAME': HOST,
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': HOST,
+        'HTTP_COOKIE': headers['cookie'],
+        'HTTP_X_CSRFTOKEN': headers['x-csrftoken'],
+        'CONTENT_TYPE': 'application/x-www-form-urlencoded',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    started = []
+
+    def start_response(status, response_headers, exc_info=None):
+        started.append((int(status.split()[0]), response_headers))
+
+    response = app(environ, start_response)
+    try:
+        b''.join(response)
+    finally:
+        response.close()
+    status, response_headers = started[0]
+    client.update(value for name, value in response_headers if name.lower() == 'set-cookie')
+    return status
+
+
+async def _asgi_call(app, method, path, data, client):
+    body = _encode(data)
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'root_path': '',
+        'headers': [
+            (b'host', HOST.encode()),
+            (b'content-type', b'application/x-www-form-urlencoded'),
+            (b'content-length', str(len(body)).encode()),
+            *((name.encode(), value.encode()) for name, value in client.headers().items()),
+        ],
+        'client': ('127.0.0.1', 0),
+        'server': (HOST, 80),
+    }
+    request_sent = False
+    disconnected = asyncio.Event()
+    started = []
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+        await disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            started.append(message)
+
+    await app(scope, receive, send)
+    disconnected.set()
+    client.update(value.decode() for name, value in started[0]['headers'] if name.lower() == b'set-cookie')
+    return started[0]['status']
+
+
+def _requests_for(client, log_in):
+    if log_in:
+        yield 'POST', '/login/', {'username': client.username, 'password': PASSWORD}
+    yield from STORM
+
+
+def _begin():
+    counter = [0, 0]
+    _request_queries.set(counter)
+    return counter, time.perf_counter()
+
+
+def _record(samples, method, path, begun, status):
+    # list.append is atomic, so worker threads can share the sample list
+    counter, started = begun
+    samples.append((f'{method} {path}', time.perf_counter() - started, status, *counter))
+
+
+def run_wsgi(clients, concurrency, log_in=False):
+    """Replay the storm for every client through a thread pool; returns (samples, elapsed)"""
+    app = WSGIHandler()
+    samples = []
+
+    def replay(client):
+        try:
+            for method, path, data in _requests_for(client, log_in):
+                begun = _begin()
+                _record(samples, method, path, begun, _wsgi_call(app, method, path, data, client))
+        finally:
+            connection.close()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(replay, clients))
+    return samples, time.perf_counter() - started
+
+
+def run_asgi(clients, concurrency, log_in=False):
+    """Replay the storm for every client on one event loop; returns (samples, elapsed)"""
+    app = ASGIHandler()
+    samples = []
+
+    async def replay(client, slots):
+        async with slots:
+            for method, path, data in _requests_for(client, log_in):
+                begun = _begin()
+                _record(samples, method, path, begun, await _asgi_call(app, method, path, data, client))
+
+    async def main():
+        slots = asyncio.Semaphore(concurrency)
+        await asyncio.gather(*(replay(client, slots) for client in clients))
+
+    started = time.perf_counter()
+    asyncio.run(main())
+    return samples, time.perf_counter() - started
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def _stats(samples, elapsed):
+    latencies = sorted(sample[1] for sample in samples)
+    return {
+        'requests': len(samples),
+        'errors': sum(1 for sample in samples if sample[2] >= 400),
+        'requests_per_second': round(len(samples) / elapsed, 1) if elapsed else 0,
+        'mean_ms': round(1000 * sum(latencies) / len(latencies), 2) if latencies else 0,
+        'p50_ms': round(1000 * percentile(latencies, 50), 2),
+        'p95_ms': round(1000 * percentile(latencies, 95), 2),
+        'p99_ms': round(1000 * percentile(latencies, 99), 2),
+        'queries_per_request': round(sum(sample[3] for sample in samples) / len(samples), 2) if samples else 0,
+        'writes_per_request': round(sum(sample[4] for sample in samples) / len(samples), 2) if samples else 0,
+    }
+
+
+def summarize(samples, elapsed):
+    """Overall and per-endpoint stats; per-endpoint req/s share the overall wall time"""
+    endpoints = {}
+    for sample in samples:
+        endpoints.setdefault(sample[0], []).append(sample)
+    return {
+        'elapsed': round(elapsed, 3),
+        'total': _stats(samples, elapsed),
+        'endpoints': {name: _stats(group, elapsed) for name, group in endpoints.items()},
+    }
+
+
+def regressions(result, baseline, tolerance=0.2):
+    """
+    Compare a summary with a baseline one; returns a message for every
+    endpoint whose p95 latency, queries or writes per request grew by more than
+    tolerance (a fraction), or which has new errors.
+    """
+    found = []
+    for name, stats in result['endpoints'].items():
+        before = baseline.get('endpoints', {}).get(name)
+        if not before:
+            continue
+        for metric in ('p95_ms', 'queries_per_request', 'writes_per_request'):
+            # Baselines recorded before a metric existed don't have it
+            if before.get(metric) and stats[metric] > before[metric] * (1 + tolerance):
+                found.append(f"{name}: {metric} {before[metric]} -> {stats[metric]}")
+        if stats['errors'] > before['errors']:
+            found.append(f"{name}: errors {before['errors']} -> {stats['errors']}")
+    return found
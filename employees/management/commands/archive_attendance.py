@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.db.models.functions import ExtractYear
+from django.utils import timezone
+
+from employees.archive import ARCHIVE_CHUNK_SIZE, archive_before
+from employees.exports import month_range
+from employees.models import Attendance
+
+
+class Command(BaseCommand):
+    help = (
+        "Move attendance records older than a month into per-year archive tables; "
+        "history pages and exports still include them"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', required=True, help="Archive records dated before this month, as YYYY-MM")
+        parser.add_argument(
+            '--chunk-size', type=int, default=ARCHIVE_CHUNK_SIZE,
+            help=f"Records moved per transaction (default {ARCHIVE_CHUNK_SIZE})",
+        )
+        parser.add_argument('--dry-run', action='store_true', help="Only count the records that would move")
+
+    def handle(self, *args, **options):
+        try:
+            cutoff, _ = month_range(options['before'])
+        except ValueError:
+            raise CommandError("--before must be YYYY-MM")
+        if cutoff > timezone.localdate().replace(day=1):
+            raise CommandError("--before can't be later than the current month")
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size must be positive")
+
+        if options['dry_run']:
+            counts = dict(
+                Attendance.objects.filter(date__lt=cutoff).order_by()
+                .values_list(ExtractYear('date')).annotate(n=Count('id'))
+            )
+            verb = "Would archive"
+        else:
+            started = time.monotonic()
+            counts = archive_before(cutoff, chunk_size=options['chunk_size'])
+            elapsed = time.monotonic() - started
+            verb = "Archived"
+
+        per_year = ', '.join(f"{year}: {n}" for year, n in sorted(counts.items()))
+        message = f"{verb} {sum(counts.values())} records dated before {cutoff}"
+        if per_year:
+            message += f" ({per_year})"
+        if not options['dry_run']:
+            message += f" in {elapsed:.1f}s"
+        self.stdout.write(self.style.SUCCESS(message))
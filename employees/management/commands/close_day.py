@@ -0,0 +1,40 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from employees.closing import close_day
+
+
+class Command(BaseCommand):
+    help = (
+        "Close a day's attendance: mark employees without a record ABSENT, "
+        "check-ins without a check-out HALF_DAY and late check-ins LATE"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help="Day to close as YYYY-MM-DD (defaults to yesterday)")
+
+    def handle(self, *args, **options):
+        if options['date']:
+            try:
+                date = parse_date(options['date'])
+            except ValueError:
+                date = None
+            if date is None:
+                raise CommandError("--date must be YYYY-MM-DD")
+        else:
+            date = timezone.now().date() - timedelta(days=1)
+
+        started = time.monotonic()
+        try:
+            counts = close_day(date)
+        except ValueError as e:
+            raise CommandError(str(e))
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Closed {date}: {counts['absent']} absent, {counts['half_day']} half day, "
+            f"{counts['late']} late ({elapsed:.1f}s)"
+        ))
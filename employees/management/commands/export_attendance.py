@@ -0,0 +1,45 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from employees.exports import attendance_rows, export_records, month_range
+
+
+class Command(BaseCommand):
+    help = "Export attendance records (with working hours) as CSV for payroll"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', help="Month to export, as YYYY-MM")
+        parser.add_argument('--start', help="First date to export, as YYYY-MM-DD")
+        parser.add_argument('--end', help="Last date to export, as YYYY-MM-DD")
+        parser.add_argument('--department', type=int, help="Only export this department id")
+        parser.add_argument('--output', '-o', help="File to write (defaults to stdout)")
+
+    def handle(self, *args, **options):
+        try:
+            if options['month']:
+                start, end = month_range(options['month'])
+            else:
+                start = parse_date(options['start']) if options['start'] else None
+                end = parse_date(options['end']) if options['end'] else None
+                if (options['start'] and not start) or (options['end'] and not end):
+                    raise ValueError
+        except ValueError:
+            raise CommandError("Dates must be YYYY-MM for --month and YYYY-MM-DD for --start/--end")
+
+        records = export_records(start, end, options['department'])
+
+        output = open(options['output'], 'w', newline='') if options['output'] else self.stdout
+        try:
+            writer = csv.writer(output)
+            count = -1  # header row
+            for row in attendance_rows(records):
+                writer.writerow(row)
+                count += 1
+        finally:
+            if options['output']:
+                output.close()
+
+        if options['output']:
+            self.stdout.write(self.style.SUCCESS(f"Exported {count} records to {options['output']}"))
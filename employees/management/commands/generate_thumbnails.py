@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from employees import thumbnails
+from employees.models import Employee
+
+
+class Command(BaseCommand):
+    help = "Generate profile picture thumbnails that are missing or out of date (e.g. for existing uploads)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Regenerate every employee's thumbnails")
+
+    def handle(self, *args, all=False, **options):
+        employees = Employee.objects.exclude(profile_picture='').exclude(profile_picture__isnull=True)
+        generated = failed = 0
+        for employee_id, picture, version in employees.values_list('id', 'profile_picture', 'thumbnail_version'):
+            if not all and version == thumbnails.version_for(picture):
+                continue
+            if thumbnails.generate(employee_id, picture):
+                generated += 1
+            else:
+                failed += 1
+        self.stdout.write(self.style.SUCCESS(f"Generated thumbnails for {generated} employees ({failed} failed)"))
@@ -0,0 +1,181 @@
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.validators import validate_email
+from django.db import transaction
+
+from employees.models import Department, Employee
+
+REQUIRED_COLUMNS = ['full_name', 'email', 'employee_id', 'department']
+
+
+def _init_worker():
+    # Needed where worker processes are spawned rather than forked
+    django.setup()
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk import employees from a CSV file with columns "
+        "full_name, email, employee_id, department and optional password"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file')
+        parser.add_argument('--batch-size', type=int, default=500, help="Rows per bulk insert")
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help="Processes used to hash passwords (1 hashes in this process)",
+        )
+        parser.add_argument('--dry-run', action='store_true', help="Validate only, write nothing")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be positive")
+        if options['workers'] < 1:
+            raise CommandError("--workers must be positive")
+        started = time.monotonic()
+        rows = self.read_rows(options['csv_file'])
+        valid, errors = self.validate(rows)
+
+        for line, message in errors:
+            self.stderr.write(f"Row {line}: {message}")
+
+        if options['dry_run'] or not valid:
+            self.stdout.write(f"{len(valid)} valid rows, {len(errors)} errors (nothing imported)")
+            return
+
+        passwords = self.hash_passwords([row['password'] for _, row in valid], options['workers'])
+        hashed_at = time.monotonic()
+
+        departments = self.ensure_departments({row['department'] for _, row in valid})
+
+        batch_size = options['batch_size']
+        for offset in range(0, len(valid), batch_size):
+            chunk = valid[offset:offset + batch_size]
+            with transaction.atomic():
+                users = User.objects.bulk_create([
+                    User(
+                        username=row['email'],
+                        email=row['email'],
+                        first_name=row['first_name'],
+                        last_name=row['last_name'],
+                        password=passwords[offset + i],
+                    )
+                    for i, (_, row) in enumerate(chunk)
+                ])
+                Employee.objects.bulk_create([
+                    Employee(
+                        user=user,
+                        employee_id=row['employee_id'],
+                        department=departments[row['department']],
+                    )
+                    for user, (_, row) in zip(users, chunk)
+                ])
+
+        elapsed = time.monotonic() - started
+        rate = len(valid) / elapsed if elapsed else len(valid)
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {len(valid)} employees ({len(errors)} rows skipped) in {elapsed:.1f}s "
+            f"({rate:.0f} rows/s, password hashing {hashed_at - started:.1f}s)"
+        ))
+
+    def read_rows(self, path):
+        try:
+            with open(path, newline='', encoding='utf-8-sig') as f:
+                reader = csv.DictReader(f)
+                missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or [])]
+                if missing:
+                    raise CommandError(f"Missing columns: {', '.join(missing)}")
+                # Line numbers start at 2, after the header
+                return [(line, row) for line, row in enumerate(reader, start=2)]
+        except OSError as e:
+            raise CommandError(f"Cannot read {path}: {e}")
+
+    def validate(self, rows):
+        """Check every row before writing anything; returns (valid rows, errors)"""
+        cleaned = []
+        errors = []
+        seen_emails = set()
+        seen_ids = set()
+
+        for line, row in rows:
+            full_name = (row.get('full_name') or '').strip()
+            email = (row.get('email') or '').strip().lower()
+            employee_id = (row.get('employee_id') or '').strip()
+            department = (row.get('department') or '').strip()
+
+            if not all([full_name, email, employee_id, department]):
+                errors.append((line, "full_name, email, employee_id and department are required"))
+                continue
+            try:
+                validate_email(email)
+            except ValidationError:
+                errors.append((line, f"Invalid email {email}"))
+                continue
+            if email in seen_emails:
+                errors.append((line, f"Duplicate email {email} in file"))
+                continue
+            if employee_id in seen_ids:
+                errors.append((line, f"Duplicate employee ID {employee_id} in file"))
+                continue
+            seen_emails.add(email)
+            seen_ids.add(employee_id)
+
+            name_parts = full_name.split()
+            cleaned.append((line, {
+                'email': email,
+                'employee_id': employee_id,
+                'department': department,
+                'first_name': name_parts[0],
+                'last_name': ' '.join(name_parts[1:]),
+                'password': row.get('password') or None,
+            }))
+
+        # One query per table for everything already in the database
+        taken_emails = set(
+            User.objects.filter(username__in=seen_emails).values_list('username', flat=True)
+        )
+        taken_ids = set(
+            Employee.objects.filter(employee_id__in=seen_ids).values_list('employee_id', flat=True)
+        )
+
+        valid = []
+        for line, row in cleaned:
+            if row['email'] in taken_emails:
+                errors.append((line, f"Email {row['email']} already exists"))
+            elif row['employee_id'] in taken_ids:
+                errors.append((line, f"Employee ID {row['employee_id']} already taken"))
+            else:
+                valid.append((line, row))
+
+        errors.sort()
+        return valid, errors
+
+    def hash_passwords(self, raw_passwords, workers):
+        """Hash passwords across a process pool; rows without one get an unusable password"""
+        to_hash = [password for password in raw_passwords if password]
+        if workers > 1 and len(to_hash) > 1:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                hashed = iter(list(pool.map(make_password, to_hash, chunksize=16)))
+        else:
+            hashed = iter(map(make_password, to_hash))
+        return [next(hashed) if password else make_password(None) for password in raw_passwords]
+
+    def ensure_departments(self, names):
+        """Map department names to Department rows, creating missing ones in bulk"""
+        departments = {department.name: department for department in Department.objects.filter(name__in=names)}
+        missing = [Department(name=name) for name in sorted(names - departments.keys())]
+        if missing:
+            Department.objects.bulk_create(missing)
+            departments.update(
+                {department.name: department for department in Department.objects.filter(name__in=names)}
+            )
+        return departments
@@ -0,0 +1,133 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from employees import loadtest
+
+SERVERS = ('wsgi', 'asgi')
+COLUMNS = [
+    'requests', 'errors', 'p50_ms', 'p95_ms', 'p99_ms', 'mean_ms', 'requests_per_second',
+    'queries_per_request', 'writes_per_request',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay a shift-start check-in storm against a throwaway database and report latency "
+        "percentiles, throughput and queries and writes per request. By default runs WSGI "
+        "(sync views) and ASGI (async views) side by side."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--server', choices=SERVERS + ('both',), default='both')
+        parser.add_argument('--employees', type=int, default=200, help="Employees checking in (default 200)")
+        parser.add_argument('--concurrency', type=int, default=50, help="Requests in flight (default 50)")
+        parser.add_argument('--days', type=int, default=30, help="Days of past attendance to seed (default 30)")
+        parser.add_argument(
+            '--login', action='store_true',
+            help="Log each employee in through the login form first (includes password hashing)",
+        )
+        parser.add_argument('--output', help="Also write the results as JSON to this file")
+        parser.add_argument('--baseline', help="Fail if results regress against this earlier --output file")
+        parser.add_argument(
+            '--tolerance', type=float, default=20,
+            help="Allowed p95/queries/writes growth over the baseline, in percent (default 20)",
+        )
+        parser.add_argument('--json', action='store_true', dest='as_json', help="Print the results as JSON")
+
+    def handle(self, *args, server, employees, concurrency, days, login=False, output=None, baseline=None,
+               tolerance=20, as_json=False, **options):
+        if employees < 1 or concurrency < 1 or days < 0:
+            raise CommandError("--employees and --concurrency must be positive and --days not negative")
+        settings_args = {'employees': employees, 'concurrency': concurrency, 'days': days, 'login': login}
+
+        if server == 'both':
+            results = {name: self.run_in_subprocess(name, settings_args) for name in SERVERS}
+        else:
+            results = {server: self.run(server, **settings_args)}
+
+        if as_json:
+            self.stdout.write(json.dumps(results))
+            return
+
+        if output:
+            with open(output, 'w') as f:
+                json.dump({'settings': settings_args, 'results': results}, f, indent=2)
+
+        self.stdout.write(
+            f"{employees} employees, {concurrency} concurrent, {days} days of history"
+            f"{', logging in first' if login else ''}"
+        )
+        for name, result in results.items():
+            self.report(name, result)
+
+        if baseline:
+            self.compare(results, baseline, tolerance)
+
+    def report(self, server, result):
+        self.stdout.write('')
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{server.upper()} ({result['views']} views) - {result['elapsed']}s"
+        ))
+        width = max(len(name) for name in result['endpoints'])
+        self.stdout.write(f"{'endpoint':<{width}}  " + '  '.join(f"{c:>{len(c)}}" for c in COLUMNS))
+        rows = [*result['endpoints'].items(), ('total', result['total'])]
+        for name, stats in rows:
+            self.stdout.write(f"{name:<{width}}  " + '  '.join(f"{stats[c]:>{len(c)}}" for c in COLUMNS))
+
+    def compare(self, results, baseline, tolerance):
+        try:
+            with open(baseline) as f:
+                before = json.load(f)['results']
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f"Could not read baseline {baseline}: {e}")
+
+        found = []
+        for server, result in results.items():
+            if server in before:
+                found += [f"{server}: {message}" for message in loadtest.regressions(
+                    result, before[server], tolerance / 100
+                )]
+        if found:
+            raise CommandError("Regressions against baseline:\n" + '\n'.join(found))
+        self.stdout.write(self.style.SUCCESS(f"No regressions against {baseline}"))
+
+    def run_in_subprocess(self, server, settings_args):
+        # URLs are fixed at import, so each server gets a process with its own routing
+        env = {**os.environ, 'ATTENDANCE_ASYNC_VIEWS': '1' if server == 'asgi' else '0'}
+        command = [
+            sys.executable, '-m', 'django', 'loadtest', '--server', server, '--json',
+            '--employees', str(settings_args['employees']),
+            '--concurrency', str(settings_args['concurrency']),
+            '--days', str(settings_args['days']),
+        ]
+        if settings_args['login']:
+            command.append('--login')
+        completed = subprocess.run(command, env=env, cwd=settings.BASE_DIR, capture_output=True, text=True)
+        if completed.returncode:
+            raise CommandError(f"{server} run failed:\n{completed.stderr}")
+        return json.loads(completed.stdout.strip().splitlines()[-1])[server]
+
+    def run(self, server, employees, concurrency, days, login):
+        setup_test_environment()
+        with tempfile.TemporaryDirectory() as directory:
+            # A file database, so concurrent writers contend the way they do in production
+            connection.settings_dict['TEST']['NAME'] = os.path.join(directory, 'loadtest.sqlite3')
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                clients = loadtest.seed(employees, history_days=days, log_in=not login)
+                loadtest.count_queries()
+                runner = loadtest.run_asgi if server == 'asgi' else loadtest.run_wsgi
+                result = loadtest.summarize(*runner(clients, concurrency, log_in=login))
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+                teardown_test_environment()
+        result['views'] = 'async' if settings.ATTENDANCE_ASYNC_VIEWS else 'sync'
+        return result
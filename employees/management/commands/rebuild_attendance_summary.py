@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from employees.models import AttendanceSummary
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-employee attendance summary table from Attendance records"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--employee', action='append', dest='employee_ids', type=int, metavar='ID',
+            help="Only rebuild this employee's summaries (can be repeated)",
+        )
+
+    def handle(self, *args, employee_ids=None, **options):
+        count = AttendanceSummary.objects.rebuild(employee_ids=employee_ids)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} attendance summary rows"))
@@ -0,0 +1,59 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from employees.exports import month_range
+from employees.timesheets import monthly_timesheets, naive_timesheets
+
+COLUMNS = ['days_worked', 'half_days', 'absent_days', 'regular_hours', 'overtime_hours', 'late_minutes']
+
+
+class Command(BaseCommand):
+    help = "Compute monthly timesheets (regular hours, overtime, late minutes, half days) as CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument('month', help="Month as YYYY-MM")
+        parser.add_argument('--department', type=int, help="Only this department id")
+        parser.add_argument(
+            '--benchmark', action='store_true',
+            help="Time the batch computation against the row-by-row version and check they agree",
+        )
+
+    def handle(self, *args, month, department=None, benchmark=False, **options):
+        try:
+            start, end = month_range(month)
+        except ValueError:
+            raise CommandError("month must be YYYY-MM")
+
+        if benchmark:
+            self.benchmark(start, end, department)
+            return
+
+        writer = csv.writer(self.stdout)
+        writer.writerow(['Employee ID', 'Name', 'Department'] + [c.replace('_', ' ').title() for c in COLUMNS])
+        for row in monthly_timesheets(start, end, department):
+            employee = row['employee']
+            writer.writerow(
+                [employee.employee_id, employee.user.get_full_name(),
+                 employee.department.name if employee.department else '']
+                + [row[column] for column in COLUMNS]
+            )
+
+    def benchmark(self, start, end, department):
+        timings = {}
+        results = {}
+        for name, compute in (('batch', monthly_timesheets), ('naive', naive_timesheets)):
+            started = time.perf_counter()
+            results[name] = compute(start, end, department)
+            timings[name] = time.perf_counter() - started
+
+        strip = lambda rows: [(row['employee'].pk, *(row[c] for c in COLUMNS)) for row in rows]
+        if strip(results['batch']) != strip(results['naive']):
+            raise CommandError("Batch and naive timesheets disagree")
+
+        self.stdout.write(f"Employees:  {len(results['batch'])}")
+        self.stdout.write(f"Batch:      {timings['batch']:.3f}s")
+        self.stdout.write(f"Naive:      {timings['naive']:.3f}s")
+        if timings['batch']:
+            self.stdout.write(self.style.SUCCESS(f"Speedup:    {timings['naive'] / timings['batch']:.1f}x"))
@@ -0,0 +1,96 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.functional import SimpleLazyObject
+
+from .models import Employee
+
+
+def get_employee(request):
+    if not hasattr(request, '_cached_employee'):
+        if request.user.is_authenticated:
+            request._cached_employee = Employee.objects.provision(request.user)
+        else:
+            request._cached_employee = None
+    return request._cached_employee
+
+
+async def aget_employee(request):
+    """get_employee() for async views, where request.employee can't be used"""
+    if not hasattr(request, '_cached_employee'):
+        user = await request.auser()
+        # Let request.user (and the auth context processor) reuse the loaded user
+        request.user = user
+        if user.is_authenticated:
+            request._cached_employee = await Employee.objects.aprovision(user)
+        else:
+            request._cached_employee = None
+    return request._cached_employee
+
+
+class EmployeeMiddleware:
+    """
+    Set request.employee to the logged-in user's profile, resolved lazily
+    once per request (and created on first use if the user has none).
+    Must come after AuthenticationMiddleware. Works in both sync and async
+    stacks; async views should await aget_employee(request) instead.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        request.employee = SimpleLazyObject(lambda: get_employee(request))
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        return await self.get_response(request)
+
+
+# Session key holding when the session's expiry was last pushed forward
+SESSION_REFRESHED_KEY = '_session_refreshed'
+
+
+def _needs_refresh(session, refreshed):
+    return session.modified or time.time() - refreshed >= settings.SESSION_REFRESH_AFTER
+
+
+class SlidingSessionMiddleware:
+    """
+    Sliding session expiry without a write on every request. The session is
+    only marked modified (so SessionMiddleware saves it with a new expiry and
+    cookie) once SESSION_REFRESH_AFTER seconds have passed since the last
+    refresh, which makes ordinary page views read-only. Must come right after
+    SessionMiddleware, with SESSION_SAVE_EVERY_REQUEST off.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        session = request.session
+        # Nothing to extend for visitors without a session, or after logout
+        if not session.is_empty() and _needs_refresh(session, session.get(SESSION_REFRESHED_KEY, 0)):
+            session[SESSION_REFRESHED_KEY] = int(time.time())
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        session = request.session
+        if not session.is_empty() and _needs_refresh(session, await session.aget(SESSION_REFRESHED_KEY, 0)):
+            await session.aset(SESSION_REFRESHED_KEY, int(time.time()))
+        return response
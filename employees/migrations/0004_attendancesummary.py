@@ -0,0 +1,63 @@
+# Generated by Django 5.2.7 on 2026-10-18 02:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncMonth
+
+STATUS_FIELDS = {
+    'PRESENT': 'present_days',
+    'ABSENT': 'absent_days',
+    'LATE': 'late_days',
+    'HALF_DAY': 'half_days',
+}
+
+
+def backfill_summaries(apps, schema_editor):
+    """Count existing records per employee, month and status (as AttendanceSummary.objects.rebuild() does)"""
+    Attendance = apps.get_model('employees', 'Attendance')
+    AttendanceSummary = apps.get_model('employees', 'AttendanceSummary')
+    rows = (
+        Attendance.objects.order_by()
+        .annotate(month=TruncMonth('date'))
+        .values_list('employee_id', 'month', 'status')
+        .annotate(n=Count('id'))
+    )
+    built = {}
+    for employee_id, month, status, n in rows:
+        for period in (month.strftime('%Y-%m'), 'lifetime'):
+            summary = built.get((employee_id, period))
+            if summary is None:
+                summary = built[(employee_id, period)] = AttendanceSummary(employee_id=employee_id, period=period)
+            field = STATUS_FIELDS[status]
+            setattr(summary, field, getattr(summary, field) + n)
+            summary.total_days += n
+    AttendanceSummary.objects.bulk_create(built.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0003_alter_department_options_alter_department_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(max_length=8)),
+                ('present_days', models.IntegerField(default=0)),
+                ('absent_days', models.IntegerField(default=0)),
+                ('late_days', models.IntegerField(default=0)),
+                ('half_days', models.IntegerField(default=0)),
+                ('total_days', models.IntegerField(default=0)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_summaries', to='employees.employee')),
+            ],
+            options={
+                'verbose_name_plural': 'Attendance summaries',
+                'unique_together': {('employee', 'period')},
+            },
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
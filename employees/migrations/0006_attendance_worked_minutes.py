@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-18 02:27
+
+from django.db import migrations, models
+from django.db.models import Case, When
+from django.db.models.functions import ExtractHour, ExtractMinute
+from django.db.models.lookups import GreaterThan
+
+
+def backfill_worked_minutes(apps, schema_editor):
+    # Whole minutes from check-in to check-out, NULL unless positive
+    Attendance = apps.get_model('employees', 'Attendance')
+    worked = (
+        ExtractHour('check_out') * 60 + ExtractMinute('check_out')
+        - (ExtractHour('check_in') * 60 + ExtractMinute('check_in'))
+    )
+    Attendance.objects.filter(check_in__isnull=False, check_out__isnull=False).update(
+        worked_minutes=Case(When(GreaterThan(worked, 0), then=worked), default=None)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0005_attendance_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendance',
+            name='worked_minutes',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_worked_minutes, migrations.RunPython.noop),
+    ]
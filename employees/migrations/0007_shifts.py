@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-18 02:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0006_attendance_worked_minutes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Shift',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('start_time', models.TimeField()),
+                ('end_time', models.TimeField()),
+                ('grace_minutes', models.PositiveIntegerField(default=10)),
+            ],
+            options={
+                'ordering': ['start_time', 'name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='department',
+            name='shift',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='departments', to='employees.shift'),
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='shift',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='employees', to='employees.shift'),
+        ),
+    ]
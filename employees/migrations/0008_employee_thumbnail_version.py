@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 02:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0007_shifts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employee',
+            name='thumbnail_version',
+            field=models.CharField(blank=True, editable=False, max_length=12),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.7 on 2026-10-18 03:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0008_employee_thumbnail_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedYear',
+            fields=[
+                ('year', models.PositiveSmallIntegerField(primary_key=True, serialize=False)),
+                ('first_date', models.DateField()),
+                ('last_date', models.DateField()),
+                ('records', models.PositiveIntegerField(default=0)),
+                ('archived_before', models.DateField()),
+            ],
+            options={
+                'ordering': ['-year'],
+            },
+        ),
+    ]
@@ -1,29 +1,315 @@
-from django.db import models
+import threading
+from datetime import time as dt_time
+from time import monotonic
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
+from django.db.models import Case, Count, F, Max, Q, Value, When
+from django.db.models.functions import ExtractHour, ExtractMinute, TruncMonth
+from django.db.models.lookups import GreaterThan
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
+from django.utils import timezone
+
+from . import dashboard_cache, thumbnails
+
+def minute_of_day(value):
+    return value.hour * 60 + value.minute
+
+def _minute_start(minutes):
+    """The time a minute of the day starts at (the inverse of minute_of_day)"""
+    return dt_time(minutes // 60, minutes % 60)
+
+def worked_minutes_expression(check_in='check_in', check_out='check_out'):
+    """
+    Attendance.minutes_between() in SQL: whole minutes from check-in to
+    check-out, NULL unless positive. Each end is a field name or a time.
+    """
+    def minutes(value):
+        if isinstance(value, str):
+            return ExtractHour(value) * 60 + ExtractMinute(value)
+        return Value(minute_of_day(value))
+    worked = minutes(check_out) - minutes(check_in)
+    return Case(When(GreaterThan(worked, 0), then=worked), default=None)
+
+class ShiftManager(models.Manager):
+    # Shifts change rarely, so every process keeps them all in memory and
+    # reloads after CACHE_SECONDS (or at once when one is saved locally)
+    CACHE_SECONDS = 60
+    _cache = {'shifts': None, 'loaded_at': 0.0}
+    _lock = threading.Lock()
+    
+    def cached(self):
+        """All shifts keyed by id, from the in-process cache"""
+        cache = self._cache
+        with self._lock:
+            if cache['shifts'] is None or monotonic() - cache['loaded_at'] > self.CACHE_SECONDS:
+                cache['shifts'] = {shift.pk: shift for shift in self.get_queryset()}
+                cache['loaded_at'] = monotonic()
+            return cache['shifts']
+    
+    def clear_cache(self):
+        with self._lock:
+            self._cache['shifts'] = None
+    
+    def default(self):
+        """The unsaved shift built from settings, used when none is assigned"""
+        return Shift(
+            name='Default',
+            start_time=dt_time.fromisoformat(settings.ATTENDANCE_SHIFT_START),
+            end_time=dt_time.fromisoformat(settings.ATTENDANCE_SHIFT_END),
+            grace_minutes=settings.ATTENDANCE_LATE_GRACE_MINUTES,
+        )
+    
+    def resolve(self, shift_id=None, department_shift_id=None):
+        """The employee's own shift, else their department's, else the default"""
+        shifts = self.cached()
+        return shifts.get(shift_id) or shifts.get(department_shift_id) or self.default()
+    
+    def for_employee(self, employee):
+        department_shift_id = employee.department.shift_id if employee.department_id else None
+        return self.resolve(employee.shift_id, department_shift_id)
+    
+    def assignments(self, prefix='employee__'):
+        """
+        (shift, Q) pairs covering every employee exactly once, for set-based
+        queries; prefix is the path from the queried model to Employee.
+        """
+        own = f'{prefix}shift'
+        department = f'{prefix}department__shift'
+        pairs = [
+            (shift, Q(**{own: shift.pk}) | Q(**{f'{own}__isnull': True, department: shift.pk}))
+            for shift in self.cached().values()
+        ]
+        pairs.append((self.default(), Q(**{f'{own}__isnull': True, f'{department}__isnull': True})))
+        return pairs
+
+class Shift(models.Model):
+    """Working hours assigned to a department or an individual employee"""
+    name = models.CharField(max_length=50, unique=True)
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    grace_minutes = models.PositiveIntegerField(default=10)
+    
+    objects = ShiftManager()
+    
+    class Meta:
+        ordering = ['start_time', 'name']
+    
+    def __str__(self):
+        return f"{self.name} ({self.start_time:%H:%M}-{self.end_time:%H:%M})"
+    
+    @property
+    def overnight(self):
+        """Whether the shift ends the day after it starts"""
+        return self.end_time < self.start_time
+    
+    @property
+    def duration_minutes(self):
+        start = minute_of_day(self.start_time)
+        end = minute_of_day(self.end_time)
+        # Overnight shifts end the next day
+        return (end - start) % (24 * 60) or 24 * 60
+    
+    def minutes_late(self, check_in):
+        """
+        Minutes between shift start and check-in; negative when early. Only
+        overnight shifts wrap: a check-in up to their end time is the next
+        morning, so late rather than early.
+        """
+        delta = minute_of_day(check_in) - minute_of_day(self.start_time)
+        if delta < 0 and self.overnight and minute_of_day(check_in) <= minute_of_day(self.end_time):
+            delta += 24 * 60
+        return delta
+    
+    def _next_morning_q(self):
+        """Q for check-ins that minutes_late() wraps to the next morning"""
+        return Q(check_in__lt=_minute_start(minute_of_day(self.end_time) + 1))
+    
+    def late_q(self, grace_minutes=0):
+        """
+        Q for records whose check_in is more than grace_minutes late, by the
+        rule in minutes_late(). Seconds don't count there, so the comparisons
+        are against whole minutes.
+        """
+        late_from = minute_of_day(self.start_time) + grace_minutes + 1
+        if late_from < 24 * 60:
+            late = Q(check_in__gte=_minute_start(late_from))
+        else:
+            late = Q(pk__in=[])
+        if self.overnight:
+            next_morning = self._next_morning_q()
+            if late_from > 24 * 60:
+                next_morning &= Q(check_in__gte=_minute_start(late_from - 24 * 60))
+            late |= next_morning
+        return late
+    
+    def minutes_late_expression(self):
+        """minutes_late() of a record's check_in, in SQL"""
+        start = minute_of_day(self.start_time)
+        minutes = ExtractHour('check_in') * 60 + ExtractMinute('check_in') - Value(start)
+        if self.overnight:
+            minutes = minutes + Case(
+                When(self._next_morning_q(), then=Value(24 * 60)), default=Value(0)
+            )
+        return minutes
+    
+    def status_for(self, check_in):
+        """PRESENT within the grace period, HALF_DAY past mid-shift, else LATE"""
+        late = self.minutes_late(check_in)
+        if late <= self.grace_minutes:
+            return 'PRESENT'
+        if late > self.duration_minutes // 2:
+            return 'HALF_DAY'
+        return 'LATE'
 
 class Department(models.Model):
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True)
+    shift = models.ForeignKey(Shift, on_delete=models.SET_NULL, null=True, blank=True, related_name='departments')
     
     def __str__(self):
         return self.name
 
+class EmployeeManager(models.Manager):
+    def provision(self, user):
+        """
+        Return the user's employee profile, creating a default one the first
+        time it's needed. This is the only place profiles are created on the
+        fly; registration and imports create theirs explicitly.
+        """
+        try:
+            return user.employee
+        except Employee.DoesNotExist:
+            pass
+        
+        department = Department.objects.first()
+        if not department:
+            department = Department.objects.create(name='General', description='General Department')
+        employee, _ = self.get_or_create(
+            user=user,
+            defaults={'employee_id': f"EMP{user.id:03d}", 'department': department},
+        )
+        user.employee = employee
+        return employee
+    
+    async def aprovision(self, user):
+        """
+        Async provision(); free when the profile and its department were
+        loaded along with the user (see EmployeeBackend). Otherwise both are
+        loaded in a worker thread, so pages never lazy-load the department
+        inside the event loop.
+        """
+        if User.employee.is_cached(user):
+            try:
+                employee = user.employee
+            except Employee.DoesNotExist:
+                employee = None
+            if employee is not None and Employee.department.is_cached(employee):
+                return employee
+        
+        def provision():
+            employee = self.provision(user)
+            employee.department  # fetch and cache it here
+            return employee
+        return await sync_to_async(provision)()
+
 class Employee(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     employee_id = models.CharField(max_length=20, unique=True)
     department = models.ForeignKey(Department, on_delete=models.SET_NULL, null=True)
+    # Overrides the department's shift when set
+    shift = models.ForeignKey(Shift, on_delete=models.SET_NULL, null=True, blank=True, related_name='employees')
     phone = models.CharField(max_length=15, blank=True)
     address = models.TextField(blank=True)
     profile_picture = models.ImageField(upload_to='profile_pics/', blank=True, null=True)
+    # Set once thumbnails for the current picture exist (see thumbnails.py)
+    thumbnail_version = models.CharField(max_length=12, blank=True, editable=False)
     date_joined = models.DateField(auto_now_add=True)
     
+    objects = EmployeeManager()
+    
     def __str__(self):
         return f"{self.user.get_full_name()} - {self.employee_id}"
     
     def get_full_name(self):
         return self.user.get_full_name()
+    
+    def thumbnail_url(self, size='1x', fmt='jpg'):
+        if not self.thumbnail_version:
+            return None
+        return default_storage.url(thumbnails.thumbnail_name(self.pk, self.thumbnail_version, size, fmt))
+    
+    def avatar_srcset(self):
+        """srcset values per format for the profile picture thumbnails"""
+        return {
+            fmt: ', '.join(f"{self.thumbnail_url(size, fmt)} {size}" for size in thumbnails.SIZES)
+            for fmt in thumbnails.FORMATS
+        }
+
+class AttendanceQuerySet(models.QuerySet):
+    def in_range(self, start=None, end=None):
+        """Restrict to records between start and end dates (inclusive)"""
+        qs = self
+        if start:
+            qs = qs.filter(date__gte=start)
+        if end:
+            qs = qs.filter(date__lte=end)
+        return qs
+
+    def status_counts(self):
+        """Count records per status in a single GROUP BY query"""
+        counts = {code: 0 for code, _ in Attendance.ATTENDANCE_STATUS}
+        rows = self.order_by().values_list('status').annotate(n=Count('id'))
+        for status, n in rows:
+            counts[status] = n
+        counts['TOTAL'] = sum(counts.values())
+        return counts
+
+    def check_in(self, employee, date, time, status=None):
+        """
+        Record a check-in atomically. Unless given, the status comes from the
+        employee's shift. Returns the status recorded, or None if the
+        employee had already checked in that day.
+        """
+        if status is None:
+            status = Shift.objects.for_employee(employee).status_for(time)
+        try:
+            with transaction.atomic():
+                self.create(employee=employee, date=date, check_in=time, status=status)
+            return status
+        except IntegrityError:
+            pass
+        
+        # A row already exists (e.g. marked absent): claim it only if nobody checked in yet
+        today = self.filter(employee=employee, date=date)
+        old_status = today.values_list('status', flat=True).first()
+        updated = today.filter(check_in__isnull=True, status=old_status).update(
+            check_in=time, status=status
+        )
+        if updated and old_status != status:
+            AttendanceSummary.objects.adjust(employee.pk, date, old_status, -1)
+            AttendanceSummary.objects.adjust(employee.pk, date, status, 1)
+        if updated:
+            dashboard_cache.invalidate(employee.pk)
+        return status if updated else None
+
+    def check_out(self, employee, date, time):
+        """
+        Record a check-out with a single conditional UPDATE. Returns True if
+        recorded, False if not checked in yet or already checked out.
+        """
+        # Worked minutes from the stored check-in, computed in the same UPDATE
+        updated = self.filter(
+            employee=employee, date=date, check_in__isnull=False, check_out__isnull=True
+        ).update(check_out=time, worked_minutes=worked_minutes_expression(check_out=time))
+        if updated:
+            dashboard_cache.invalidate(employee.pk)
+        return bool(updated)
 
 class Attendance(models.Model):
     ATTENDANCE_STATUS = [
@@ -39,19 +325,330 @@ class Attendance(models.Model):
     check_out = models.TimeField(null=True, blank=True)
     status = models.CharField(max_length=10, choices=ATTENDANCE_STATUS, default='PRESENT')
     notes = models.TextField(blank=True)
+    # Kept in step with check_in/check_out so hours can be summed and sorted in SQL
+    worked_minutes = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    
+    objects = AttendanceQuerySet.as_manager()
     
     class Meta:
         unique_together = ['employee', 'date']
         ordering = ['-date', '-check_in']
+        indexes = [
+            models.Index(fields=['employee', 'status'], name='attendance_employee_status'),
+            models.Index(fields=['status', '-date'], name='attendance_status_date'),
+            models.Index(fields=['employee', '-date', '-check_in'], name='attendance_employee_recent'),
+            models.Index(fields=['-date', '-check_in'], name='attendance_recent'),
+        ]
+    
+    @staticmethod
+    def minutes_between(check_in, check_out):
+        """Whole minutes from check-in to check-out, or None if incomplete"""
+        if not check_in or not check_out:
+            return None
+        minutes = minute_of_day(check_out) - minute_of_day(check_in)
+        return minutes if minutes > 0 else None
+    
+    def save(self, *args, **kwargs):
+        # Values may be assigned as ISO strings; the summary receivers need dates and times
+        for name in ('date', 'check_in', 'check_out'):
+            setattr(self, name, self._meta.get_field(name).to_python(getattr(self, name)))
+        ArchivedYear.objects.check_not_archived([self.date])
+        self.worked_minutes = self.minutes_between(self.check_in, self.check_out)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'check_in', 'check_out'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'worked_minutes'}
+        super().save(*args, **kwargs)
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what was loaded so summary counters can be adjusted on save
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+    
+    def clean(self):
+        try:
+            ArchivedYear.objects.check_not_archived([self.date])
+        except ValueError as e:
+            raise ValidationError({'date': str(e)})
     
     def __str__(self):
         return f"{self.employee} - {self.date}"
 
-@receiver(post_save, sender=User)
-def create_employee_profile(sender, instance, created, **kwargs):
-    if created:
-        Employee.objects.create(user=instance)
+class AttendanceSummaryQuerySet(models.QuerySet):
+    def adjust(self, employee_id, date, status, delta):
+        """Add delta to the monthly and lifetime counters for one record"""
+        field = AttendanceSummary.STATUS_FIELDS[status]
+        changes = {field: F(field) + delta, 'total_days': F('total_days') + delta}
+        for period in (AttendanceSummary.month_key(date), AttendanceSummary.LIFETIME):
+            rows = self.filter(employee_id=employee_id, period=period)
+            if not rows.update(**changes):
+                # First record in this period: create the row, then apply the change
+                self.bulk_create(
+                    [AttendanceSummary(employee_id=employee_id, period=period)],
+                    ignore_conflicts=True,
+                )
+                rows.update(**changes)
+
+    def shift(self, employee_ids, date, from_status, to_status, chunk_size=500):
+        """
+        Move one record per employee from one status counter to another for
+        the given day's month and lifetime rows, with set-based UPDATEs.
+        from_status=None means the records are new.
+        """
+        if from_status == to_status:
+            return
+        periods = [AttendanceSummary.month_key(date), AttendanceSummary.LIFETIME]
+        to_field = AttendanceSummary.STATUS_FIELDS[to_status]
+        # Changes to existing rows, and the starting values for rows not created yet
+        changes = {to_field: F(to_field) + 1}
+        initial = {to_field: 1}
+        if from_status is None:
+            changes['total_days'] = F('total_days') + 1
+            initial['total_days'] = 1
+        else:
+            from_field = AttendanceSummary.STATUS_FIELDS[from_status]
+            changes[from_field] = F(from_field) - 1
+            initial[from_field] = -1
+        
+        employee_ids = list(employee_ids)
+        for offset in range(0, len(employee_ids), chunk_size):
+            chunk = employee_ids[offset:offset + chunk_size]
+            rows = self.filter(employee_id__in=chunk, period__in=periods)
+            existing = set(rows.values_list('employee_id', 'period'))
+            rows.update(**changes)
+            self.bulk_create(
+                [
+                    AttendanceSummary(employee_id=employee_id, period=period, **initial)
+                    for employee_id in chunk for period in periods
+                    if (employee_id, period) not in existing
+                ],
+                batch_size=chunk_size,
+            )
+
+    def apply_deltas(self, deltas):
+        """
+        Apply many counter changes at once. deltas maps (employee_id, date,
+        status) to a count; used by bulk writes that bypass the signals.
+        """
+        changes = {}
+        for (employee_id, date, status), delta in deltas.items():
+            if not delta:
+                continue
+            field = AttendanceSummary.STATUS_FIELDS[status]
+            for period in (AttendanceSummary.month_key(date), AttendanceSummary.LIFETIME):
+                per_row = changes.setdefault((employee_id, period), {})
+                per_row[field] = per_row.get(field, 0) + delta
+                per_row['total_days'] = per_row.get('total_days', 0) + delta
+        if not changes:
+            return
+        
+        with transaction.atomic():
+            existing = {
+                (summary.employee_id, summary.period): summary
+                for summary in self.select_for_update().filter(
+                    employee_id__in={employee_id for employee_id, _ in changes},
+                    period__in={period for _, period in changes},
+                )
+            }
+            to_create = []
+            for key, fields in changes.items():
+                summary = existing.get(key)
+                if summary is None:
+                    summary = AttendanceSummary(employee_id=key[0], period=key[1])
+                    to_create.append(summary)
+                for field, delta in fields.items():
+                    setattr(summary, field, getattr(summary, field) + delta)
+            self.bulk_create(to_create, batch_size=500)
+            self.bulk_update(
+                [existing[key] for key in changes if key in existing],
+                ['present_days', 'absent_days', 'late_days', 'half_days', 'total_days'],
+                batch_size=500,
+            )
+
+    def rebuild(self, employee_ids=None):
+        """
+        Recompute summaries from Attendance, for all or the given employees.
+        Archived records still count, so the archive tables are read too.
+        """
+        from .archive import archive_querysets  # archive imports this module
+        
+        sources = [Attendance.objects.order_by()]
+        sources += [queryset.order_by() for _, queryset in archive_querysets()]
+        summaries = self.all()
+        if employee_ids is not None:
+            sources = [records.filter(employee_id__in=employee_ids) for records in sources]
+            summaries = summaries.filter(employee_id__in=employee_ids)
+        
+        rows = (
+            row
+            for records in sources
+            for row in records.annotate(month=TruncMonth('date'))
+            .values_list('employee_id', 'month', 'status')
+            .annotate(n=Count('id'))
+        )
+        
+        built = {}
+        for employee_id, month, status, n in rows:
+            for period in (AttendanceSummary.month_key(month), AttendanceSummary.LIFETIME):
+                summary = built.get((employee_id, period))
+                if summary is None:
+                    summary = built[(employee_id, period)] = AttendanceSummary(
+                        employee_id=employee_id, period=period
+                    )
+                field = AttendanceSummary.STATUS_FIELDS[status]
+                setattr(summary, field, getattr(summary, field) + n)
+                summary.total_days += n
+        
+        with transaction.atomic():
+            summaries.delete()
+            self.bulk_create(built.values(), batch_size=1000)
+        if employee_ids is None:
+            dashboard_cache.clear()
+        else:
+            dashboard_cache.invalidate(*employee_ids)
+        return len(built)
+
+class AttendanceSummary(models.Model):
+    """Per-employee attendance counters, one row per month plus a lifetime row"""
+    LIFETIME = 'lifetime'
+    STATUS_FIELDS = {
+        'PRESENT': 'present_days',
+        'ABSENT': 'absent_days',
+        'LATE': 'late_days',
+        'HALF_DAY': 'half_days',
+    }
+    
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='attendance_summaries')
+    period = models.CharField(max_length=8)  # 'YYYY-MM' or 'lifetime'
+    present_days = models.IntegerField(default=0)
+    absent_days = models.IntegerField(default=0)
+    late_days = models.IntegerField(default=0)
+    half_days = models.IntegerField(default=0)
+    total_days = models.IntegerField(default=0)
+    
+    objects = AttendanceSummaryQuerySet.as_manager()
+    
+    class Meta:
+        unique_together = ['employee', 'period']
+        verbose_name_plural = 'Attendance summaries'
+    
+    def __str__(self):
+        return f"{self.employee} - {self.period}"
+    
+    @staticmethod
+    def month_key(date):
+        return date.strftime('%Y-%m')
+    
+    @classmethod
+    def lifetime_for(cls, employee):
+        """Lifetime counters for an employee (unsaved zeros if none recorded yet)"""
+        summary = cls.objects.filter(employee=employee, period=cls.LIFETIME).first()
+        return summary or cls(employee=employee, period=cls.LIFETIME)
+    
+    @classmethod
+    async def alifetime_for(cls, employee):
+        summary = await cls.objects.filter(employee=employee, period=cls.LIFETIME).afirst()
+        return summary or cls(employee=employee, period=cls.LIFETIME)
+
+class ArchivedYearManager(models.Manager):
+    def archived_before(self):
+        """Attendance dated before this has been archived (None if nothing has)"""
+        return self.aggregate(before=Max('archived_before'))['before']
+    
+    def archived_dates(self, dates):
+        """
+        The given dates that have been archived, where a live record would be
+        counted twice. The archive cutoff is never past the current month, so
+        only older dates cost a query.
+        """
+        this_month = timezone.localdate().replace(day=1)
+        older = {date for date in dates if date and date < this_month}
+        before = self.archived_before() if older else None
+        return {date for date in older if before and date < before}
+    
+    def check_not_archived(self, dates):
+        """Raise ValueError if any of the dates has been archived"""
+        archived = self.archived_dates(dates)
+        if archived:
+            raise ValueError(f"Attendance for {min(archived)} has been archived and can't be changed")
+
+class ArchivedYear(models.Model):
+    """
+    A year of attendance moved out of Attendance into its own table by the
+    archive_attendance command (see employees.archive). The dates bound the
+    records moved so far; reads use them to skip tables a range can't reach.
+    """
+    year = models.PositiveSmallIntegerField(primary_key=True)
+    first_date = models.DateField()
+    last_date = models.DateField()
+    records = models.PositiveIntegerField(default=0)
+    # The --before month of the latest run that moved records of this year
+    archived_before = models.DateField()
+    
+    objects = ArchivedYearManager()
+    
+    class Meta:
+        ordering = ['-year']
+    
+    def __str__(self):
+        return f"{self.year} ({self.records} records)"
+
+@receiver(post_save, sender=Attendance)
+def update_summary_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if not created:
+        loaded = getattr(instance, '_loaded_values', {})
+        if 'date' not in loaded or 'status' not in loaded:
+            # Previous values unknown, so the counters can't be adjusted in place
+            AttendanceSummary.objects.rebuild(employee_ids=[instance.employee_id])
+            instance._loaded_values = {'date': instance.date, 'status': instance.status}
+            return
+        old_key = (AttendanceSummary.month_key(loaded['date']), loaded['status'])
+        new_key = (AttendanceSummary.month_key(instance.date), instance.status)
+        if old_key == new_key:
+            return
+        AttendanceSummary.objects.adjust(instance.employee_id, loaded['date'], loaded['status'], -1)
+    AttendanceSummary.objects.adjust(instance.employee_id, instance.date, instance.status, 1)
+    instance._loaded_values = {'date': instance.date, 'status': instance.status}
+
+@receiver(post_delete, sender=Attendance)
+def update_summary_on_delete(sender, instance, origin=None, **kwargs):
+    origin_model = origin.model if isinstance(origin, models.QuerySet) else type(origin)
+    if origin is not None and origin_model is not Attendance:
+        # Cascading from an Employee/User delete; the summaries go with it
+        return
+    loaded = getattr(instance, '_loaded_values', {})
+    date = loaded.get('date', instance.date)
+    status = loaded.get('status', instance.status)
+    AttendanceSummary.objects.adjust(instance.employee_id, date, status, -1)
+
+
+@receiver(post_save, sender=Attendance)
+@receiver(post_delete, sender=Attendance)
+def invalidate_dashboard_for_attendance(sender, instance, **kwargs):
+    dashboard_cache.invalidate(instance.employee_id)
+
+@receiver(post_save, sender=Shift)
+@receiver(post_delete, sender=Shift)
+def clear_shift_cache(sender, **kwargs):
+    Shift.objects.clear_cache()
+
+@receiver(post_save, sender=Employee)
+def update_thumbnails(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    picture = instance.profile_picture.name if instance.profile_picture else ''
+    if picture and instance.thumbnail_version != thumbnails.version_for(picture):
+        thumbnails.schedule(instance)
+    elif not picture and instance.thumbnail_version:
+        Employee.objects.filter(pk=instance.pk).update(thumbnail_version='')
+        instance.thumbnail_version = ''
+        employee_id = instance.pk
+        transaction.on_commit(lambda: thumbnails.remove_stale(employee_id))
 
-@receiver(post_save, sender=User)
-def save_employee_profile(sender, instance, **kwargs):
-    instance.employee.save()
\ No newline at end of file
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+def invalidate_dashboard_for_employee(sender, instance, **kwargs):
+    dashboard_cache.invalidate(instance.pk)
@@ -0,0 +1,150 @@
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_date
+from django.utils.functional import cached_property
+
+
+def encode_cursor(record):
+    """Build a cursor string from a record's (date, id) key"""
+    return f"{record.date.isoformat()}.{record.pk}"
+
+
+def decode_cursor(cursor):
+    """Parse a cursor string back into a (date, id) tuple, or None if invalid"""
+    try:
+        date_part, pk_part = cursor.split('.', 1)
+        date = parse_date(date_part)
+        pk = int(pk_part)
+    except (AttributeError, ValueError):
+        return None
+    if date is None:
+        return None
+    return date, pk
+
+
+class KeysetPage:
+    """A page of records ordered newest first by (date, id)"""
+
+    def __init__(self, object_list, has_next, has_previous):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if self._has_next and self.object_list:
+            return encode_cursor(self.object_list[-1])
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self._has_previous and self.object_list:
+            return encode_cursor(self.object_list[0])
+        return None
+
+
+def _record_key(record):
+    return record.date, record.pk
+
+
+def paginate_keyset(queryset, after=None, before=None, per_page=20, older=()):
+    """
+    Seek pagination on (date, id) instead of OFFSET, so every page costs
+    the same no matter how deep into the history it is.
+
+    older holds (last date, queryset) pairs for records kept elsewhere, such
+    as the attendance archive, none dated after its last date. Each is only
+    queried when the page reaches back that far.
+    """
+    before_key = decode_cursor(before) if before else None
+    after_key = decode_cursor(after) if after else None
+
+    if before_key:
+        date, pk = before_key
+        newer = Q(date__gt=date) | Q(date=date, id__gt=pk)
+        rows = list(queryset.filter(newer).order_by('date', 'id')[:per_page + 1])
+        for last_date, extra in older:
+            if last_date >= date:
+                rows += extra.filter(newer).order_by('date', 'id')[:per_page + 1]
+                rows = sorted(rows, key=_record_key)[:per_page + 1]
+        has_previous = len(rows) > per_page
+        rows = rows[:per_page]
+        rows.reverse()
+        return KeysetPage(rows, has_next=True, has_previous=has_previous)
+
+    sources = [queryset] + [extra for _, extra in older]
+    if after_key:
+        date, pk = after_key
+        sources = [source.filter(Q(date__lt=date) | Q(date=date, id__lt=pk)) for source in sources]
+
+    rows = list(sources[0].order_by('-date', '-id')[:per_page + 1])
+    for (last_date, _), extra in zip(older, sources[1:]):
+        if len(rows) > per_page and rows[per_page].date > last_date:
+            break  # this page ends before the older records start
+        rows += extra.order_by('-date', '-id')[:per_page + 1]
+        rows = sorted(rows, key=_record_key, reverse=True)[:per_page + 1]
+    has_next = len(rows) > per_page
+    return KeysetPage(rows[:per_page], has_next=has_next, has_previous=after_key is not None)
+
+
+def estimated_row_count(model, using='default'):
+    """
+    The planner's row estimate for a model's table, or None if the database
+    has none: PostgreSQL's reltuples, or SQLite's sqlite_stat1 after ANALYZE.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [table])
+        elif connection.vendor == 'sqlite':
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            if cursor.fetchone() is None:
+                return None
+            # The first number in an index's stat is the table's row count
+            cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1", [table])
+        else:
+            return None
+        row = cursor.fetchone()
+    if not row or row[0] is None:
+        return None
+    count = int(str(row[0]).split()[0])
+    return count if count >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for very large tables that never counts more than COUNT_LIMIT
+    rows. Past that, unfiltered lists use the planner's row estimate (so the
+    page count is approximate) and filtered ones stop at COUNT_LIMIT rows;
+    narrow the filters to reach the rest.
+    """
+    COUNT_LIMIT = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        capped = queryset.order_by()[:self.COUNT_LIMIT + 1].count()
+        if capped <= self.COUNT_LIMIT:
+            return capped
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate:
+                return max(estimate, capped)
+        return self.COUNT_LIMIT
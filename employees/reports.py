@@ -0,0 +1,109 @@
+"""
+Department attendance analytics.
+
+Everything is aggregated in the database with GROUP BY over Attendance
+joined to Employee, so the cost depends on the number of days and employees
+shown rather than on the number of attendance rows read in Python.
+"""
+from datetime import timedelta
+
+from django.db.models import Avg, Count, Q
+from django.db.models.functions import TruncWeek
+
+from .models import Attendance, Employee
+
+ATTENDED = ['PRESENT', 'LATE', 'HALF_DAY']
+
+
+def _hours(minutes):
+    return round(minutes / 60, 2) if minutes else None
+
+
+def department_records(department, start, end):
+    return Attendance.objects.filter(employee__department=department, date__gte=start, date__lte=end)
+
+
+def daily_stats(department, start, end):
+    """One row per day with status counts, rates against headcount and average hours"""
+    headcount = Employee.objects.filter(department=department).count()
+    rows = (
+        department_records(department, start, end)
+        .order_by()
+        .values('date')
+        .annotate(
+            present=Count('id', filter=Q(status='PRESENT')),
+            late=Count('id', filter=Q(status='LATE')),
+            half_day=Count('id', filter=Q(status='HALF_DAY')),
+            absent=Count('id', filter=Q(status='ABSENT')),
+            avg_worked=Avg('worked_minutes'),
+        )
+        .order_by('date')
+    )
+    days = []
+    for row in rows:
+        attended = row['present'] + row['late'] + row['half_day']
+        avg_worked = row.pop('avg_worked')
+        days.append({
+            **row,
+            'avg_hours': _hours(avg_worked),
+            'present_rate': attended / headcount if headcount else 0,
+            'late_rate': row['late'] / headcount if headcount else 0,
+            # Days nobody recorded count as absent too
+            'absent_rate': (headcount - attended) / headcount if headcount else 0,
+        })
+    return headcount, days
+
+
+def weeks_in_range(start, end):
+    """Monday of every week overlapping the range"""
+    week = start - timedelta(days=start.weekday())
+    weeks = []
+    while week <= end:
+        weeks.append(week)
+        week += timedelta(days=7)
+    return weeks
+
+
+def employee_heatmap(employees, start, end):
+    """
+    Attended days per employee per week for the given employees, plus their
+    totals for the range. Returns (weeks, rows) ready for the template.
+    """
+    weeks = weeks_in_range(start, end)
+    records = Attendance.objects.filter(
+        employee_id__in=[employee.pk for employee in employees], date__gte=start, date__lte=end
+    ).order_by()
+
+    cells = (
+        records.annotate(week=TruncWeek('date'))
+        .values_list('employee_id', 'week')
+        .annotate(attended=Count('id', filter=Q(status__in=ATTENDED)))
+    )
+    attended_by_week = {(employee_id, week): attended for employee_id, week, attended in cells}
+
+    totals = {
+        row['employee_id']: row
+        for row in records.values('employee_id').annotate(
+            attended=Count('id', filter=Q(status__in=ATTENDED)),
+            late=Count('id', filter=Q(status='LATE')),
+            absent=Count('id', filter=Q(status='ABSENT')),
+            avg_worked=Avg('worked_minutes'),
+        )
+    }
+
+    rows = []
+    for employee in employees:
+        total = totals.get(employee.pk, {})
+        row_cells = []
+        for week in weeks:
+            attended = attended_by_week.get((employee.pk, week), 0)
+            row_cells.append({'week': week, 'attended': attended, 'level': min(attended, 5) / 5})
+        rows.append({
+            'employee': employee,
+            'cells': row_cells,
+            'attended': total.get('attended', 0),
+            'late': total.get('late', 0),
+            'absent': total.get('absent', 0),
+            'avg_hours': _hours(total.get('avg_worked')),
+        })
+    return weeks, rows
@@ -0,0 +1,22 @@
+"""
+SQLite connection tuning.
+
+Every new SQLite connection gets the PRAGMAs from settings.SQLITE_PRAGMAS so
+concurrent check-ins wait for the write lock instead of failing. Other
+database vendors are left untouched.
+"""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+            if name == 'journal_mode' and connection.is_in_memory_db():
+                # In-memory databases (the test database) can't use WAL
+                continue
+            cursor.execute(f'PRAGMA {name} = {value}')
@@ -0,0 +1,195 @@
+"""
+Production static files without a separate web server or CDN.
+
+collectstatic (through CompressedManifestStaticFilesStorage) writes every file
+under a content-hashed name and, for text formats, gzip and brotli variants
+next to it. StaticFilesMiddleware then serves STATIC_ROOT from memory-resident
+metadata: the best precompressed variant the client accepts, with immutable
+far-future caching for hashed names and a short max-age for the rest.
+
+Brotli variants need the optional brotli package; without it only gzip ones
+are written.
+"""
+import gzip
+import mimetypes
+import os
+import posixpath
+from urllib.parse import urlsplit
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse, HttpResponse, HttpResponseNotAllowed, HttpResponseNotModified
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Formats worth compressing; images and fonts are compressed already
+COMPRESSIBLE = {'.css', '.js', '.mjs', '.map', '.json', '.svg', '.txt', '.xml', '.html', '.ico', '.ttf', '.eot'}
+# Variants that don't save at least this fraction of the original aren't kept
+MIN_SAVING = 0.05
+# Preferred first
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+def _compressors():
+    yield '.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0)
+    if brotli is not None:
+        yield '.br', lambda data: brotli.compress(data, quality=11)
+
+
+def compress_file(path):
+    """Write .gz (and .br) variants of a file; returns the suffixes written"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    written = []
+    for suffix, compress in _compressors():
+        compressed = compress(data)
+        if len(compressed) <= len(data) * (1 - MIN_SAVING):
+            with open(path + suffix, 'wb') as f:
+                f.write(compressed)
+            written.append(suffix)
+        elif os.path.exists(path + suffix):
+            # An older, now unhelpful variant would still be served
+            os.remove(path + suffix)
+    return written
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    ManifestStaticFilesStorage that also precompresses the collected files,
+    under both their original and hashed names. Before collectstatic has run
+    (no manifest at all) URLs fall back to the plain names, so development
+    and tests work without collecting.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        names = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception):
+                names.update((name, hashed_name))
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        for name in sorted(names):
+            if os.path.splitext(name)[1].lower() in COMPRESSIBLE:
+                compress_file(self.path(name))
+
+    def stored_name(self, name):
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+
+class StaticFile:
+    __slots__ = ('path', 'content_type', 'size', 'etag', 'cache_control', 'variants')
+
+    def __init__(self, path, immutable):
+        stat = os.stat(path)
+        self.path = path
+        self.content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        if self.content_type.startswith('text/') or self.content_type in ('application/javascript', 'application/json'):
+            self.content_type += '; charset=utf-8'
+        self.size = stat.st_size
+        self.etag = f'W/"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        self.cache_control = IMMUTABLE if immutable else f'public, max-age={settings.STATIC_FALLBACK_MAX_AGE}'
+        self.variants = [
+            (encoding, path + suffix, os.path.getsize(path + suffix))
+            for encoding, suffix in ENCODINGS
+            if os.path.isfile(path + suffix)
+        ]
+
+
+def _accepted_encodings(request):
+    accepted = set()
+    for part in request.headers.get('Accept-Encoding', '').split(','):
+        coding, _, params = part.partition(';')
+        params = params.replace(' ', '')
+        try:
+            weight = float(params[2:]) if params.startswith('q=') else 1
+        except ValueError:
+            weight = 1
+        if weight > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def scan(root, static_url, hashed_names):
+    """Map URL paths to StaticFile entries for every file under root"""
+    files = {}
+    compressed_suffixes = tuple(suffix for _, suffix in ENCODINGS)
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            if filename.endswith(compressed_suffixes):
+                continue
+            path = os.path.join(directory, filename)
+            name = os.path.relpath(path, root).replace(os.sep, '/')
+            files[posixpath.join(static_url, name)] = StaticFile(path, immutable=name in hashed_names)
+    return files
+
+
+class StaticFilesMiddleware:
+    """
+    Serve collected static files in process. Files are indexed once at
+    startup (run collectstatic, then restart), so a request costs a dict
+    lookup and a sendfile. Goes right after SecurityMiddleware, so static
+    requests skip sessions and authentication. Not used when STATIC_ROOT
+    hasn't been collected, where the staticfiles app serves in development.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.STATIC_ROOT or not os.path.isdir(settings.STATIC_ROOT):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+        self.prefix = urlsplit(settings.STATIC_URL).path
+        hashed_names = set(getattr(staticfiles_storage, 'hashed_files', {}).values())
+        self.files = scan(settings.STATIC_ROOT, self.prefix, hashed_names)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(request, static_file)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(request, static_file)
+        return await self.get_response(request)
+
+    def serve(self, request, static_file):
+        if request.method not in ('GET', 'HEAD'):
+            return HttpResponseNotAllowed(['GET', 'HEAD'])
+
+        if request.headers.get('If-None-Match') == static_file.etag:
+            response = HttpResponseNotModified()
+        else:
+            path, size, encoding = static_file.path, static_file.size, None
+            accepted = _accepted_encodings(request)
+            for variant_encoding, variant_path, variant_size in static_file.variants:
+                if variant_encoding in accepted:
+                    path, size, encoding = variant_path, variant_size, variant_encoding
+                    break
+            if request.method == 'HEAD':
+                response = HttpResponse(content_type=static_file.content_type)
+            else:
+                response = FileResponse(open(path, 'rb'), content_type=static_file.content_type)
+            response['Content-Length'] = size
+            if encoding:
+                response['Content-Encoding'] = encoding
+
+        response['ETag'] = static_file.etag
+        response['Cache-Control'] = static_file.cache_control
+        if static_file.variants:
+            response['Vary'] = 'Accept-Encoding'
+        return response
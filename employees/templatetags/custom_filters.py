@@ -1,5 +1,4 @@
 from django import template
-from datetime import datetime
 
 register = template.Library()
 
@@ -37,29 +36,16 @@ def mod(value, arg):
 
 @register.filter
 def calculate_working_hours(attendance):
-    """Calculate working hours for an attendance record"""
-    if not attendance.check_in or not attendance.check_out:
+    """Format an attendance record's stored worked minutes, e.g. '7h 30m'"""
+    total_minutes = getattr(attendance, 'worked_minutes', None)
+    if not total_minutes:
         return "--"
     
-    try:
-        # Convert times to minutes since midnight
-        check_in_minutes = attendance.check_in.hour * 60 + attendance.check_in.minute
-        check_out_minutes = attendance.check_out.hour * 60 + attendance.check_out.minute
-        
-        total_minutes = check_out_minutes - check_in_minutes
-        
-        if total_minutes <= 0:
-            return "--"
-        
-        hours = total_minutes // 60
-        minutes = total_minutes % 60
-        
-        if hours > 0 and minutes > 0:
-            return f"{hours}h {minutes}m"
-        elif hours > 0:
-            return f"{hours}h"
-        else:
-            return f"{minutes}m"
-            
-    except (AttributeError, TypeError):
-        return "--"
\ No newline at end of file
+    hours, minutes = divmod(total_minutes, 60)
+    
+    if hours > 0 and minutes > 0:
+        return f"{hours}h {minutes}m"
+    elif hours > 0:
+        return f"{hours}h"
+    else:
+        return f"{minutes}m"
\ No newline at end of file
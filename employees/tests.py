@@ -1,3 +1,1401 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import os
+import re
+import tempfile
+import unittest
+from collections import Counter
+from unittest import mock
+from datetime import date, time, timedelta
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import path
+from django.utils import timezone
+from PIL import Image
+
+from attendance import urls as project_urls
+
+from . import archive, dashboard_cache, exports, instrumentation, loadtest, thumbnails, views
+from .checkins import apply_events
+from .closing import close_day
+from .middleware import SESSION_REFRESHED_KEY
+from .models import (
+    ArchivedYear, Attendance, AttendanceSummary, Department, Employee, Shift, worked_minutes_expression,
+)
+from .pagination import EstimatedCountPaginator, decode_cursor, paginate_keyset
+from .timesheets import monthly_timesheets, naive_timesheets
+
+
+class SummaryAssertions:
+    def summary_rows(self):
+        return sorted(
+            AttendanceSummary.objects.exclude(total_days=0, present_days=0, absent_days=0, late_days=0, half_days=0)
+            .values_list('employee_id', 'period', 'present_days', 'absent_days', 'late_days', 'half_days', 'total_days')
+        )
+
+    def assertSummariesMatchRebuild(self):
+        """The incrementally kept counters equal a rebuild from the records"""
+        counters = self.summary_rows()
+        AttendanceSummary.objects.rebuild()
+        self.assertEqual(counters, self.summary_rows())
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', "EXPLAIN QUERY PLAN is SQLite specific")
+class AttendanceQueryPlanTests(TestCase):
+    """Fail if any query against the attendance tables falls back to a full table scan"""
+
+    FULL_SCAN = re.compile(r'^SCAN employees_attendance\w*$')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(name='IT')
+        cls.user = User.objects.create_superuser('admin@example.com', 'admin@example.com', 'pw')
+        employee = Employee.objects.create(user=cls.user, employee_id='EMP001', department=cls.department)
+        statuses = ['PRESENT', 'LATE', 'ABSENT']
+        for i in range(30):
+            Attendance.objects.create(
+                employee=employee,
+                date=date(2024, 1, 1) + timedelta(days=i),
+                status=statuses[i % 3],
+            )
+
+    def setUp(self):
+        # Start cold so cached dashboard fragments don't hide the queries
+        caches[settings.DASHBOARD_CACHE_ALIAS].clear()
+        self.client.force_login(self.user)
+
+    def assertNoFullScans(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        checked = 0
+        for query in ctx.captured_queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT') or 'employees_attendance' not in sql:
+                continue
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                plan = [row[-1] for row in cursor.fetchall()]
+            scans = [step for step in plan if self.FULL_SCAN.match(step)]
+            self.assertFalse(scans, f"Full table scan for {url}:\n{sql}\n{plan}")
+            checked += 1
+        self.assertTrue(checked, f"No attendance queries captured for {url}")
+
+    def test_dashboard(self):
+        self.assertNoFullScans('/dashboard/')
+
+    def test_attendance_history(self):
+        self.assertNoFullScans('/attendance-history/')
+
+    def test_attendance_history_filtered_page(self):
+        self.assertNoFullScans('/attendance-history/?start=2024-01-05&end=2024-01-25&after=2024-01-20.20')
+
+    def test_admin_changelist(self):
+        self.assertNoFullScans('/admin/employees/attendance/')
+
+    def test_admin_status_filter(self):
+        self.assertNoFullScans('/admin/employees/attendance/?status__exact=LATE')
+
+    def test_admin_department_filter(self):
+        self.assertNoFullScans(f'/admin/employees/attendance/?employee__department__id__exact={self.department.pk}')
+
+    def test_admin_month_filter(self):
+        self.assertNoFullScans('/admin/employees/attendance/?month=2024-01')
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', "SQLite PRAGMAs")
+class SQLitePragmaTests(TestCase):
+    def pragma(self, name, using=connection):
+        with using.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied_per_connection(self):
+        self.assertEqual(self.pragma('busy_timeout'), settings.SQLITE_PRAGMAS['busy_timeout'])
+        self.assertEqual(self.pragma('temp_store'), 2)  # MEMORY
+
+    def test_wal_only_when_configured(self):
+        self.assertNotIn('journal_mode', settings.SQLITE_PRAGMAS)
+        with tempfile.TemporaryDirectory() as directory:
+            pragmas = {**settings.SQLITE_PRAGMAS, 'journal_mode': 'WAL', 'synchronous': 'NORMAL'}
+            with override_settings(SQLITE_PRAGMAS=pragmas):
+                default = connections['default']
+                other = type(default)({**default.settings_dict, 'NAME': os.path.join(directory, 'db')}, 'wal')
+                try:
+                    self.assertEqual(self.pragma('journal_mode', other), 'wal')
+                    self.assertEqual(self.pragma('synchronous', other), 1)  # NORMAL
+                finally:
+                    other.close()
+
+
+class ProfileProvisioningTests(TestCase):
+    """Logging in or saving a User must not write to the employee table"""
+
+    # user lookup, profile lookup, session create (exists check + insert),
+    # last_login update and the end-of-request session save
+    LOGIN_QUERIES = 10
+
+    def setUp(self):
+        self.user = User.objects.create_user('staff@example.com', 'staff@example.com', 'pw')
+        Employee.objects.create(user=self.user, employee_id='EMP001')
+
+    def login(self):
+        # Password hashing can also trip the slow request warning
+        with self.assertLogs('employees', 'INFO') as logs, CaptureQueriesContext(connection) as ctx:
+            response = self.client.post('/login/', {'username': 'staff@example.com', 'password': 'pw'})
+        self.assertRedirects(response, '/dashboard/', fetch_redirect_response=False)
+        self.assertIn('INFO:employees.views:login succeeded user=staff@example.com', logs.output)
+        return ctx.captured_queries
+
+    def test_login_query_count_is_fixed(self):
+        for _ in range(2):
+            queries = self.login()
+            self.assertEqual(len(queries), self.LOGIN_QUERIES, [q['sql'] for q in queries])
+            self.client.logout()
+
+    def test_login_does_not_write_employee(self):
+        writes = [
+            q['sql'] for q in self.login()
+            if 'employees_employee' in q['sql'] and not q['sql'].startswith('SELECT')
+        ]
+        self.assertEqual(writes, [])
+
+    def test_model_backend_sessions_stay_valid(self):
+        self.client.force_login(self.user, backend='django.contrib.auth.backends.ModelBackend')
+        self.assertEqual(self.client.get('/dashboard/').status_code, 200)
+
+    def test_user_save_does_not_touch_employee(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.user.first_name = 'Sam'
+            self.user.save()
+        self.assertFalse([q for q in ctx.captured_queries if 'employees_employee' in q['sql']])
+
+    def test_register_creates_one_profile(self):
+        department = Department.objects.create(name='IT')
+        with self.assertLogs('employees', 'INFO') as logs:
+            response = self.client.post('/register/', {
+                'full_name': 'New Person',
+                'email': 'new@example.com',
+                'employee_id': 'EMP002',
+                'department': department.pk,
+                'password1': 'pw-12345',
+                'password2': 'pw-12345',
+            })
+        self.assertRedirects(response, '/dashboard/', fetch_redirect_response=False)
+        self.assertIn('INFO:employees.views:registered user=new@example.com employee_id=EMP002', logs.output)
+        employee = Employee.objects.get(user__username='new@example.com')
+        self.assertEqual(employee.employee_id, 'EMP002')
+        self.assertEqual(employee.department, department)
+
+    def test_provision_creates_missing_profile_once(self):
+        user = User.objects.create_user('other@example.com', 'other@example.com', 'pw')
+        first = Employee.objects.provision(user)
+        again = Employee.objects.provision(User.objects.get(pk=user.pk))
+        self.assertEqual(first.pk, again.pk)
+        self.assertEqual(Employee.objects.filter(user=user).count(), 1)
+
+
+class ShiftClassificationTests(TestCase):
+    """Check-ins get their status from the applicable shift when written"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.early = Shift.objects.create(name='Early', start_time=time(6, 0), end_time=time(14, 0), grace_minutes=5)
+        cls.night = Shift.objects.create(name='Night', start_time=time(22, 0), end_time=time(6, 0), grace_minutes=0)
+        cls.department = Department.objects.create(name='Warehouse', shift=cls.early)
+        user = User.objects.create_user('worker', password='pw')
+        cls.employee = Employee.objects.create(user=user, employee_id='EMP100', department=cls.department)
+
+    def setUp(self):
+        Shift.objects.clear_cache()
+
+    def check_in(self, at, day=date(2024, 3, 4)):
+        return Attendance.objects.check_in(self.employee, day, at)
+
+    def test_department_shift(self):
+        self.assertEqual(self.check_in(time(6, 5)), 'PRESENT')
+        self.assertEqual(self.check_in(time(6, 6), date(2024, 3, 5)), 'LATE')
+        self.assertEqual(self.check_in(time(10, 1), date(2024, 3, 6)), 'HALF_DAY')
+        self.assertEqual(AttendanceSummary.lifetime_for(self.employee).late_days, 1)
+
+    def test_employee_shift_overrides_department(self):
+        self.employee.shift = self.night
+        self.assertEqual(self.check_in(time(21, 50)), 'PRESENT')
+        self.assertEqual(self.check_in(time(0, 30), date(2024, 3, 5)), 'LATE')
+
+    def test_late_evening_check_in(self):
+        self.assertEqual(self.check_in(time(18, 30)), 'HALF_DAY')
+        self.assertEqual(self.early.minutes_late(time(23, 59)), 17 * 60 + 59)
+
+    def test_overnight_shift(self):
+        self.assertEqual(self.night.minutes_late(time(21, 50)), -10)
+        self.assertEqual(self.night.minutes_late(time(3, 0)), 5 * 60)
+        self.assertEqual(self.night.minutes_late(time(12, 0)), -10 * 60)
+        self.employee.shift = self.night
+        self.assertEqual(self.check_in(time(23, 0)), 'LATE')
+        self.assertEqual(self.check_in(time(3, 0), date(2024, 3, 5)), 'HALF_DAY')
+
+    def test_sql_paths_use_the_same_rule(self):
+        self.employee.shift = self.night
+        self.employee.save()
+        times = [time(21, 50), time(22, 0), time(23, 0), time(3, 0), time(12, 0), time(6, 0)]
+        days = [date(2024, 3, 4) + timedelta(days=i) for i in range(len(times))]
+        Attendance.objects.bulk_create([
+            Attendance(employee=self.employee, date=day, check_in=at, check_out=time(23, 59), status='PRESENT')
+            for day, at in zip(days, times)
+        ])
+        for day in days:
+            close_day(day)
+        self.assertEqual(
+            list(Attendance.objects.order_by('date').values_list('status', flat=True)),
+            ['PRESENT', 'PRESENT', 'LATE', 'LATE', 'PRESENT', 'LATE'],
+        )
+        late = sum(max(self.night.minutes_late(at), 0) for at in times)
+        self.assertEqual(late, 60 + 5 * 60 + 8 * 60)
+        self.assertEqual(monthly_timesheets(days[0], days[-1])[0]['late_minutes'], late)
+        self.assertEqual(naive_timesheets(days[0], days[-1])[0]['late_minutes'], late)
+
+    def test_seconds_do_not_count(self):
+        self.assertEqual(self.check_in(time(6, 5, 30)), 'PRESENT')
+        self.assertEqual(self.check_in(time(6, 6, 0), date(2024, 3, 5)), 'LATE')
+        self.assertEqual(self.night.minutes_late(time(6, 0, 30)), 8 * 60)
+        Attendance.objects.update(check_out=time(14, 0))
+        close_day(date(2024, 3, 4))
+        self.assertEqual(Attendance.objects.get(date=date(2024, 3, 4)).status, 'PRESENT')
+        self.assertFalse(Attendance.objects.filter(self.early.late_q(5), date=date(2024, 3, 4)).exists())
+        self.assertTrue(Attendance.objects.filter(self.early.late_q(5), date=date(2024, 3, 5)).exists())
+
+        self.employee.shift = self.night
+        self.employee.save()
+        Attendance.objects.create(employee=self.employee, date=date(2024, 3, 6), check_in=time(6, 0, 30), status='LATE')
+        record = Attendance.objects.filter(date=date(2024, 3, 6)).annotate(
+            late=self.night.minutes_late_expression()
+        ).filter(self.night.late_q()).get()
+        self.assertEqual(record.late, 8 * 60)
+
+    def test_default_shift_from_settings(self):
+        self.department.shift = None
+        self.assertEqual(self.check_in(time(9, 10)), 'PRESENT')
+        self.assertEqual(self.check_in(time(9, 11), date(2024, 3, 5)), 'LATE')
+
+    def test_shifts_resolved_from_cache(self):
+        self.check_in(time(6, 0))
+        with CaptureQueriesContext(connection) as ctx:
+            self.check_in(time(6, 0), date(2024, 3, 5))
+        self.assertFalse([q for q in ctx.captured_queries if 'employees_shift' in q['sql']])
+
+    def test_batch_events_use_shift(self):
+        results = apply_events([
+            {'employee_id': 'EMP100', 'action': 'check_in', 'timestamp': '2024-03-04T07:00:00Z'},
+        ])
+        self.assertEqual(results[0]['status'], 'LATE')
+        self.assertEqual(Attendance.objects.get(employee=self.employee).status, 'LATE')
+
+
+class AttendanceSummaryTests(SummaryAssertions, TestCase):
+    """The counters kept by the Attendance receivers and apply_deltas() match a rebuild"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.employee = Employee.objects.create(user=User.objects.create_user('counted'), employee_id='EMP800')
+
+    def create(self, day=date(2024, 3, 4), status='PRESENT'):
+        return Attendance.objects.create(employee=self.employee, date=day, status=status)
+
+    def lifetime(self):
+        summary = AttendanceSummary.lifetime_for(self.employee)
+        return summary.total_days, summary.present_days, summary.late_days, summary.absent_days
+
+    def test_create(self):
+        self.create()
+        self.create(date(2024, 3, 5), 'LATE')
+        self.assertEqual(self.lifetime(), (2, 1, 1, 0))
+        self.assertSummariesMatchRebuild()
+
+    def test_status_change(self):
+        record = self.create()
+        record.status = 'ABSENT'
+        record.save()
+        self.assertEqual(self.lifetime(), (1, 0, 0, 1))
+        self.assertSummariesMatchRebuild()
+
+    def test_month_change(self):
+        record = self.create(date(2024, 3, 31))
+        record.date = date(2024, 4, 1)
+        record.save()
+        months = dict(
+            AttendanceSummary.objects.exclude(period=AttendanceSummary.LIFETIME).values_list('period', 'total_days')
+        )
+        self.assertEqual(months, {'2024-03': 0, '2024-04': 1})
+        self.assertSummariesMatchRebuild()
+
+    def test_delete(self):
+        self.create().delete()
+        self.create(date(2024, 3, 5), 'LATE')
+        self.assertEqual(self.lifetime(), (1, 0, 1, 0))
+        self.assertSummariesMatchRebuild()
+
+    def test_save_without_loaded_values(self):
+        self.create()
+        Attendance.objects.filter(employee=self.employee).update(status='LATE')
+        record = Attendance.objects.only('id', 'employee_id').get()
+        record.save()
+        self.assertEqual(self.lifetime(), (1, 0, 1, 0))
+        self.assertSummariesMatchRebuild()
+
+    def test_apply_deltas(self):
+        Attendance.objects.bulk_create([
+            Attendance(employee=self.employee, date=date(2024, 3, 4), status='PRESENT'),
+            Attendance(employee=self.employee, date=date(2024, 4, 1), status='LATE'),
+        ])
+        AttendanceSummary.objects.apply_deltas(Counter({
+            (self.employee.pk, date(2024, 3, 4), 'PRESENT'): 1,
+            (self.employee.pk, date(2024, 4, 1), 'LATE'): 1,
+        }))
+        self.assertEqual(self.lifetime(), (2, 1, 1, 0))
+        self.assertSummariesMatchRebuild()
+
+
+class CheckInOutTests(SummaryAssertions, TestCase):
+    """check_in() and check_out() are single conditional writes that never double-record"""
+    DAY = date(2024, 3, 4)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('clocking', password='pw')
+        cls.employee = Employee.objects.create(user=cls.user, employee_id='EMP900')
+
+    def setUp(self):
+        Shift.objects.clear_cache()
+
+    def test_double_check_in(self):
+        self.assertEqual(Attendance.objects.check_in(self.employee, self.DAY, time(9, 0)), 'PRESENT')
+        self.assertIsNone(Attendance.objects.check_in(self.employee, self.DAY, time(9, 30)))
+        record = Attendance.objects.get()
+        self.assertEqual((record.check_in, record.status), (time(9, 0), 'PRESENT'))
+        self.assertSummariesMatchRebuild()
+
+    def test_check_in_claims_existing_row(self):
+        # The unique (employee, date) insert fails, as it would if another request won the race
+        Attendance.objects.create(employee=self.employee, date=self.DAY, status='ABSENT')
+        self.assertEqual(Attendance.objects.check_in(self.employee, self.DAY, time(9, 20)), 'LATE')
+        record = Attendance.objects.get()
+        self.assertEqual((record.check_in, record.status), (time(9, 20), 'LATE'))
+        self.assertSummariesMatchRebuild()
+
+    def test_check_out_without_check_in(self):
+        self.assertFalse(Attendance.objects.check_out(self.employee, self.DAY, time(17, 0)))
+        self.assertFalse(Attendance.objects.exists())
+        Attendance.objects.create(employee=self.employee, date=self.DAY, status='ABSENT')
+        self.assertFalse(Attendance.objects.check_out(self.employee, self.DAY, time(17, 0)))
+        self.assertIsNone(Attendance.objects.get().check_out)
+
+    def test_double_check_out(self):
+        Attendance.objects.check_in(self.employee, self.DAY, time(9, 0))
+        self.assertTrue(Attendance.objects.check_out(self.employee, self.DAY, time(17, 0)))
+        self.assertFalse(Attendance.objects.check_out(self.employee, self.DAY, time(18, 0)))
+        self.assertEqual(Attendance.objects.get().check_out, time(17, 0))
+
+    def test_viewing_the_page_writes_nothing(self):
+        self.client.force_login(self.user)
+        self.client.get('/mark-attendance/')
+        self.assertFalse(Attendance.objects.exists())
+        response = self.client.post('/mark-attendance/', {'action': 'check_out'}, follow=True)
+        self.assertFalse(Attendance.objects.exists())
+        self.assertEqual([str(m) for m in response.context['messages']], ['Please check in first before checking out'])
+
+
+class WorkedMinutesTests(TestCase):
+    """worked_minutes is kept in step with check_in/check_out by save() and the set-based writes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.employee = Employee.objects.create(user=User.objects.create_user('minutes'), employee_id='EMP920')
+
+    def test_save_computes_worked_minutes(self):
+        record = Attendance.objects.create(employee=self.employee, date=date(2024, 3, 4), check_in=time(9, 0))
+        self.assertIsNone(record.worked_minutes)
+        record.check_out = time(17, 15)
+        record.save(update_fields=['check_out'])
+        record.refresh_from_db()
+        self.assertEqual(record.worked_minutes, 495)
+        record.check_out = time(8, 0)
+        record.save()
+        self.assertIsNone(record.worked_minutes)
+
+    def test_check_out_update(self):
+        day = date(2024, 3, 4)
+        Attendance.objects.create(employee=self.employee, date=day, check_in=time(9, 0))
+        Attendance.objects.check_out(self.employee, day, time(12, 30))
+        self.assertEqual(Attendance.objects.get().worked_minutes, 210)
+
+        Attendance.objects.create(employee=self.employee, date=day + timedelta(days=1), check_in=time(9, 0))
+        Attendance.objects.check_out(self.employee, day + timedelta(days=1), time(8, 59))
+        self.assertIsNone(Attendance.objects.get(date=day + timedelta(days=1)).worked_minutes)
+
+    def test_expression_matches_minutes_between(self):
+        times = [(time(9, 0), time(17, 30)), (time(9, 0), time(9, 0)), (time(10, 0), time(9, 0)), (time(9, 0), None)]
+        Attendance.objects.bulk_create([
+            Attendance(employee=self.employee, date=date(2024, 3, 1) + timedelta(days=i), check_in=check_in, check_out=check_out)
+            for i, (check_in, check_out) in enumerate(times)
+        ])
+        Attendance.objects.update(worked_minutes=worked_minutes_expression())
+        self.assertEqual(
+            list(Attendance.objects.order_by('date').values_list('worked_minutes', flat=True)),
+            [Attendance.minutes_between(check_in, check_out) for check_in, check_out in times],
+        )
+
+
+class KeysetPaginationTests(TestCase):
+    """History pages seek on (date, id), newest first"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.employees = [
+            Employee.objects.create(user=User.objects.create_user(f'kp{i}', password='pw'), employee_id=f'KP{i}')
+            for i in range(3)
+        ]
+        statuses = ['PRESENT', 'LATE', 'ABSENT', 'PRESENT']
+        for day, status in enumerate(statuses, start=1):
+            for employee in cls.employees:
+                Attendance.objects.create(employee=employee, date=date(2024, 3, day), status=status)
+
+    def expected(self, queryset):
+        return list(queryset.order_by('-date', '-id').values_list('pk', flat=True))
+
+    def walk(self, queryset, per_page):
+        pages = [paginate_keyset(queryset, per_page=per_page)]
+        while pages[-1].has_next():
+            pages.append(paginate_keyset(queryset, after=pages[-1].next_cursor, per_page=per_page))
+        return pages
+
+    def test_forward_and_back(self):
+        # Five a page splits each date's three records across pages
+        queryset = Attendance.objects.all()
+        pages = self.walk(queryset, 5)
+        self.assertEqual([len(page) for page in pages], [5, 5, 2])
+        self.assertEqual([record.pk for page in pages for record in page], self.expected(queryset))
+        self.assertEqual([page.has_previous() for page in pages], [False, True, True])
+
+        back = [pages[-1]]
+        while back[-1].has_previous():
+            back.append(paginate_keyset(queryset, before=back[-1].previous_cursor, per_page=5))
+        self.assertEqual(
+            [[record.pk for record in page] for page in reversed(back)],
+            [[record.pk for record in page] for page in pages],
+        )
+        self.assertTrue(back[-1].has_next())
+        self.assertIsNone(back[-1].previous_cursor)
+
+    def test_ties_on_a_date_are_ordered_by_id(self):
+        page = paginate_keyset(Attendance.objects.all(), per_page=2)
+        first, second = page
+        self.assertEqual(first.date, second.date)
+        self.assertGreater(first.pk, second.pk)
+        self.assertEqual(page.next_cursor, f'2024-03-04.{second.pk}')
+        rest = paginate_keyset(Attendance.objects.all(), after=page.next_cursor, per_page=1)
+        self.assertEqual([record.pk for record in rest], self.expected(Attendance.objects.all())[2:3])
+
+    def test_invalid_cursors(self):
+        for cursor in ['garbage', '2024-13-01.5', '2024-03-01.x', '.5', '2024-03-01']:
+            self.assertIsNone(decode_cursor(cursor), cursor)
+        first = [record.pk for record in paginate_keyset(Attendance.objects.all(), per_page=5)]
+        for cursor in ['garbage', '2024-03-01.x']:
+            page = paginate_keyset(Attendance.objects.all(), after=cursor, before=cursor, per_page=5)
+            self.assertEqual([record.pk for record in page], first)
+            self.assertFalse(page.has_previous())
+
+    @mock.patch('employees.views.HISTORY_PAGE_SIZE', 1)
+    def test_history_range(self):
+        self.client.force_login(self.employees[0].user)
+        response = self.client.get('/attendance-history/?start=2024-03-02&end=2024-03-03')
+        self.assertEqual([record.date for record in response.context['attendance_list']], [date(2024, 3, 3)])
+        self.assertEqual(
+            [response.context[key] for key in ('total_days', 'present_days', 'absent_days', 'late_days')],
+            [2, 0, 1, 1],
+        )
+        cursor = response.context['page_obj'].next_cursor
+        response = self.client.get(f'/attendance-history/?start=2024-03-02&end=2024-03-03&after={cursor}')
+        self.assertEqual([record.date for record in response.context['attendance_list']], [date(2024, 3, 2)])
+        self.assertFalse(response.context['page_obj'].has_next())
+        # A tampered cursor shows the first page
+        response = self.client.get('/attendance-history/?after=2024-03-99.1')
+        self.assertEqual([record.date for record in response.context['attendance_list']], [date(2024, 3, 4)])
+        self.assertEqual(response.context['total_days'], 4)
+
+
+@override_settings(ATTENDANCE_API_TOKEN='s3cret', ATTENDANCE_API_MAX_EVENTS=3)
+class AttendanceEventsAPITests(SummaryAssertions, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.employee = Employee.objects.create(user=User.objects.create_user('badge'), employee_id='EMP950')
+
+    def setUp(self):
+        Shift.objects.clear_cache()
+
+    def post(self, events, token='s3cret'):
+        return self.client.post(
+            '/api/attendance/events/', json.dumps({'events': events}),
+            content_type='application/json', HTTP_AUTHORIZATION=f'Bearer {token}',
+        )
+
+    def test_rejects_bad_tokens(self):
+        self.assertEqual(self.client.post('/api/attendance/events/', '{}', content_type='application/json').status_code, 401)
+        self.assertEqual(self.post([], token='wrong').status_code, 401)
+        self.assertEqual(self.post([], token='s3crét').status_code, 401)
+
+    def test_too_many_events(self):
+        event = {'employee_id': 'EMP950', 'action': 'check_in', 'timestamp': '2024-03-04T09:00:00Z'}
+        self.assertEqual(self.post([event] * 4).status_code, 413)
+        self.assertFalse(Attendance.objects.exists())
+
+    def test_per_event_errors(self):
+        response = self.post([
+            {'employee_id': 'EMP950', 'action': 'wave', 'timestamp': '2024-03-04T09:00:00Z'},
+            {'employee_id': 'EMP999', 'action': 'check_in', 'timestamp': '2024-03-04T09:00:00Z'},
+            {'employee_id': 'EMP950', 'action': 'check_out', 'timestamp': 'noon'},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['failed'], 3)
+        self.assertEqual(
+            [result['result'] for result in response.json()['results']],
+            ['invalid', 'unknown_employee', 'invalid'],
+        )
+        self.assertFalse(Attendance.objects.exists())
+
+    def test_check_in_then_out_in_one_batch(self):
+        response = self.post([
+            {'employee_id': 'EMP950', 'action': 'check_out', 'timestamp': '2024-03-04T17:30:00Z'},
+            {'employee_id': 'EMP950', 'action': 'check_in', 'timestamp': '2024-03-04T09:00:00Z'},
+        ])
+        self.assertEqual([result['result'] for result in response.json()['results']], ['checked_out', 'checked_in'])
+        record = Attendance.objects.get()
+        self.assertEqual((record.check_in, record.check_out, record.worked_minutes), (time(9, 0), time(17, 30), 510))
+        self.assertSummariesMatchRebuild()
+
+    def test_string_dates_are_normalised_on_save(self):
+        record = Attendance.objects.create(employee=self.employee, date='2024-03-04', check_in='09:00', check_out='17:00')
+        self.assertEqual((record.date, record.worked_minutes), (date(2024, 3, 4), 480))
+        self.assertSummariesMatchRebuild()
+
+
+class ImportEmployeesTests(TestCase):
+    HEADER = 'full_name,email,employee_id,department,password\n'
+
+    def import_csv(self, lines, *args):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write(self.HEADER + ''.join(line + '\n' for line in lines))
+        self.addCleanup(os.unlink, f.name)
+        out, err = io.StringIO(), io.StringIO()
+        call_command('import_employees', f.name, '--workers', '1', *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_valid_file(self):
+        out, err = self.import_csv([
+            'Ada Lovelace,ADA@example.com,EMP001,Research,pw',
+            'Alan Turing,alan@example.com,EMP002,Research,',
+            'Grace Hopper,grace@example.com,EMP003,Navy,',
+        ])
+        self.assertIn('Imported 3 employees', out)
+        self.assertEqual(err, '')
+        ada = Employee.objects.select_related('user', 'department').get(employee_id='EMP001')
+        self.assertEqual((ada.user.username, ada.user.first_name, ada.department.name), ('ada@example.com', 'Ada', 'Research'))
+        self.assertTrue(ada.user.check_password('pw'))
+        self.assertFalse(User.objects.get(username='alan@example.com').has_usable_password())
+        self.assertEqual(Department.objects.count(), 2)
+
+    def test_bad_rows_are_skipped(self):
+        User.objects.create_user('taken@example.com')
+        out, err = self.import_csv([
+            'Ada Lovelace,ada@example.com,EMP001,Research,',
+            'Ada Again,ada@example.com,EMP002,Research,',
+            'Ada Twin,twin@example.com,EMP001,Research,',
+            'No Email,not-an-email,EMP003,Research,',
+            ',blank@example.com,EMP004,Research,',
+            'Taken,taken@example.com,EMP005,Research,',
+        ])
+        self.assertIn('Imported 1 employees (5 rows skipped)', out)
+        for line in range(3, 8):
+            self.assertIn(f'Row {line}:', err)
+        self.assertEqual(list(Employee.objects.values_list('employee_id', flat=True)), ['EMP001'])
+
+    def test_dry_run(self):
+        out, _ = self.import_csv(['Ada Lovelace,ada@example.com,EMP001,Research,'], '--dry-run')
+        self.assertIn('1 valid rows, 0 errors', out)
+        self.assertFalse(Employee.objects.exists())
+
+    def test_batch_size_and_workers_must_be_positive(self):
+        for args in [('--batch-size', '0'), ('--batch-size', '-5'), ('--workers', '0')]:
+            with self.assertRaisesMessage(CommandError, f'{args[0]} must be positive'):
+                self.import_csv(['Ada Lovelace,ada@example.com,EMP001,Research,'], *args)
+        self.assertFalse(Employee.objects.exists())
+
+    def test_queries_per_batch_not_per_row(self):
+        def rows(prefix, n):
+            return [f'Person {i},{prefix}{i}@example.com,{prefix}{i},Dept {prefix}{i % 3},' for i in range(n)]
+
+        with CaptureQueriesContext(connection) as few:
+            self.import_csv(rows('a', 5), '--batch-size', '100')
+        with CaptureQueriesContext(connection) as many:
+            self.import_csv(rows('b', 60), '--batch-size', '100')
+        self.assertEqual(Employee.objects.count(), 65)
+        self.assertEqual(len(many.captured_queries), len(few.captured_queries))
+
+
+class DashboardCacheInvalidationTests(TestCase):
+    """Attendance writes drop only that employee's cached dashboard fragments, once committed"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = Employee.objects.create(user=User.objects.create_user('alice'), employee_id='EMP960')
+        cls.bob = Employee.objects.create(user=User.objects.create_user('bob'), employee_id='EMP961')
+
+    def setUp(self):
+        caches[settings.DASHBOARD_CACHE_ALIAS].clear()
+        for employee in (self.alice, self.bob):
+            for fragment in dashboard_cache.FRAGMENTS:
+                dashboard_cache.get_fragment(fragment, employee.pk, lambda: 'cached')
+
+    def cached(self, employee):
+        return {
+            fragment for fragment in dashboard_cache.FRAGMENTS
+            if caches[settings.DASHBOARD_CACHE_ALIAS].get(f'dashboard:{fragment}:{employee.pk}') is not None
+        }
+
+    def test_save_invalidates_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            record = Attendance.objects.create(employee=self.alice, date=date(2024, 3, 4))
+            self.assertEqual(self.cached(self.alice), set(dashboard_cache.FRAGMENTS))
+        self.assertEqual(self.cached(self.alice), set())
+        self.assertEqual(self.cached(self.bob), set(dashboard_cache.FRAGMENTS))
+
+        dashboard_cache.get_fragment('stats', self.alice.pk, lambda: 'cached')
+        with self.captureOnCommitCallbacks(execute=True):
+            record.status = 'LATE'
+            record.save()
+        self.assertEqual(self.cached(self.alice), set())
+
+    def test_delete_invalidates(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            record = Attendance.objects.create(employee=self.bob, date=date(2024, 3, 4))
+        for fragment in dashboard_cache.FRAGMENTS:
+            dashboard_cache.get_fragment(fragment, self.bob.pk, lambda: 'cached')
+        with self.captureOnCommitCallbacks(execute=True):
+            record.delete()
+        self.assertEqual(self.cached(self.bob), set())
+        self.assertEqual(self.cached(self.alice), set(dashboard_cache.FRAGMENTS))
+
+
+@mock.patch('employees.views.REPORT_EMPLOYEES_PER_PAGE', 2)
+class TimesheetViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_superuser('payroll', 'payroll@example.com', 'pw')
+        for i in range(5):
+            employee = Employee.objects.create(user=User.objects.create_user(f'ts{i}'), employee_id=f'TS{i}')
+            Attendance.objects.create(
+                employee=employee, date=date(2024, 3, 4), check_in=time(9, 0), check_out=time(17, i),
+            )
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+
+    def page(self, number):
+        return self.client.get(f'/reports/timesheets/?month=2024-03&page={number}').context
+
+    def test_one_page_of_employees(self):
+        context = self.page(1)
+        self.assertEqual([row['employee'].employee_id for row in context['rows']], ['TS0', 'TS1'])
+        self.assertEqual(context['page_obj'].paginator.num_pages, 3)
+        last = self.page(3)['rows']
+        self.assertEqual([(row['employee'].employee_id, row['days_worked']) for row in last], [('TS4', 1)])
+        self.assertEqual(last[0]['overtime_hours'], 0.07)
+
+
+class DepartmentReportTests(TestCase):
+    START, END = date(2024, 3, 4), date(2024, 3, 12)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_superuser('analyst', 'analyst@example.com', 'pw')
+        cls.ops = Department.objects.create(name='Ops')
+        cls.sales = Department.objects.create(name='Sales')
+        cls.employees = [
+            Employee.objects.create(user=User.objects.create_user(f'ops{i}'), employee_id=f'OPS{i}', department=cls.ops)
+            for i in range(4)
+        ]
+        seller = Employee.objects.create(user=User.objects.create_user('seller'), employee_id='SAL0', department=cls.sales)
+        day = cls.START
+        e0, e1, e2, _ = cls.employees
+        Attendance.objects.create(employee=e0, date=day, check_in=time(9, 0), check_out=time(17, 0), status='PRESENT')
+        Attendance.objects.create(employee=e1, date=day, check_in=time(9, 30), check_out=time(16, 30), status='LATE')
+        Attendance.objects.create(employee=e2, date=day, status='ABSENT')
+        # Only Sales recorded on the 5th; the second week starts on the 11th
+        Attendance.objects.create(employee=seller, date=day + timedelta(days=1), check_in=time(9, 0), status='PRESENT')
+        Attendance.objects.create(employee=e0, date=date(2024, 3, 11), check_in=time(13, 0), status='HALF_DAY')
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+
+    def report(self, **params):
+        params = {'start': self.START.isoformat(), 'end': self.END.isoformat(), **params}
+        response = self.client.get('/reports/department/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.context
+
+    def test_daily_rates_against_headcount(self):
+        context = self.report(department=self.ops.pk)
+        self.assertEqual(context['headcount'], 4)
+        first, second = context['days']
+        self.assertEqual([first['date'], second['date']], [self.START, date(2024, 3, 11)])
+        self.assertEqual(
+            (first['present'], first['late'], first['half_day'], first['absent']), (1, 1, 0, 1)
+        )
+        # The employee with no record that day counts as absent
+        self.assertEqual((first['present_rate'], first['late_rate'], first['absent_rate']), (0.5, 0.25, 0.5))
+        self.assertEqual(first['avg_hours'], 7.5)
+        self.assertEqual((second['present_rate'], second['absent_rate'], second['avg_hours']), (0.25, 0.75, None))
+
+    def test_weekly_heatmap(self):
+        context = self.report(department=self.ops.pk)
+        self.assertEqual(context['weeks'], [self.START, date(2024, 3, 11)])
+        heatmap = {row['employee'].employee_id: row for row in context['heatmap']}
+        self.assertEqual(list(heatmap), ['OPS0', 'OPS1', 'OPS2', 'OPS3'])
+        self.assertEqual([cell['attended'] for cell in heatmap['OPS0']['cells']], [1, 1])
+        self.assertEqual(heatmap['OPS0']['attended'], 2)
+        self.assertEqual([cell['attended'] for cell in heatmap['OPS1']['cells']], [1, 0])
+        self.assertEqual((heatmap['OPS2']['attended'], heatmap['OPS2']['absent']), (0, 1))
+        self.assertEqual([cell['attended'] for cell in heatmap['OPS3']['cells']], [0, 0])
+
+    def test_department_filter(self):
+        context = self.report(department=self.sales.pk)
+        self.assertEqual(context['department'], self.sales)
+        self.assertEqual((context['headcount'], [day['date'] for day in context['days']]), (1, [date(2024, 3, 5)]))
+        # Unknown or missing departments fall back to the first by name
+        self.assertEqual(self.report(department='999')['department'], self.ops)
+        self.assertEqual(self.report(department='x')['department'], self.ops)
+
+    def test_date_range(self):
+        context = self.report(department=self.ops.pk, start='2024-03-11', end='2024-03-11')
+        self.assertEqual([day['date'] for day in context['days']], [date(2024, 3, 11)])
+        self.assertEqual(context['weeks'], [date(2024, 3, 11)])
+        # A start after the end is swapped
+        context = self.report(department=self.ops.pk, start='2024-03-12', end='2024-03-04')
+        self.assertEqual((context['start_date'], context['end_date']), (self.START, self.END))
+        self.assertEqual(len(context['days']), 2)
+
+    def test_staff_only(self):
+        self.client.force_login(self.employees[0].user)
+        response = self.client.get('/reports/department/')
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('/admin/login/', response['Location'])
+
+    def test_query_count_does_not_grow_with_employees(self):
+        # The first request after force_login stamps the session's sliding expiry
+        self.report()
+        with CaptureQueriesContext(connection) as few:
+            self.report(department=self.ops.pk)
+        for i in range(4, 12):
+            employee = Employee.objects.create(
+                user=User.objects.create_user(f'ops{i}'), employee_id=f'OPS{i}', department=self.ops
+            )
+            Attendance.objects.create(employee=employee, date=self.START, check_in=time(9, 0), status='PRESENT')
+        with CaptureQueriesContext(connection) as many:
+            context = self.report(department=self.ops.pk)
+        self.assertEqual(context['headcount'], 12)
+        self.assertEqual(len(few), len(many))
+
+
+class ExportAttendanceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_superuser('payroll2', 'payroll2@example.com', 'pw')
+        cls.ops = Department.objects.create(name='Ops')
+        sales = Department.objects.create(name='Sales')
+        ada = Employee.objects.create(
+            user=User.objects.create_user('ada', first_name='Ada', last_name='Lovelace'), employee_id='OPS1', department=cls.ops
+        )
+        bob = Employee.objects.create(user=User.objects.create_user('bob'), employee_id='SAL1', department=sales)
+        Attendance.objects.create(
+            employee=ada, date=date(2024, 3, 4), check_in=time(9, 0), check_out=time(17, 30), status='PRESENT', notes='on site',
+        )
+        Attendance.objects.create(employee=ada, date=date(2024, 4, 1), check_in=time(9, 0), status='PRESENT')
+        Attendance.objects.create(employee=bob, date=date(2024, 3, 5), status='ABSENT')
+
+    def export(self, query):
+        self.client.force_login(self.staff)
+        response = self.client.get(f'/export/attendance/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return response, list(csv.reader(b''.join(response.streaming_content).decode().splitlines()))
+
+    def test_month_export(self):
+        response, rows = self.export('month=2024-03')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="attendance-2024-03.csv"')
+        self.assertEqual(rows[0], exports.HEADER)
+        self.assertEqual(rows[1:], [
+            ['OPS1', 'Ada Lovelace', 'Ops', '2024-03-04', '09:00', '17:30', '8.50', 'PRESENT', 'on site'],
+            ['SAL1', '', 'Sales', '2024-03-05', '', '', '', 'ABSENT', ''],
+        ])
+
+    def test_department_and_range_filters(self):
+        _, rows = self.export(f'department={self.ops.pk}')
+        self.assertEqual([row[3] for row in rows[1:]], ['2024-03-04', '2024-04-01'])
+        # Incomplete days have no working hours
+        self.assertEqual(rows[2][6], '')
+        _, rows = self.export('start=2024-03-05&end=2024-04-30')
+        self.assertEqual([row[3] for row in rows[1:]], ['2024-04-01', '2024-03-05'])
+
+    def test_bad_month(self):
+        self.client.force_login(self.staff)
+        self.assertEqual(self.client.get('/export/attendance/?month=March').status_code, 400)
+
+    def test_staff_only(self):
+        self.client.force_login(User.objects.get(username='ada'))
+        self.assertEqual(self.client.get('/export/attendance/').status_code, 302)
+
+    def test_command(self):
+        out = io.StringIO()
+        call_command('export_attendance', '--month', '2024-03', '--department', str(self.ops.pk), stdout=out)
+        self.assertEqual(list(csv.reader(out.getvalue().splitlines())), [
+            exports.HEADER,
+            ['OPS1', 'Ada Lovelace', 'Ops', '2024-03-04', '09:00', '17:30', '8.50', 'PRESENT', 'on site'],
+        ])
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'march.csv')
+            out = io.StringIO()
+            call_command('export_attendance', '--month', '2024-03', '-o', path, stdout=out)
+            self.assertIn(f"Exported 2 records to {path}", out.getvalue())
+            with open(path, newline='') as exported:
+                self.assertEqual(len(list(csv.reader(exported))), 3)
+        with self.assertRaises(CommandError):
+            call_command('export_attendance', '--month', '2024-13', stdout=io.StringIO())
+
+    def test_timesheets_command(self):
+        out = io.StringIO()
+        call_command('timesheets', '2024-03', '--department', str(self.ops.pk), stdout=out)
+        rows = list(csv.reader(out.getvalue().splitlines()))
+        self.assertEqual(rows[0][:3], ['Employee ID', 'Name', 'Department'])
+        self.assertEqual(rows[1][:4], ['OPS1', 'Ada Lovelace', 'Ops', '1'])
+
+
+class CloseDayTests(SummaryAssertions, TestCase):
+    DAY = date(2024, 3, 4)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.shift = Shift.objects.create(name='Day', start_time=time(9, 0), end_time=time(17, 0), grace_minutes=10)
+        department = Department.objects.create(name='Support', shift=cls.shift)
+        cls.employees = {}
+        for name in ['on_time', 'late', 'no_check_out', 'missing', 'inactive', 'joined_later']:
+            user = User.objects.create_user(name, is_active=name != 'inactive')
+            cls.employees[name] = Employee.objects.create(user=user, employee_id=name, department=department)
+        Employee.objects.filter(pk=cls.employees['joined_later'].pk).update(date_joined=cls.DAY + timedelta(days=1))
+        Employee.objects.exclude(pk=cls.employees['joined_later'].pk).update(date_joined=cls.DAY - timedelta(days=30))
+        # Entered without classification, as an import would
+        Attendance.objects.bulk_create([
+            Attendance(employee=cls.employees['on_time'], date=cls.DAY, check_in=time(9, 5), check_out=time(17, 0)),
+            Attendance(employee=cls.employees['late'], date=cls.DAY, check_in=time(9, 30), check_out=time(17, 0)),
+            Attendance(employee=cls.employees['no_check_out'], date=cls.DAY, check_in=time(8, 55)),
+        ])
+        AttendanceSummary.objects.rebuild()
+
+    def setUp(self):
+        Shift.objects.clear_cache()
+
+    def statuses(self):
+        return dict(Attendance.objects.filter(date=self.DAY).values_list('employee__employee_id', 'status'))
+
+    def test_close_day(self):
+        self.assertEqual(close_day(self.DAY), {'absent': 1, 'half_day': 1, 'late': 1})
+        self.assertEqual(self.statuses(), {
+            'on_time': 'PRESENT', 'late': 'LATE', 'no_check_out': 'HALF_DAY', 'missing': 'ABSENT',
+        })
+        self.assertSummariesMatchRebuild()
+
+    def test_second_run_changes_nothing(self):
+        close_day(self.DAY)
+        statuses, counters = self.statuses(), self.summary_rows()
+        self.assertEqual(close_day(self.DAY), {'absent': 0, 'half_day': 0, 'late': 0})
+        self.assertEqual(self.statuses(), statuses)
+        self.assertEqual(self.summary_rows(), counters)
+
+    def test_only_affected_fragments_invalidated(self):
+        with mock.patch('employees.dashboard_cache.invalidate') as invalidate, \
+                mock.patch('employees.dashboard_cache.clear') as clear:
+            close_day(self.DAY)
+        clear.assert_not_called()
+        self.assertEqual(
+            sorted(invalidate.call_args.args),
+            sorted(self.employees[name].pk for name in ['late', 'no_check_out', 'missing']),
+        )
+
+
+class AsyncViewsURLConf:
+    """The project URLs with the async views routed in, as under ASGI"""
+    urlpatterns = [
+        path('dashboard/', views.adashboard, name='dashboard'),
+        path('mark-attendance/', views.amark_attendance, name='mark_attendance'),
+        *[pattern for pattern in project_urls.urlpatterns if getattr(pattern, 'name', None) not in ('dashboard', 'mark_attendance')],
+    ]
+
+
+@override_settings(ROOT_URLCONF=AsyncViewsURLConf)
+class AsyncViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('async', password='pw', first_name='Ada')
+        department = Department.objects.create(name='Support')
+        cls.employee = Employee.objects.create(user=cls.user, employee_id='EMP200', department=department)
+
+    def setUp(self):
+        caches[settings.DASHBOARD_CACHE_ALIAS].clear()
+        self.async_client.force_login(self.user)
+
+    async def test_check_in_then_out(self):
+        response = await self.async_client.post('/mark-attendance/', {'action': 'check_in'})
+        self.assertEqual(response.status_code, 302)
+        response = await self.async_client.post('/mark-attendance/', {'action': 'check_out'})
+        self.assertEqual(response.status_code, 302)
+        record = await Attendance.objects.aget(employee=self.employee)
+        self.assertIsNotNone(record.check_out)
+
+    async def test_check_out_before_check_in(self):
+        response = await self.async_client.post('/mark-attendance/', {'action': 'check_out'}, follow=True)
+        self.assertContains(response, "Please check in first")
+
+    async def test_dashboard(self):
+        await Attendance.objects.acreate(employee=self.employee, date=date(2024, 1, 2), status='ABSENT')
+        response = await self.async_client.get('/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['absent_days'], 1)
+        self.assertContains(response, 'Welcome, Ada')
+
+    async def test_dashboard_with_model_backend_session(self):
+        # ModelBackend loads the user without the profile or its department
+        await self.async_client.aforce_login(self.user, backend='django.contrib.auth.backends.ModelBackend')
+        response = await self.async_client.get('/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Support')
+
+    async def test_login_required(self):
+        await self.async_client.alogout()
+        response = await self.async_client.get('/mark-attendance/')
+        self.assertEqual(response.status_code, 302)
+
+
+class LoadTestReportTests(unittest.TestCase):
+    def test_percentile_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(loadtest.percentile(values, 50), 50)
+        self.assertEqual(loadtest.percentile(values, 99), 99)
+        self.assertEqual(loadtest.percentile([7], 95), 7)
+        self.assertEqual(loadtest.percentile([], 95), 0)
+
+    def test_regressions_against_baseline(self):
+        def summary(p95, queries, errors=0):
+            return {'endpoints': {'GET /dashboard/': {'p95_ms': p95, 'queries_per_request': queries, 'errors': errors}}}
+
+        self.assertEqual(loadtest.regressions(summary(110, 6), summary(100, 6)), [])
+        self.assertEqual(
+            loadtest.regressions(summary(100, 9, errors=1), summary(100, 6)),
+            ["GET /dashboard/: queries_per_request 6 -> 9", "GET /dashboard/: errors 0 -> 1"],
+        )
+
+
+@override_settings(METRICS_SERVER_TIMING=True)
+class RequestMetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('metrics', password='pw')
+        Employee.objects.create(user=cls.user, employee_id='EMP300')
+
+    def setUp(self):
+        caches[settings.DASHBOARD_CACHE_ALIAS].clear()
+        instrumentation.reset()
+        self.client.force_login(self.user)
+
+    def test_server_timing_header(self):
+        response = self.client.get('/dashboard/')
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'^db;dur=[\d.]+;desc="\d+ queries", tpl;dur=[\d.]+, total;dur=[\d.]+$')
+        self.assertNotIn('desc="0 queries"', timing)
+
+    def test_prometheus_export(self):
+        self.client.get('/dashboard/')
+        self.client.get('/dashboard/')
+        User.objects.filter(pk=self.user.pk).update(is_staff=True)
+        response = self.client.get('/metrics/')
+        self.assertEqual(response.status_code, 200)
+        text = response.content.decode()
+        self.assertIn('attendance_requests_total{view="dashboard",method="GET",status="2xx"} 2', text)
+        self.assertIn(
+            'attendance_request_duration_seconds_bucket{view="dashboard",method="GET",status="2xx",le="+Inf"} 2', text
+        )
+        self.assertRegex(text, r'attendance_template_duration_seconds_total\{view="dashboard",[^}]*\} 0\.\d*[1-9]')
+
+    @override_settings(METRICS_TOKEN='scrape', METRICS_ALLOWED_IPS=[])
+    def test_metrics_restricted_to_staff_or_token(self):
+        # Loopback isn't trusted: behind a local proxy every request comes from there
+        self.assertEqual(self.client.get('/metrics/', REMOTE_ADDR='127.0.0.1').status_code, 403)
+        self.assertEqual(self.client.get('/metrics/', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        self.assertEqual(self.client.get('/metrics/', HTTP_AUTHORIZATION='Bearer scrape').status_code, 200)
+        self.client.logout()
+        self.assertEqual(self.client.get('/metrics/', HTTP_AUTHORIZATION='Bearer scrape').status_code, 200)
+        self.client.force_login(self.user)
+        User.objects.filter(pk=self.user.pk).update(is_staff=True)
+        self.assertEqual(self.client.get('/metrics/', REMOTE_ADDR='10.0.0.5').status_code, 200)
+
+    @override_settings(METRICS_TOKEN='', METRICS_ALLOWED_IPS=['10.0.0.5'])
+    def test_metrics_allowed_ips_opt_in(self):
+        self.assertEqual(self.client.get('/metrics/', HTTP_AUTHORIZATION='Bearer ').status_code, 403)
+        self.assertEqual(self.client.get('/metrics/', REMOTE_ADDR='10.0.0.5').status_code, 200)
+
+
+class DevelopmentMediaURLConf:
+    """The project URLs plus the thumbnail route added when DEBUG is on"""
+    urlpatterns = [
+        path(f"{settings.MEDIA_URL.lstrip('/')}thumbs/<path:path>", views.thumbnail, name='thumbnail'),
+        *project_urls.urlpatterns,
+    ]
+
+
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('photo', password='pw')
+        cls.employee = Employee.objects.create(user=cls.user, employee_id='EMP400')
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+
+    def photo(self):
+        """A landscape JPEG tagged as rotated, with camera metadata"""
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: rotate 90 degrees clockwise
+        exif[0x010F] = 'PhoneMaker'
+        out = io.BytesIO()
+        Image.new('RGB', (800, 400), 'red').save(out, 'JPEG', exif=exif)
+        return SimpleUploadedFile('photo.jpg', out.getvalue(), content_type='image/jpeg')
+
+    def test_render_sizes_formats_and_strips_exif(self):
+        rendered = thumbnails.render(self.photo())
+        self.assertEqual(set(rendered), {(size, fmt) for size in thumbnails.SIZES for fmt in thumbnails.FORMATS})
+        for (size, fmt), data in rendered.items():
+            with Image.open(io.BytesIO(data)) as image:
+                self.assertEqual(image.size, (thumbnails.SIZES[size],) * 2)
+                self.assertEqual(image.format, thumbnails.FORMATS[fmt][0])
+                self.assertEqual(len(image.getexif()), 0)
+
+    def test_dashboard_serves_thumbnail_once_generated(self):
+        with self.captureOnCommitCallbacks():
+            self.employee.profile_picture = self.photo()
+            self.employee.save()
+        picture = self.employee.profile_picture.name
+        # Generation is queued for after commit, not run inline
+        self.assertEqual(Employee.objects.get(pk=self.employee.pk).thumbnail_version, '')
+
+        self.client.force_login(self.user)
+        self.assertContains(self.client.get('/dashboard/'), self.employee.profile_picture.url)
+
+        self.assertTrue(thumbnails.generate(self.employee.pk, picture))
+        self.employee.refresh_from_db()
+        response = self.client.get('/dashboard/')
+        self.assertContains(response, self.employee.thumbnail_url('1x', 'webp'))
+        self.assertNotContains(response, self.employee.profile_picture.url)
+
+        # Served by the web server in production, by Django only in development
+        self.assertEqual(self.client.get(self.employee.thumbnail_url('2x', 'jpg')).status_code, 404)
+        with override_settings(ROOT_URLCONF=DevelopmentMediaURLConf):
+            response = self.client.get(self.employee.thumbnail_url('2x', 'jpg'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+
+    def test_stale_job_does_not_overwrite_newer_picture(self):
+        self.employee.profile_picture = self.photo()
+        self.employee.save()
+        self.assertFalse(thumbnails.generate(self.employee.pk, 'profile_pics/replaced.jpg'))
+        self.employee.refresh_from_db()
+        self.assertEqual(self.employee.thumbnail_version, '')
+
+
+class AttendanceAdminTests(TestCase):
+    """The admin changelists run a fixed number of queries and the bulk actions keep summaries right"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('hr', 'hr@example.com', 'pw')
+        Employee.objects.create(user=cls.admin, employee_id='HR001')
+        cls.department = Department.objects.create(name='Ops')
+
+    def setUp(self):
+        Shift.objects.clear_cache()
+        self.client.force_login(self.admin)
+        # The first request after force_login stamps the session's sliding expiry
+        self.client.get('/admin/')
+
+    def add_employees(self, count, start):
+        for i in range(start, start + count):
+            user = User.objects.create_user(f'worker{i}', first_name='Worker', last_name=str(i))
+            employee = Employee.objects.create(user=user, employee_id=f'W{i:03d}', department=self.department)
+            Attendance.objects.create(employee=employee, date=date(2024, 2, 1), check_in=time(9, 0), status='PRESENT')
+
+    def assertConstantQueries(self, url):
+        self.add_employees(3, 0)
+        with CaptureQueriesContext(connection) as few:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.add_employees(12, 3)
+        with CaptureQueriesContext(connection) as many:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(len(few), len(many))
+
+    def test_attendance_changelist_queries(self):
+        self.assertConstantQueries('/admin/employees/attendance/')
+
+    def test_user_changelist_queries(self):
+        self.assertConstantQueries('/admin/auth/user/')
+
+    def run_action(self, action):
+        records = Attendance.objects.all()
+        return self.client.post('/admin/employees/attendance/', {
+            'action': action,
+            '_selected_action': [str(pk) for pk in records.values_list('pk', flat=True)],
+        })
+
+    def summary_counts(self):
+        return list(AttendanceSummary.objects.order_by('employee_id', 'period').values_list(
+            'employee_id', 'period', 'present_days', 'absent_days', 'late_days', 'half_days', 'total_days'
+        ))
+
+    def test_mark_absent_keeps_summaries(self):
+        self.add_employees(3, 0)
+        Attendance.objects.update(check_out=time(17, 0), worked_minutes=480)
+        self.run_action('mark_absent')
+        self.assertEqual(
+            set(Attendance.objects.values_list('status', 'check_in', 'check_out', 'worked_minutes')),
+            {('ABSENT', None, None, None)},
+        )
+        counts = self.summary_counts()
+        AttendanceSummary.objects.rebuild()
+        self.assertEqual(counts, self.summary_counts())
+
+    def test_set_check_out_uses_shift_end(self):
+        self.department.shift = Shift.objects.create(name='Day', start_time=time(8, 0), end_time=time(16, 30))
+        self.department.save()
+        self.add_employees(2, 0)
+        self.run_action('set_check_out')
+        self.assertEqual(
+            set(Attendance.objects.values_list('check_out', 'worked_minutes')), {(time(16, 30), 450)}
+        )
+
+    def test_estimated_count_paginator(self):
+        self.add_employees(5, 0)
+        with mock.patch.object(EstimatedCountPaginator, 'COUNT_LIMIT', 3):
+            self.assertEqual(EstimatedCountPaginator(Attendance.objects.filter(status='PRESENT'), 2).count, 3)
+            self.assertEqual(EstimatedCountPaginator(Attendance.objects.all(), 2).count, 3)
+        self.assertEqual(EstimatedCountPaginator(Attendance.objects.all(), 2).count, 5)
+
+
+class SlidingSessionTests(TestCase):
+    """Page views only write the session when its expiry is due to be pushed forward"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('session', password='pw')
+        Employee.objects.create(user=cls.user, employee_id='EMP500')
+
+    def setUp(self):
+        caches[settings.DASHBOARD_CACHE_ALIAS].clear()
+        self.client.force_login(self.user)
+
+    def session_writes(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.get('/dashboard/').status_code, 200)
+        return [
+            q['sql'] for q in ctx.captured_queries
+            if 'django_session' in q['sql'] and not q['sql'].startswith('SELECT')
+        ]
+
+    def test_page_views_are_read_only(self):
+        self.assertEqual(len(self.session_writes()), 1)
+        for _ in range(3):
+            self.assertEqual(self.session_writes(), [])
+
+    def test_stale_session_is_extended(self):
+        self.session_writes()
+        session = self.client.session
+        session[SESSION_REFRESHED_KEY] -= settings.SESSION_REFRESH_AFTER
+        session.save()
+        Session.objects.update(expire_date=timezone.now() + timedelta(days=1))
+
+        self.assertEqual(len(self.session_writes()), 1)
+        expire_date = Session.objects.get().expire_date
+        self.assertGreater(expire_date, timezone.now() + timedelta(seconds=settings.SESSION_COOKIE_AGE - 60))
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+    def test_signed_cookie_is_reissued_only_on_refresh(self):
+        self.client.force_login(self.user)
+        self.assertIn(settings.SESSION_COOKIE_NAME, self.client.get('/dashboard/').cookies)
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, self.client.get('/dashboard/').cookies)
+
+    @override_settings(ROOT_URLCONF=AsyncViewsURLConf)
+    async def test_async_page_views_are_read_only(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get('/dashboard/')
+        self.assertIn(settings.SESSION_COOKIE_NAME, response.cookies)
+        response = await self.async_client.get('/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+
+
+class StaticFilesTests(TestCase):
+    """collectstatic output is hashed and precompressed, and served with far-future caching"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        static_root = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(static_root.cleanup)
+        cls.static_root = static_root.name
+        cls.enterClassContext(override_settings(STATIC_ROOT=cls.static_root))
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    def static_url(self, name):
+        response = self.client.get('/login/')
+        url = re.search(rf'/static/{name}\.[0-9a-f]{{12}}\.css', response.content.decode())
+        self.assertIsNotNone(url, f"no hashed URL for {name} in the page")
+        return url.group()
+
+    def test_hashed_files_are_immutable(self):
+        response = self.client.get(self.static_url('css/app'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(response['Content-Type'], 'text/css; charset=utf-8')
+        self.assertNotIn('Content-Encoding', response)
+
+    def test_gzip_variant(self):
+        url = self.static_url('css/app')
+        plain = b''.join(self.client.get(url).streaming_content)
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        compressed = b''.join(response.streaming_content)
+        self.assertLess(len(compressed), len(plain))
+        self.assertEqual(gzip.decompress(compressed), plain)
+
+    def test_brotli_preferred_when_present(self):
+        url = self.static_url('css/app')
+        # Written by hand: the brotli package is optional
+        with open(os.path.join(self.static_root, url.removeprefix('/static/') + '.br'), 'wb') as f:
+            f.write(b'brotli')
+        self.client = self.client_class()
+        self.assertEqual(self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, br')['Content-Encoding'], 'br')
+        self.assertEqual(self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, br;q=0')['Content-Encoding'], 'gzip')
+
+    def test_unhashed_names_are_revalidated(self):
+        response = self.client.get('/static/css/app.css')
+        self.assertEqual(response['Cache-Control'], f'public, max-age={settings.STATIC_FALLBACK_MAX_AGE}')
+        response = self.client.get('/static/css/app.css', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+
+# Archive tables are created with the schema editor, which SQLite won't run
+# inside the transaction TestCase wraps each test in
+class ArchiveTests(TransactionTestCase):
+    """Archived records leave Attendance but still show up in history, exports and summaries"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('archived', password='pw')
+        self.employee = Employee.objects.create(user=self.user, employee_id='EMP700')
+        statuses = ['PRESENT', 'LATE', 'ABSENT']
+        Attendance.objects.bulk_create([
+            Attendance(employee=self.employee, date=date(2023, 11, 1) + timedelta(days=i), status=statuses[i % 3])
+            for i in range(120)
+        ])
+        AttendanceSummary.objects.rebuild()
+        self.client.force_login(self.user)
+
+    def tearDown(self):
+        with connection.schema_editor() as editor:
+            for year in ArchivedYear.objects.values_list('year', flat=True):
+                editor.delete_model(archive.archive_model(year))
+
+    def history(self):
+        """Every record id on the history pages, following the cursors"""
+        ids, url = [], '/attendance-history/'
+        while url:
+            page = self.client.get(url).context['page_obj']
+            ids += [record.pk for record in page]
+            url = f'/attendance-history/?after={page.next_cursor}' if page.has_next() else None
+        return ids
+
+    def summaries(self):
+        return list(AttendanceSummary.objects.order_by('period').values_list(
+            'period', 'present_days', 'absent_days', 'late_days', 'total_days'
+        ))
+
+    def test_archive_keeps_history_and_summaries(self):
+        history, summaries = self.history(), self.summaries()
+        call_command('archive_attendance', '--before', '2024-02', '--chunk-size', '25', stdout=io.StringIO())
+
+        self.assertEqual(Attendance.objects.count(), 28)
+        self.assertEqual(
+            list(ArchivedYear.objects.values_list('year', 'first_date', 'last_date', 'records')),
+            [(2024, date(2024, 1, 1), date(2024, 1, 31), 31), (2023, date(2023, 11, 1), date(2023, 12, 31), 61)],
+        )
+        self.assertEqual(self.history(), history)
+        self.assertEqual(self.summaries(), summaries)
+        AttendanceSummary.objects.rebuild()
+        self.assertEqual(self.summaries(), summaries)
+
+        response = self.client.get('/attendance-history/?start=2023-12-25&end=2024-01-10')
+        self.assertEqual(response.context['total_days'], 17)
+        self.assertEqual(
+            [record.date for record in response.context['page_obj']],
+            [date(2024, 1, 10) - timedelta(days=i) for i in range(17)],
+        )
+
+    def test_export_includes_archived_records(self):
+        call_command('archive_attendance', '--before', '2024-01', stdout=io.StringIO())
+        User.objects.filter(pk=self.user.pk).update(is_staff=True)
+        response = self.client.get('/export/attendance/?start=2023-12-30&end=2024-01-02')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([line.split(',')[3] for line in lines[1:]], ['2023-12-30', '2023-12-31', '2024-01-01', '2024-01-02'])
+
+    def test_archived_dates_reject_writes(self):
+        call_command('archive_attendance', '--before', '2024-01', stdout=io.StringIO())
+        with self.assertRaises(ValueError):
+            Attendance.objects.create(employee=self.employee, date=date(2023, 12, 31))
+        with self.assertRaises(ValidationError):
+            Attendance(employee=self.employee, date=date(2023, 6, 1)).full_clean()
+        with self.assertRaises(ValueError):
+            close_day(date(2023, 12, 31))
+        results = apply_events([
+            {'employee_id': 'EMP700', 'action': 'check_out', 'timestamp': '2023-12-31T17:00:00Z'},
+            {'employee_id': 'EMP700', 'action': 'check_in', 'timestamp': '2024-03-01T09:00:00Z'},
+        ])
+        self.assertEqual([result['result'] for result in results], ['archived', 'checked_in'])
+        self.assertEqual(Attendance.objects.filter(date__lt=date(2024, 1, 1)).count(), 0)
+
+    def test_dry_run_and_employee_delete(self):
+        out = io.StringIO()
+        call_command('archive_attendance', '--before', '2024-01', '--dry-run', stdout=out)
+        self.assertIn('Would archive 61 records', out.getvalue())
+        self.assertEqual(Attendance.objects.count(), 120)
+
+        call_command('archive_attendance', '--before', '2024-01', stdout=io.StringIO())
+        self.user.delete()
+        self.assertEqual([queryset.count() for _, queryset in archive.archive_querysets()], [0])
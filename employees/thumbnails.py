@@ -0,0 +1,129 @@
+"""
+Profile picture thumbnails.
+
+When an employee's picture changes, square thumbnails are generated in a
+background thread after the transaction commits: one per size in SIZES, each
+as WebP and JPEG, rotated upright from the EXIF orientation and then saved
+without any EXIF (or other) metadata.
+
+Thumbnail names include a version derived from the picture's file name, so a
+new picture gets new URLs and the files can be cached forever. The version is
+written to Employee.thumbnail_version only once generation has finished;
+until then templates fall back to the original upload.
+"""
+import hashlib
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_DIR = 'thumbs'
+# Pixel sizes: the dashboard avatar is 150px, with a 2x variant for HiDPI screens
+SIZES = {'1x': 150, '2x': 300}
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def version_for(picture_name):
+    return hashlib.sha1(picture_name.encode()).hexdigest()[:12]
+
+
+def thumbnail_name(employee_id, version, size, fmt):
+    return f'{THUMBNAIL_DIR}/{employee_id}/{version}-{size}.{fmt}'
+
+
+def _pool():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS, thread_name_prefix='thumbnails'
+            )
+        return _executor
+
+
+def render(source):
+    """Thumbnail bytes for every size and format, keyed by (size, format)"""
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        image = image.convert('RGB')
+    rendered = {}
+    for size, pixels in SIZES.items():
+        thumb = ImageOps.fit(image, (pixels, pixels), Image.Resampling.LANCZOS)
+        for fmt, (pil_format, options) in FORMATS.items():
+            out = io.BytesIO()
+            # No exif= argument, so none of the original metadata is written
+            thumb.save(out, pil_format, **options)
+            rendered[(size, fmt)] = out.getvalue()
+    return rendered
+
+
+def generate(employee_id, picture_name):
+    """Build and store the thumbnails for one picture, then mark them ready"""
+    from .models import Employee
+
+    current = Employee.objects.filter(pk=employee_id, profile_picture=picture_name)
+    if not current.exists():
+        # Replaced or removed before this job ran
+        return False
+    version = version_for(picture_name)
+    try:
+        with default_storage.open(picture_name) as source:
+            rendered = render(source)
+    except (OSError, UnidentifiedImageError, Image.DecompressionBombError):
+        logger.exception("thumbnail generation failed employee=%s picture=%s", employee_id, picture_name)
+        return False
+
+    for (size, fmt), data in rendered.items():
+        name = thumbnail_name(employee_id, version, size, fmt)
+        if default_storage.exists(name):
+            default_storage.delete(name)
+        default_storage.save(name, ContentFile(data))
+
+    # Only if the picture hasn't been replaced while we were working
+    updated = current.update(thumbnail_version=version)
+    if updated:
+        remove_stale(employee_id, keep=version)
+    return bool(updated)
+
+
+def remove_stale(employee_id, keep=None):
+    """Delete an employee's thumbnails other than the given version"""
+    directory = f'{THUMBNAIL_DIR}/{employee_id}'
+    try:
+        _, files = default_storage.listdir(directory)
+    except FileNotFoundError:
+        return
+    for name in files:
+        if keep is None or not name.startswith(f'{keep}-'):
+            default_storage.delete(os.path.join(directory, name))
+
+
+def _generate_in_background(employee_id, picture_name):
+    try:
+        generate(employee_id, picture_name)
+    except Exception:
+        logger.exception("thumbnail job failed employee=%s picture=%s", employee_id, picture_name)
+    finally:
+        # Worker threads outlive requests, so nothing else closes their connection
+        close_old_connections()
+
+
+def schedule(employee):
+    """Generate thumbnails for the employee's current picture once the transaction commits"""
+    employee_id, picture_name = employee.pk, employee.profile_picture.name
+    transaction.on_commit(lambda: _pool().submit(_generate_in_background, employee_id, picture_name))
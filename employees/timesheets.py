@@ -0,0 +1,107 @@
+"""
+Monthly timesheets: regular hours, overtime, late minutes, half days.
+
+monthly_timesheets() computes every employee's totals in one GROUP BY query
+using the stored worked_minutes column. Late minutes are measured from each
+employee's own shift start. naive_timesheets() is the row-by-row reference
+implementation, kept for correctness checks and benchmarking.
+"""
+from django.conf import settings
+from django.db.models import Case, Count, IntegerField, Q, Sum, Value, When
+from django.db.models.functions import Least
+
+from .models import Attendance, Employee, Shift
+
+ATTENDED = ['PRESENT', 'LATE', 'HALF_DAY']
+
+
+def _row(employee, days_worked=0, half_days=0, absent_days=0, worked=0, regular=0, late=0):
+    worked = worked or 0
+    regular = regular or 0
+    return {
+        'employee': employee,
+        'days_worked': days_worked,
+        'half_days': half_days,
+        'absent_days': absent_days,
+        'regular_hours': round(regular / 60, 2),
+        'overtime_hours': round((worked - regular) / 60, 2),
+        'late_minutes': late or 0,
+    }
+
+
+def timesheet_employees(department_id=None):
+    """The employees timesheets cover, in report order"""
+    employees = Employee.objects.select_related('user', 'department', 'shift').order_by('employee_id')
+    if department_id:
+        employees = employees.filter(department_id=department_id)
+    return employees
+
+
+def monthly_timesheets(start, end, department_id=None, employees=None):
+    """
+    Timesheet rows for every employee (or one department) between start and
+    end, or only for the given employees, e.g. one page of them.
+    """
+    standard = settings.ATTENDANCE_STANDARD_DAY_MINUTES
+    # One branch per shift; the extraction only runs for rows that are actually late
+    late_by = [
+        When(assigned & shift.late_q(), then=shift.minutes_late_expression())
+        for shift, assigned in Shift.objects.assignments()
+    ]
+
+    records = Attendance.objects.in_range(start, end).order_by()
+    if employees is not None:
+        employees = list(employees)
+        records = records.filter(employee_id__in=[employee.pk for employee in employees])
+    elif department_id:
+        records = records.filter(employee__department_id=department_id)
+    totals = {
+        row['employee_id']: row
+        for row in records.values('employee_id').annotate(
+            days_worked=Count('id', filter=Q(status__in=ATTENDED)),
+            half_days=Count('id', filter=Q(status='HALF_DAY')),
+            absent_days=Count('id', filter=Q(status='ABSENT')),
+            worked=Sum('worked_minutes'),
+            regular=Sum(Least('worked_minutes', Value(standard)), filter=Q(worked_minutes__isnull=False)),
+            late=Sum(Case(*late_by, default=0, output_field=IntegerField())),
+        )
+    }
+
+    rows = []
+    for employee in timesheet_employees(department_id) if employees is None else employees:
+        total = totals.get(employee.pk, {})
+        rows.append(_row(
+            employee,
+            days_worked=total.get('days_worked', 0),
+            half_days=total.get('half_days', 0),
+            absent_days=total.get('absent_days', 0),
+            worked=total.get('worked'),
+            regular=total.get('regular'),
+            late=total.get('late'),
+        ))
+    return rows
+
+
+def naive_timesheets(start, end, department_id=None):
+    """Reference implementation walking every Attendance object in Python"""
+    standard = settings.ATTENDANCE_STANDARD_DAY_MINUTES
+
+    rows = []
+    for employee in timesheet_employees(department_id):
+        shift = Shift.objects.for_employee(employee)
+        days_worked = half_days = absent_days = worked = regular = late = 0
+        for record in Attendance.objects.filter(employee=employee).in_range(start, end):
+            if record.status in ATTENDED:
+                days_worked += 1
+            if record.status == 'HALF_DAY':
+                half_days += 1
+            if record.status == 'ABSENT':
+                absent_days += 1
+            minutes = Attendance.minutes_between(record.check_in, record.check_out)
+            if minutes:
+                worked += minutes
+                regular += min(minutes, standard)
+            if record.check_in and shift.minutes_late(record.check_in) > 0:
+                late += shift.minutes_late(record.check_in)
+        rows.append(_row(employee, days_worked, half_days, absent_days, worked, regular, late))
+    return rows
@@ -1,12 +1,48 @@
+import hmac
+import json
+import logging
+import os
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.contrib.admin.views.decorators import staff_member_required
 from django.shortcuts import render, redirect
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from django.views.static import serve
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.contrib.auth.models import User
 from django.utils import timezone
-from datetime import datetime
-from .models import Employee, Department, Attendance
+from django.utils.dateparse import parse_date
+from django.core.paginator import Paginator
+from datetime import datetime, timedelta
+from .models import Employee, Department, Attendance, AttendanceSummary
 from .forms import UserUpdateForm, EmployeeUpdateForm  
+from . import dashboard_cache, instrumentation
+from .archive import archive_querysets
+from .pagination import paginate_keyset
+from .checkins import apply_events
+from .middleware import aget_employee
+from .exports import export_records, month_range, stream_csv
+from .reports import daily_stats, employee_heatmap
+from .thumbnails import THUMBNAIL_DIR
+from .timesheets import monthly_timesheets, timesheet_employees
+
+logger = logging.getLogger(__name__)
+
+HISTORY_PAGE_SIZE = 20
+REPORT_EMPLOYEES_PER_PAGE = 50
+
+def _date_param(request, name):
+    """Read a YYYY-MM-DD query parameter, ignoring missing or invalid values"""
+    try:
+        return parse_date(request.GET.get(name, ''))
+    except ValueError:
+        return None
 
 def register(request):
     if request.method == 'POST':
@@ -17,8 +53,6 @@ def register(request):
         password1 = request.POST.get('password1', '')
         password2 = request.POST.get('password2', '')
         
-        print(f"Registration attempt - Name: {full_name}, Email: {email}, Employee ID: {employee_id}")  # Debug
-        
         # Validation
         if not all([full_name, email, employee_id, department_id, password1, password2]):
             messages.error(request, "All fields are required.")
@@ -64,8 +98,6 @@ def register(request):
                 last_name=last_name
             )
             
-            print(f"User created: {user.username}")  # Debug
-            
             # Create employee profile
             employee = Employee.objects.create(
                 user=user,
@@ -73,7 +105,7 @@ def register(request):
                 department=department
             )
             
-            print(f"Employee profile created: {employee.employee_id}")  # Debug
+            logger.info("registered user=%s employee_id=%s", user.username, employee.employee_id)
             
             # Auto login
             user = authenticate(username=email, password=password1)
@@ -86,7 +118,7 @@ def register(request):
                 return redirect('login')
                 
         except Exception as e:
-            print(f"Registration error: {str(e)}")  # Debug
+            logger.exception("registration failed email=%s employee_id=%s", email, employee_id)
             messages.error(request, f"Registration failed: {str(e)}")
             return redirect('register')
     
@@ -113,21 +145,14 @@ def register(request):
     
 def custom_login(request):
     """Custom login view to handle authentication"""
-    # Debug information
-    print(f"User authenticated: {request.user.is_authenticated}")
-    print(f"User: {request.user}")
-    
     # If user is already authenticated, redirect to dashboard
     if request.user.is_authenticated:
-        print("User already authenticated, redirecting to dashboard")
         return redirect('dashboard')
     
     if request.method == 'POST':
         username = request.POST.get('username', '').strip().lower()
         password = request.POST.get('password')
         
-        print(f"Login attempt for: {username}")
-        
         # Basic validation
         if not username or not password:
             messages.error(request, "Please enter both email and password.")
@@ -137,135 +162,158 @@ def custom_login(request):
         user = authenticate(request, username=username, password=password)
         
         if user is not None:
-            print(f"Authentication successful for: {user.username}")
-            
-            # Check if employee profile exists, if not create one
-            try:
-                employee = user.employee
-                print(f"Employee profile found: {employee.employee_id}")
-            except Employee.DoesNotExist:
-                print("Employee profile not found, creating...")
-                # Create default department if none exists
-                default_dept = Department.objects.first()
-                if not default_dept:
-                    default_dept = Department.objects.create(
-                        name='General', 
-                        description='General Department'
-                    )
-                
-                # Create employee profile
-                employee = Employee.objects.create(
-                    user=user,
-                    employee_id=f"EMP{user.id:03d}",
-                    department=default_dept
-                )
-                print(f"Created employee profile: {employee.employee_id}")
+            # Make sure the employee profile exists
+            Employee.objects.provision(user)
             
             # Login the user
             login(request, user)
             messages.success(request, f"Welcome back, {user.get_full_name()}!")
-            print(f"User logged in successfully, redirecting to dashboard")
+            logger.info("login succeeded user=%s", user.username)
             return redirect('dashboard')
         else:
-            print("Authentication failed")
+            logger.warning("login failed username=%s", username)
             messages.error(request, "Invalid email or password.")
             return render(request, 'login.html')
     
     # GET request - show login form
-    print("Showing login form")
     return render(request, 'login.html')
 
 def custom_logout(request):
     """Custom logout view"""
-    print(f"Logging out user: {request.user}")
+    logger.info("logout user=%s", request.user)
     logout(request)
     messages.success(request, "You have been logged out successfully.")
     return redirect('login')
 
 
+def _dashboard_stats(employee):
+    summary = AttendanceSummary.lifetime_for(employee)
+    return {'present_days': summary.present_days, 'absent_days': summary.absent_days}
+
+def _dashboard_context(employee, stats, recent_attendance, today):
+    # Today's record, if any, is the most recent one
+    today_attendance = None
+    if recent_attendance and recent_attendance[0].date == today:
+        today_attendance = recent_attendance[0]
+    
+    return {
+        'employee': employee,
+        'present_days': stats['present_days'],
+        'absent_days': stats['absent_days'],
+        'today_attendance': today_attendance,
+        'recent_attendance': recent_attendance,
+        'current_date': today,
+    }
+
 @login_required
 def dashboard(request):
-    try:
-        employee = request.user.employee
-    except Employee.DoesNotExist:
-        # Create employee profile if it doesn't exist
-        default_dept = Department.objects.first()
-        if not default_dept:
-            default_dept = Department.objects.create(
-                name='General', 
-                description='General Department'
-            )
-        
-        employee = Employee.objects.create(
-            user=request.user,
-            employee_id=f"EMP{request.user.id:03d}",
-            department=default_dept
-        )
+    employee = request.employee
     
     # Get today's date
     today = timezone.now().date()
     
-    # Get today's attendance record
-    today_attendance = Attendance.objects.filter(
-        employee=employee, 
-        date=today
-    ).first()
+    # Stats and recent records are cached per employee and invalidated on change
+    stats = dashboard_cache.get_fragment('stats', employee.pk, lambda: _dashboard_stats(employee))
+    recent_attendance = dashboard_cache.get_fragment(
+        'recent', employee.pk,
+        lambda: list(Attendance.objects.filter(employee=employee).order_by('-date', '-check_in')[:5]),
+    )
     
-    # Calculate attendance statistics
-    all_attendance = Attendance.objects.filter(employee=employee)
-    present_days = all_attendance.filter(status='PRESENT').count()
-    absent_days = all_attendance.filter(status='ABSENT').count()
+    context = _dashboard_context(employee, stats, recent_attendance, today)
+    return render(request, 'dashboard.html', context)
+
+@login_required
+async def adashboard(request):
+    """Async dashboard, routed in place of dashboard when served over ASGI"""
+    employee = await aget_employee(request)
+    today = timezone.now().date()
     
-    # Get recent attendance (last 5 records)
-    recent_attendance = all_attendance.order_by('-date', '-check_in')[:5]
+    async def build_stats():
+        summary = await AttendanceSummary.alifetime_for(employee)
+        return {'present_days': summary.present_days, 'absent_days': summary.absent_days}
     
-    context = {
-        'employee': employee,
-        'present_days': present_days,
-        'absent_days': absent_days,
-        'today_attendance': today_attendance,
-        'recent_attendance': recent_attendance,
-        'current_date': today,
-    }
+    async def build_recent():
+        return [record async for record in Attendance.objects.filter(employee=employee).order_by('-date', '-check_in')[:5]]
+    
+    stats = await dashboard_cache.aget_fragment('stats', employee.pk, build_stats)
+    recent_attendance = await dashboard_cache.aget_fragment('recent', employee.pk, build_recent)
+    
+    context = _dashboard_context(employee, stats, recent_attendance, today)
     return render(request, 'dashboard.html', context)
 
+def _attendance_message(request, check_time, checked_in, checked_out, missing_check_in):
+    """Flash the outcome of a check-in/check-out POST"""
+    at = check_time.strftime('%H:%M %p')
+    if checked_in == 'PRESENT':
+        messages.success(request, f"Checked in successfully at {at}")
+    elif checked_in:
+        messages.warning(request, f"Checked in at {at} - marked as {dict(Attendance.ATTENDANCE_STATUS)[checked_in]}")
+    elif checked_out:
+        messages.success(request, f"Checked out successfully at {at}")
+    elif missing_check_in:
+        messages.error(request, "Please check in first before checking out")
+    else:
+        messages.info(request, "Attendance already marked for this action")
+
 @login_required
 def mark_attendance(request):
-    employee = request.user.employee
-    today = timezone.now().date()
+    employee = request.employee
     now = timezone.now()
+    today = now.date()
     
-    # Get today's attendance record
-    try:
-        attendance = Attendance.objects.get(employee=employee, date=today)
-    except Attendance.DoesNotExist:
-        attendance = Attendance.objects.create(
-            employee=employee,
-            date=today,
-            status='PRESENT'
-        )
+    if request.method == 'POST':
+        action = request.POST.get('action')
+        check_time = now.time()
+        
+        checked_in = action == 'check_in' and Attendance.objects.check_in(employee, today, check_time)
+        checked_out = action == 'check_out' and Attendance.objects.check_out(employee, today, check_time)
+        missing_check_in = action == 'check_out' and not checked_out and not Attendance.objects.filter(
+            employee=employee, date=today, check_in__isnull=False
+        ).exists()
+        _attendance_message(request, check_time, checked_in, checked_out, missing_check_in)
+        
+        return redirect('mark_attendance')
+    
+    # Get today's attendance record (nothing is written just for viewing the page)
+    attendance = Attendance.objects.filter(employee=employee, date=today).first()
+    
+    context = {
+        'attendance': attendance,
+        'today': today,
+        'now': now,
+    }
+    return render(request, 'mark_attendance.html', context)
+
+@login_required
+async def amark_attendance(request):
+    """
+    Async mark_attendance, routed in its place when served over ASGI. Reads
+    use the async ORM; the check-in/check-out writes need a transaction and
+    the summary signals, so they run in a worker thread.
+    """
+    employee = await aget_employee(request)
+    now = timezone.now()
+    today = now.date()
     
     if request.method == 'POST':
         action = request.POST.get('action')
+        check_time = now.time()
         
-        if action == 'check_in' and not attendance.check_in:
-            attendance.check_in = now.time()
-            attendance.status = 'PRESENT'
-            attendance.save()
-            messages.success(request, f"Checked in successfully at {attendance.check_in.strftime('%H:%M %p')}")
-            
-        elif action == 'check_out' and attendance.check_in and not attendance.check_out:
-            attendance.check_out = now.time()
-            attendance.save()
-            messages.success(request, f"Checked out successfully at {attendance.check_out.strftime('%H:%M %p')}")
-            
-        elif action == 'check_out' and not attendance.check_in:
-            messages.error(request, "Please check in first before checking out")
-        else:
-            messages.info(request, "Attendance already marked for this action")
+        checked_in = action == 'check_in' and await sync_to_async(Attendance.objects.check_in)(
+            employee, today, check_time
+        )
+        checked_out = action == 'check_out' and await sync_to_async(Attendance.objects.check_out)(
+            employee, today, check_time
+        )
+        missing_check_in = action == 'check_out' and not checked_out and not await Attendance.objects.filter(
+            employee=employee, date=today, check_in__isnull=False
+        ).aexists()
+        _attendance_message(request, check_time, checked_in, checked_out, missing_check_in)
         
         return redirect('mark_attendance')
     
+    attendance = await Attendance.objects.filter(employee=employee, date=today).afirst()
+    
     context = {
         'attendance': attendance,
         'today': today,
@@ -275,43 +323,58 @@ def mark_attendance(request):
 
 @login_required
 def attendance_history(request):
-    employee = request.user.employee
-    attendance_list = Attendance.objects.filter(employee=employee).order_by('-date')
+    employee = request.employee
+    
+    # Optional date range filter
+    start_date = _date_param(request, 'start')
+    end_date = _date_param(request, 'end')
+    attendance_list = Attendance.objects.filter(employee=employee).in_range(start_date, end_date)
+    # Archived years the range reaches, newest first
+    archived = [
+        (last_date, queryset.filter(employee_id=employee.pk))
+        for last_date, queryset in archive_querysets(start_date, end_date)
+    ]
+    
+    # Summary statistics: the stored lifetime counters (which include archived
+    # days) unless a range is set
+    if start_date or end_date:
+        counts = attendance_list.status_counts()
+        for _, queryset in archived:
+            for status, n in queryset.status_counts().items():
+                counts[status] += n
+    else:
+        summary = AttendanceSummary.lifetime_for(employee)
+        counts = {
+            'TOTAL': summary.total_days,
+            'PRESENT': summary.present_days,
+            'ABSENT': summary.absent_days,
+            'LATE': summary.late_days,
+        }
     
-    # Calculate summary statistics
-    total_days = attendance_list.count()
-    present_days = attendance_list.filter(status='PRESENT').count()
-    absent_days = attendance_list.filter(status='ABSENT').count()
-    late_days = attendance_list.filter(status='LATE').count()
+    # Keyset pagination on (date, id)
+    page_obj = paginate_keyset(
+        attendance_list,
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        per_page=HISTORY_PAGE_SIZE,
+        older=archived,
+    )
     
     context = {
-        'attendance_list': attendance_list,
-        'total_days': total_days,
-        'present_days': present_days,
-        'absent_days': absent_days,
-        'late_days': late_days,
+        'attendance_list': page_obj.object_list,
+        'page_obj': page_obj,
+        'start_date': start_date,
+        'end_date': end_date,
+        'total_days': counts['TOTAL'],
+        'present_days': counts['PRESENT'],
+        'absent_days': counts['ABSENT'],
+        'late_days': counts['LATE'],
     }
     return render(request, 'attendance_history.html', context)
 
 @login_required
 def profile(request):
-    try:
-        employee = request.user.employee
-    except Employee.DoesNotExist:
-        # Create employee profile if it doesn't exist
-        default_dept = Department.objects.first()
-        if not default_dept:
-            default_dept = Department.objects.create(
-                name='General', 
-                description='General Department'
-            )
-        
-        employee = Employee.objects.create(
-            user=request.user,
-            employee_id=f"EMP{request.user.id:03d}",
-            department=default_dept
-        )
-        messages.info(request, "Employee profile created successfully!")
+    employee = request.employee
     
     if request.method == 'POST':
         # Handle form submission
@@ -342,4 +405,145 @@ def profile(request):
         'employee': employee
     }
     
-    return render(request, 'profile.html', context)
\ No newline at end of file
+    return render(request, 'profile.html', context)
+
+@csrf_exempt
+@require_POST
+def attendance_events_api(request):
+    """JSON endpoint for badge gateways to submit buffered check-in/check-out scans"""
+    token = settings.ATTENDANCE_API_TOKEN
+    auth = request.headers.get('Authorization', '')
+    # Bytes, since compare_digest() rejects non-ASCII str
+    if not token or not hmac.compare_digest(auth.encode(), f"Bearer {token}".encode()):
+        return JsonResponse({'error': 'Invalid or missing API token'}, status=401)
+    
+    try:
+        events = json.loads(request.body)['events']
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': "Body must be a JSON object with an 'events' list"}, status=400)
+    if not isinstance(events, list):
+        return JsonResponse({'error': "'events' must be a list"}, status=400)
+    if len(events) > settings.ATTENDANCE_API_MAX_EVENTS:
+        return JsonResponse(
+            {'error': f"At most {settings.ATTENDANCE_API_MAX_EVENTS} events per request"}, status=413
+        )
+    
+    try:
+        results = apply_events(events)
+    except IntegrityError:
+        # A concurrent check-in created one of the rows; nothing was written, so retry
+        return JsonResponse({'error': 'Conflicting concurrent update, please retry'}, status=409)
+    
+    applied = sum(1 for result in results if result['ok'])
+    return JsonResponse({'applied': applied, 'failed': len(results) - applied, 'results': results})
+
+@staff_member_required
+def export_attendance(request):
+    """Stream attendance as CSV for payroll (?month=YYYY-MM or ?start=&end=, optional ?department=)"""
+    if request.GET.get('month'):
+        try:
+            start_date, end_date = month_range(request.GET['month'])
+        except ValueError:
+            return HttpResponseBadRequest("month must be YYYY-MM")
+        filename = f"attendance-{request.GET['month']}.csv"
+    else:
+        start_date = _date_param(request, 'start')
+        end_date = _date_param(request, 'end')
+        filename = 'attendance.csv'
+    
+    department_id = request.GET.get('department')
+    records = export_records(start_date, end_date, department_id if department_id and department_id.isdigit() else None)
+    
+    response = StreamingHttpResponse(stream_csv(records), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+@staff_member_required
+def cache_stats(request):
+    """Dashboard fragment cache hit/miss counters for this worker process"""
+    return JsonResponse(dashboard_cache.stats())
+
+def thumbnail(request, path):
+    """
+    Serve a profile picture thumbnail in development (routed only when
+    DEBUG). Thumbnail names change whenever the picture does, so browsers
+    and proxies may keep them for a year.
+    """
+    response = serve(request, path, document_root=os.path.join(settings.MEDIA_ROOT, THUMBNAIL_DIR))
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+def metrics(request):
+    """Per-view request metrics for this worker process, in Prometheus text format"""
+    token = settings.METRICS_TOKEN
+    auth = request.headers.get('Authorization', '')
+    allowed = (
+        request.user.is_staff
+        or (token and hmac.compare_digest(auth.encode(), f"Bearer {token}".encode()))
+        or request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
+    )
+    if not allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(instrumentation.prometheus_text(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@staff_member_required
+def department_report(request):
+    """Daily attendance rates and a per-employee weekly heatmap for one department"""
+    departments = Department.objects.order_by('name')
+    department = None
+    if request.GET.get('department', '').isdigit():
+        department = departments.filter(pk=request.GET['department']).first()
+    if department is None:
+        department = departments.first()
+    
+    end_date = _date_param(request, 'end') or timezone.now().date()
+    start_date = _date_param(request, 'start') or end_date - timedelta(days=29)
+    if start_date > end_date:
+        start_date, end_date = end_date, start_date
+    
+    context = {
+        'departments': departments,
+        'department': department,
+        'start_date': start_date,
+        'end_date': end_date,
+    }
+    if department:
+        headcount, days = daily_stats(department, start_date, end_date)
+        employees = (
+            Employee.objects.filter(department=department)
+            .select_related('user')
+            .order_by('employee_id')
+        )
+        page_obj = Paginator(employees, REPORT_EMPLOYEES_PER_PAGE).get_page(request.GET.get('page'))
+        weeks, heatmap = employee_heatmap(list(page_obj), start_date, end_date)
+        context.update({
+            'headcount': headcount,
+            'days': days,
+            'weeks': weeks,
+            'heatmap': heatmap,
+            'page_obj': page_obj,
+        })
+    return render(request, 'department_report.html', context)
+
+@staff_member_required
+def timesheets(request):
+    """Monthly timesheet totals, a page of employees at a time (?month=YYYY-MM, optional ?department=, ?page=)"""
+    month = request.GET.get('month') or timezone.now().strftime('%Y-%m')
+    try:
+        start_date, end_date = month_range(month)
+    except ValueError:
+        return HttpResponseBadRequest("month must be YYYY-MM")
+    
+    department_id = request.GET.get('department', '')
+    department_id = int(department_id) if department_id.isdigit() else None
+    
+    employees = timesheet_employees(department_id)
+    page_obj = Paginator(employees, REPORT_EMPLOYEES_PER_PAGE).get_page(request.GET.get('page'))
+    context = {
+        'month': month,
+        'departments': Department.objects.order_by('name'),
+        'department_id': department_id,
+        'rows': monthly_timesheets(start_date, end_date, employees=page_obj),
+        'page_obj': page_obj,
+    }
+    return render(request, 'timesheets.html', context)
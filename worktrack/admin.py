@@ -1,3 +1,53 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import Project, Task, WorkEvent, WorkTotal
+
+class TaskInline(admin.TabularInline):
+    model = Task
+    extra = 0
+
+@admin.register(Project)
+class ProjectAdmin(admin.ModelAdmin):
+    list_display = ('code', 'name', 'is_active')
+    list_filter = ('is_active',)
+    search_fields = ('code', 'name')
+    inlines = (TaskInline,)
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('name', 'project', 'is_active')
+    list_filter = ('is_active', 'project')
+    list_select_related = ('project',)
+    search_fields = ('name', 'project__code')
+
+class ReadOnlyAdmin(admin.ModelAdmin):
+    """Derived or append-only data: viewable, never edited here"""
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+@admin.register(WorkEvent)
+class WorkEventAdmin(ReadOnlyAdmin):
+    list_display = ('occurred_at', 'employee', 'kind', 'task', 'recorded_at')
+    list_filter = ('kind',)
+    list_select_related = ('employee__user', 'task__project')
+    search_fields = ('employee__employee_id',)
+    # Very large: no full COUNT(*) next to the filtered one
+    show_full_result_count = False
+
+@admin.register(WorkTotal)
+class WorkTotalAdmin(ReadOnlyAdmin):
+    list_display = ('day', 'employee', 'project', 'hours')
+    list_filter = ('project',)
+    list_select_related = ('employee__user', 'project')
+    search_fields = ('employee__employee_id', 'project__code')
+
+    @admin.display(description='Hours', ordering='seconds')
+    def hours(self, obj):
+        return round(obj.seconds / 3600, 2)
@@ -0,0 +1,90 @@
+"""
+Recording timer events sent by employees' clients.
+
+Clients buffer their timer actions and heartbeat ticks and send them in
+batches. A batch is validated with one query for the tasks it names and
+written with a single bulk INSERT. Timers and totals are brought up to date
+later by worktrack.rollup. Events carrying an id the employee already sent
+are skipped, so a batch can be resent safely after a timeout.
+"""
+import uuid
+from datetime import timedelta, timezone as dt_timezone
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Task, WorkEvent
+
+KINDS = {kind.lower(): kind for kind, _ in WorkEvent.KINDS}
+# Clients' clocks may run a little fast; anything further ahead is rejected
+MAX_CLOCK_SKEW = timedelta(minutes=5)
+
+
+def _parse_event(raw, now):
+    """Validate one raw event, returning (kind, task_id, moment, client_ref) or an error string"""
+    if not isinstance(raw, dict):
+        return "Event must be an object"
+    kind = KINDS.get(raw.get('action'))
+    if kind is None:
+        return f"Action must be one of {', '.join(repr(name) for name in KINDS)}"
+    task_id = raw.get('task')
+    if kind == WorkEvent.START:
+        if not isinstance(task_id, int) or isinstance(task_id, bool):
+            return "Start needs a task id"
+    else:
+        task_id = None
+    try:
+        moment = parse_datetime(raw.get('timestamp') or '')
+    except (TypeError, ValueError):
+        moment = None
+    if moment is None:
+        return "Invalid timestamp"
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    if moment > now + MAX_CLOCK_SKEW:
+        return "Timestamp is in the future"
+    client_ref = raw.get('id')
+    if client_ref is not None:
+        try:
+            client_ref = uuid.UUID(str(client_ref))
+        except ValueError:
+            return "Invalid event id"
+    # Whole seconds, so totals add up exactly
+    return kind, task_id, moment.astimezone(dt_timezone.utc).replace(microsecond=0), client_ref
+
+
+def record_events(employee, raw_events):
+    """
+    Validate and insert a batch of one employee's timer events.
+
+    Returns one result dict per event, in the order they were given.
+    """
+    now = timezone.now()
+    results = []
+    parsed = []
+    for index, raw in enumerate(raw_events):
+        event = _parse_event(raw, now)
+        if isinstance(event, str):
+            results.append({'index': index, 'ok': False, 'result': 'invalid', 'detail': event})
+        else:
+            results.append({'index': index, 'ok': True, 'result': 'recorded'})
+            parsed.append((index, *event))
+
+    active_tasks = set(Task.objects.filter(
+        pk__in={task_id for _, _, task_id, _, _ in parsed if task_id},
+        is_active=True,
+        project__is_active=True,
+    ).values_list('id', flat=True))
+
+    events = []
+    for index, kind, task_id, moment, client_ref in parsed:
+        if task_id and task_id not in active_tasks:
+            results[index] = {'index': index, 'ok': False, 'result': 'unknown_task'}
+            continue
+        events.append(WorkEvent(
+            employee=employee, task_id=task_id, kind=kind, occurred_at=moment, recorded_at=now,
+            client_ref=client_ref,
+        ))
+    # Resent events hit the (employee, client_ref) constraint and are skipped
+    WorkEvent.objects.bulk_create(events, batch_size=1000, ignore_conflicts=True)
+    return results
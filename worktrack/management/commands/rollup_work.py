@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from worktrack.rollup import rollup
+
+
+class Command(BaseCommand):
+    help = "Fold new work timer events into the per-day, per-project work totals"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help="Events per transaction (default WORKTRACK_ROLLUP_BATCH)")
+        parser.add_argument(
+            '--every', type=float, metavar='SECONDS',
+            help="Keep running, rolling up again every SECONDS",
+        )
+
+    def handle(self, *args, batch_size=None, every=None, **options):
+        if (batch_size is not None and batch_size < 1) or (every is not None and every <= 0):
+            raise CommandError("--batch-size and --every must be positive")
+        while True:
+            started = time.monotonic()
+            count = rollup(batch_size)
+            elapsed = time.monotonic() - started
+            self.stdout.write(self.style.SUCCESS(f"Rolled up {count} work events ({elapsed:.1f}s)"))
+            if every is None:
+                return
+            time.sleep(max(0, every - elapsed))
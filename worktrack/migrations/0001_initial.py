@@ -0,0 +1,88 @@
+# Generated by Django 5.2.7 on 2026-10-18 03:00
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('employees', '0008_employee_thumbnail_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Project',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('code', models.CharField(max_length=20, unique=True)),
+                ('is_active', models.BooleanField(default=True)),
+            ],
+            options={
+                'ordering': ['code'],
+            },
+        ),
+        migrations.CreateModel(
+            name='RollupCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_event_id', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Task',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('is_active', models.BooleanField(default=True)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tasks', to='worktrack.project')),
+            ],
+            options={
+                'ordering': ['project', 'name'],
+                'unique_together': {('project', 'name')},
+            },
+        ),
+        migrations.CreateModel(
+            name='WorkTimer',
+            fields=[
+                ('employee', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='work_timer', serialize=False, to='employees.employee')),
+                ('running', models.BooleanField(default=False)),
+                ('credited_until', models.DateTimeField(blank=True, null=True)),
+                ('task', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='worktrack.task')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='WorkEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('START', 'Start'), ('PAUSE', 'Pause'), ('RESUME', 'Resume'), ('STOP', 'Stop'), ('TICK', 'Tick')], max_length=6)),
+                ('occurred_at', models.DateTimeField()),
+                ('recorded_at', models.DateTimeField(default=django.utils.timezone.now, editable=False)),
+                ('client_ref', models.UUIDField(blank=True, editable=False, null=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='work_events', to='employees.employee')),
+                ('task', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, to='worktrack.task')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['employee', 'occurred_at'], name='work_event_employee_time')],
+                'constraints': [models.UniqueConstraint(fields=('employee', 'client_ref'), name='work_event_client_ref')],
+            },
+        ),
+        migrations.CreateModel(
+            name='WorkTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('seconds', models.PositiveIntegerField(default=0)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='work_totals', to='employees.employee')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='work_totals', to='worktrack.project')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['project', 'day'], name='work_total_project_day'), models.Index(fields=['day'], name='work_total_day')],
+                'unique_together': {('employee', 'project', 'day')},
+            },
+        ),
+    ]
@@ -1,3 +1,138 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Sum
+from django.utils import timezone
 
-# Create your models here.
+from employees.models import Employee
+
+class Project(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+    code = models.CharField(max_length=20, unique=True)
+    is_active = models.BooleanField(default=True)
+    
+    class Meta:
+        ordering = ['code']
+    
+    def __str__(self):
+        return f"{self.code} - {self.name}"
+
+class Task(models.Model):
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='tasks')
+    name = models.CharField(max_length=200)
+    is_active = models.BooleanField(default=True)
+    
+    class Meta:
+        unique_together = ['project', 'name']
+        ordering = ['project', 'name']
+    
+    def __str__(self):
+        return f"{self.project.code}: {self.name}"
+
+class WorkEvent(models.Model):
+    """
+    One timer action from an employee's client. Rows are only ever inserted;
+    timers and totals are derived from them by worktrack.rollup.
+    """
+    START = 'START'
+    PAUSE = 'PAUSE'
+    RESUME = 'RESUME'
+    STOP = 'STOP'
+    TICK = 'TICK'  # heartbeat from a running timer
+    KINDS = [
+        (START, 'Start'),
+        (PAUSE, 'Pause'),
+        (RESUME, 'Resume'),
+        (STOP, 'Stop'),
+        (TICK, 'Tick'),
+    ]
+    
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='work_events')
+    task = models.ForeignKey(Task, on_delete=models.PROTECT, null=True, blank=True)  # set on START
+    kind = models.CharField(max_length=6, choices=KINDS)
+    occurred_at = models.DateTimeField()
+    recorded_at = models.DateTimeField(default=timezone.now, editable=False)
+    # Chosen by the client, so a resent batch isn't recorded twice
+    client_ref = models.UUIDField(null=True, blank=True, editable=False)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['employee', 'client_ref'], name='work_event_client_ref'),
+        ]
+        indexes = [
+            models.Index(fields=['employee', 'occurred_at'], name='work_event_employee_time'),
+        ]
+    
+    def __str__(self):
+        return f"{self.employee_id} {self.kind} {self.occurred_at:%Y-%m-%d %H:%M:%S}"
+    
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Work events are append-only")
+        super().save(*args, **kwargs)
+
+class WorkTimer(models.Model):
+    """Where each employee's timer stood after the last rolled-up event"""
+    employee = models.OneToOneField(Employee, on_delete=models.CASCADE, primary_key=True, related_name='work_timer')
+    task = models.ForeignKey(Task, on_delete=models.SET_NULL, null=True, blank=True)
+    running = models.BooleanField(default=False)
+    # Time up to which the timer's work has been credited to WorkTotal
+    credited_until = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return f"{self.employee_id} {'running' if self.running else 'stopped'}"
+
+class WorkTotalQuerySet(models.QuerySet):
+    def apply_deltas(self, deltas):
+        """Add seconds to many totals at once; deltas maps (employee_id, project_id, day) to seconds"""
+        deltas = {key: seconds for key, seconds in deltas.items() if seconds}
+        if not deltas:
+            return
+        
+        with transaction.atomic():
+            existing = {
+                (total.employee_id, total.project_id, total.day): total
+                for total in self.select_for_update().filter(
+                    employee_id__in={employee_id for employee_id, _, _ in deltas},
+                    project_id__in={project_id for _, project_id, _ in deltas},
+                    day__in={day for _, _, day in deltas},
+                )
+            }
+            to_create = []
+            for key, seconds in deltas.items():
+                total = existing.get(key)
+                if total is None:
+                    to_create.append(WorkTotal(employee_id=key[0], project_id=key[1], day=key[2], seconds=seconds))
+                else:
+                    total.seconds += seconds
+            self.bulk_create(to_create, batch_size=500)
+            self.bulk_update([existing[key] for key in deltas if key in existing], ['seconds'], batch_size=500)
+    
+    def by_day_and_project(self):
+        """(day, project code, seconds) rows summed over the employees in this queryset"""
+        return (
+            self.order_by('day', 'project__code')
+            .values_list('day', 'project__code')
+            .annotate(total=Sum('seconds'))
+        )
+
+class WorkTotal(models.Model):
+    """Seconds an employee worked on a project's tasks on one (local) day"""
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='work_totals')
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='work_totals')
+    day = models.DateField()
+    seconds = models.PositiveIntegerField(default=0)
+    
+    objects = WorkTotalQuerySet.as_manager()
+    
+    class Meta:
+        unique_together = ['employee', 'project', 'day']
+        indexes = [
+            models.Index(fields=['project', 'day'], name='work_total_project_day'),
+            models.Index(fields=['day'], name='work_total_day'),
+        ]
+    
+    def __str__(self):
+        return f"{self.employee_id} {self.project_id} {self.day}"
+
+class RollupCursor(models.Model):
+    """The last WorkEvent folded into timers and totals (a single row)"""
+    last_event_id = models.BigIntegerField(default=0)
@@ -0,0 +1,123 @@
+"""
+Incremental rollup of work events into per-day, per-project totals.
+
+Events are folded in insertion order from a stored cursor, a batch at a time.
+Each batch locks the cursor, replays its events against the employees' timers
+in time order, and writes the worked seconds as one set of WorkTotal changes.
+Timer ticks therefore cost an INSERT each (batched by the client) and a share
+of a periodic rollup, rather than an UPDATE each.
+
+Events recorded within the last WORKTRACK_ROLLUP_SETTLE_SECONDS are left for
+the next run, so a transaction that took an id but committed late isn't
+skipped. Events that occurred before a timer's credited_until (late
+arrivals) still change its state but add no time. A running timer that goes
+quiet for more than WORKTRACK_IDLE_TIMEOUT is credited only up to that
+timeout, so a client that crashes without stopping doesn't keep accruing.
+"""
+from collections import Counter
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import RollupCursor, Task, WorkEvent, WorkTimer, WorkTotal
+
+
+def split_by_day(start, end):
+    """Yield (day, seconds) for each local day the interval [start, end) covers"""
+    zone = timezone.get_current_timezone()
+    start, end = timezone.localtime(start, zone), timezone.localtime(end, zone)
+    while start < end:
+        midnight = timezone.make_aware(datetime.combine(start.date() + timedelta(days=1), time.min), zone)
+        stop = min(end, midnight)
+        yield start.date(), (stop - start).total_seconds()
+        start = stop
+
+
+def _apply(timer, kind, task_id, moment):
+    """
+    Advance one timer through an event. Returns the (task_id, start, end)
+    interval the timer ran for before it, or None.
+    """
+    if timer.credited_until is not None and moment < timer.credited_until:
+        moment = timer.credited_until
+    worked = None
+    if timer.running and timer.task_id and timer.credited_until is not None:
+        idle_limit = timer.credited_until + timedelta(seconds=settings.WORKTRACK_IDLE_TIMEOUT)
+        worked = (timer.task_id, timer.credited_until, min(moment, idle_limit))
+
+    if kind == WorkEvent.START:
+        timer.task_id, timer.running = task_id, True
+    elif kind == WorkEvent.PAUSE:
+        timer.running = False
+    elif kind == WorkEvent.RESUME:
+        timer.running = timer.task_id is not None
+    elif kind == WorkEvent.STOP:
+        timer.task_id, timer.running = None, False
+    timer.credited_until = moment
+    return worked
+
+
+def _rollup_batch(batch_size, settled_before):
+    with transaction.atomic():
+        cursor, _ = RollupCursor.objects.select_for_update().get_or_create(pk=1)
+        events = list(
+            WorkEvent.objects.filter(pk__gt=cursor.last_event_id)
+            .order_by('pk')
+            .values_list('pk', 'employee_id', 'task_id', 'kind', 'occurred_at', 'recorded_at')[:batch_size]
+        )
+        # Stop at the first unsettled event so the cursor never passes a gap
+        for position, event in enumerate(events):
+            if event[5] >= settled_before:
+                events = events[:position]
+                break
+        if not events:
+            return 0
+
+        employee_ids = {event[1] for event in events}
+        timers = {
+            timer.employee_id: timer
+            for timer in WorkTimer.objects.select_for_update().filter(employee_id__in=employee_ids)
+        }
+        new_timers = {
+            employee_id: WorkTimer(employee_id=employee_id)
+            for employee_id in employee_ids if employee_id not in timers
+        }
+        timers.update(new_timers)
+        task_ids = {event[2] for event in events if event[2]}
+        task_ids |= {timer.task_id for timer in timers.values() if timer.task_id}
+        projects = dict(Task.objects.filter(pk__in=task_ids).values_list('id', 'project_id'))
+
+        seconds = Counter()
+        # Each employee's events in time order; the id breaks ties within a second
+        in_order = sorted(events, key=lambda event: (event[1], event[4], event[0]))
+        for _, employee_id, task_id, kind, occurred_at, _ in in_order:
+            worked = _apply(timers[employee_id], kind, task_id, occurred_at)
+            if worked and worked[0] in projects:
+                worked_task_id, start, end = worked
+                for day, day_seconds in split_by_day(start, end):
+                    seconds[(employee_id, projects[worked_task_id], day)] += day_seconds
+
+        WorkTimer.objects.bulk_create(new_timers.values(), batch_size=500)
+        WorkTimer.objects.bulk_update(
+            [timer for employee_id, timer in timers.items() if employee_id not in new_timers],
+            ['task', 'running', 'credited_until'],
+            batch_size=500,
+        )
+        WorkTotal.objects.apply_deltas({key: round(total) for key, total in seconds.items()})
+        cursor.last_event_id = events[-1][0]
+        cursor.save(update_fields=['last_event_id'])
+    return len(events)
+
+
+def rollup(batch_size=None):
+    """Fold every settled, not yet rolled-up event into timers and totals; returns the event count"""
+    batch_size = batch_size or settings.WORKTRACK_ROLLUP_BATCH
+    settled_before = timezone.now() - timedelta(seconds=settings.WORKTRACK_ROLLUP_SETTLE_SECONDS)
+    processed = 0
+    while True:
+        count = _rollup_batch(batch_size, settled_before)
+        processed += count
+        if count < batch_size:
+            return processed
@@ -1,3 +1,151 @@
-from django.test import TestCase
+import json
+import uuid
+from datetime import date, datetime, timezone as dt_timezone
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from employees.models import Employee
+
+from .events import record_events
+from .models import Project, Task, WorkEvent, WorkTimer, WorkTotal
+from .rollup import rollup
+
+
+def at(day, hour, minute=0):
+    return datetime(2024, 3, day, hour, minute, tzinfo=dt_timezone.utc)
+
+
+@override_settings(WORKTRACK_ROLLUP_SETTLE_SECONDS=0, WORKTRACK_IDLE_TIMEOUT=15 * 60)
+class RollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.employee = Employee.objects.create(user=User.objects.create_user('worker'), employee_id='EMP600')
+        cls.api = Task.objects.create(project=Project.objects.create(name='API', code='API'), name='Endpoints')
+        cls.web = Task.objects.create(project=Project.objects.create(name='Website', code='WEB'), name='Pages')
+
+    def add(self, *events):
+        WorkEvent.objects.bulk_create([
+            WorkEvent(employee=self.employee, kind=kind, occurred_at=moment, task=task, recorded_at=moment)
+            for kind, moment, task in events
+        ])
+
+    def totals(self):
+        return {
+            (total.project.code, total.day): total.seconds
+            for total in WorkTotal.objects.select_related('project')
+        }
+
+    def test_start_pause_resume_stop(self):
+        self.add(
+            (WorkEvent.START, at(4, 9), self.api),
+            (WorkEvent.TICK, at(4, 9, 10), None),
+            (WorkEvent.PAUSE, at(4, 9, 20), None),
+            (WorkEvent.RESUME, at(4, 10), None),
+            (WorkEvent.TICK, at(4, 10, 15), None),
+            (WorkEvent.STOP, at(4, 10, 25), None),
+        )
+        self.assertEqual(rollup(), 6)
+        self.assertEqual(self.totals(), {('API', date(2024, 3, 4)): 45 * 60})
+        timer = WorkTimer.objects.get()
+        self.assertFalse(timer.running)
+        self.assertIsNone(timer.task_id)
+
+    def test_incremental_batches_match_one_pass(self):
+        self.add((WorkEvent.START, at(4, 9), self.api), (WorkEvent.TICK, at(4, 9, 10), None))
+        self.assertEqual(rollup(batch_size=1), 2)
+        self.add(
+            (WorkEvent.TICK, at(4, 9, 20), None),
+            (WorkEvent.START, at(4, 9, 30), self.web),
+            (WorkEvent.STOP, at(4, 9, 40), None),
+        )
+        self.assertEqual(rollup(), 3)
+        self.assertEqual(rollup(), 0)
+        self.assertEqual(self.totals(), {('API', date(2024, 3, 4)): 30 * 60, ('WEB', date(2024, 3, 4)): 10 * 60})
+
+    def test_split_at_midnight(self):
+        self.add((WorkEvent.START, at(4, 23, 50), self.api), (WorkEvent.STOP, at(5, 0, 5), None))
+        rollup()
+        self.assertEqual(self.totals(), {('API', date(2024, 3, 4)): 600, ('API', date(2024, 3, 5)): 300})
+
+    def test_silent_timer_stops_accruing(self):
+        self.add((WorkEvent.START, at(4, 9), self.api), (WorkEvent.TICK, at(4, 12), None))
+        rollup()
+        self.assertEqual(self.totals(), {('API', date(2024, 3, 4)): 15 * 60})
+
+    def test_late_event_adds_no_time(self):
+        self.add((WorkEvent.START, at(4, 9), self.api), (WorkEvent.TICK, at(4, 9, 10), None))
+        rollup()
+        self.add((WorkEvent.STOP, at(4, 9, 5), None))
+        rollup()
+        self.assertEqual(self.totals(), {('API', date(2024, 3, 4)): 600})
+        self.assertFalse(WorkTimer.objects.get().running)
+
+    @override_settings(WORKTRACK_ROLLUP_SETTLE_SECONDS=60)
+    def test_recent_events_wait_for_the_next_run(self):
+        record_events(self.employee, [{'action': 'start', 'task': self.api.pk, 'timestamp': at(4, 9).isoformat()}])
+        self.assertEqual(rollup(), 0)
+
+    def test_events_are_append_only(self):
+        self.add((WorkEvent.START, at(4, 9), self.api))
+        event = WorkEvent.objects.get()
+        with self.assertRaises(ValueError):
+            event.save()
+
+
+class RecordEventsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('timer', password='pw')
+        cls.employee = Employee.objects.create(user=cls.user, employee_id='EMP601')
+        cls.task = Task.objects.create(project=Project.objects.create(name='API', code='API'), name='Endpoints')
+
+    def test_batch_is_one_insert(self):
+        events = [{'action': 'start', 'task': self.task.pk, 'timestamp': at(4, 9).isoformat()}]
+        events += [{'action': 'tick', 'timestamp': at(4, 9, minute).isoformat()} for minute in range(1, 60)]
+        with CaptureQueriesContext(connection) as ctx:
+            results = record_events(self.employee, events)
+        self.assertTrue(all(result['ok'] for result in results))
+        self.assertEqual(WorkEvent.objects.count(), 60)
+        self.assertEqual(len([q for q in ctx.captured_queries if q['sql'].startswith('INSERT')]), 1)
+
+    def test_resent_events_are_skipped(self):
+        events = [
+            {'id': str(uuid.uuid4()), 'action': 'tick', 'timestamp': at(4, 9, minute).isoformat()}
+            for minute in range(3)
+        ]
+        record_events(self.employee, events)
+        record_events(self.employee, events)
+        self.assertEqual(WorkEvent.objects.count(), 3)
+
+    def test_invalid_events(self):
+        results = record_events(self.employee, [
+            {'action': 'start', 'timestamp': at(4, 9).isoformat()},
+            {'action': 'start', 'task': self.task.pk + 100, 'timestamp': at(4, 9).isoformat()},
+            {'action': 'jump', 'timestamp': at(4, 9).isoformat()},
+            {'action': 'stop', 'timestamp': 'soon'},
+            {'action': 'stop', 'timestamp': '2999-01-01T00:00:00Z'},
+            {'action': 'stop', 'timestamp': at(4, 10).isoformat()},
+        ])
+        self.assertEqual(
+            [result['result'] for result in results],
+            ['invalid', 'unknown_task', 'invalid', 'invalid', 'invalid', 'recorded'],
+        )
+        self.assertEqual(WorkEvent.objects.count(), 1)
+
+    @override_settings(WORKTRACK_ROLLUP_SETTLE_SECONDS=0)
+    def test_post_then_read_totals(self):
+        self.client.force_login(self.user)
+        response = self.client.post('/worktrack/events/', json.dumps({'events': [
+            {'action': 'start', 'task': self.task.pk, 'timestamp': at(4, 9).isoformat()},
+            {'action': 'stop', 'timestamp': at(4, 9, 10).isoformat()},
+        ]}), content_type='application/json')
+        self.assertEqual(response.json()['recorded'], 2)
+        rollup()
+
+        response = self.client.get('/worktrack/totals/?start=2024-03-01&end=2024-03-07')
+        self.assertEqual(response.json()['totals'], [{'day': '2024-03-04', 'project': 'API', 'seconds': 600}])
+        self.assertEqual(self.client.get('/worktrack/totals/?start=2024-03-07&end=2024-03-01').status_code, 400)
+        self.assertEqual(self.client.get('/reports/work/').status_code, 302)
@@ -1,3 +1,92 @@
-from django.shortcuts import render
+import json
+from datetime import timedelta
 
-# Create your views here.
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.contrib.auth.decorators import login_required
+from django.http import HttpResponseBadRequest, JsonResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.views.decorators.http import require_GET, require_POST
+
+from .events import record_events
+from .models import WorkTimer, WorkTotal
+
+TOTALS_DEFAULT_DAYS = 7
+TOTALS_MAX_DAYS = 366
+
+def _date_range(request):
+    """?start= and ?end= as dates (the last TOTALS_DEFAULT_DAYS by default), or None if invalid"""
+    today = timezone.localdate()
+    try:
+        end = parse_date(request.GET['end']) if request.GET.get('end') else today
+        start = parse_date(request.GET['start']) if request.GET.get('start') else end - timedelta(days=TOTALS_DEFAULT_DAYS - 1)
+    except ValueError:
+        return None
+    if start is None or end is None or start > end or (end - start).days >= TOTALS_MAX_DAYS:
+        return None
+    return start, end
+
+def _totals_json(rows):
+    return [{'day': day.isoformat(), 'project': project, 'seconds': seconds} for day, project, seconds in rows]
+
+@login_required
+@require_POST
+def work_events(request):
+    """Timer events buffered by the employee's browser, as {"events": [...]}"""
+    try:
+        events = json.loads(request.body)['events']
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': "Body must be a JSON object with an 'events' list"}, status=400)
+    if not isinstance(events, list):
+        return JsonResponse({'error': "'events' must be a list"}, status=400)
+    if len(events) > settings.WORKTRACK_MAX_EVENTS:
+        return JsonResponse({'error': f"At most {settings.WORKTRACK_MAX_EVENTS} events per request"}, status=413)
+
+    results = record_events(request.employee, events)
+    recorded = sum(1 for result in results if result['ok'])
+    return JsonResponse({'recorded': recorded, 'failed': len(results) - recorded, 'results': results})
+
+@login_required
+@require_GET
+def work_totals(request):
+    """The employee's worked seconds per day and project (?start=&end=, YYYY-MM-DD)"""
+    dates = _date_range(request)
+    if dates is None:
+        return HttpResponseBadRequest(f"start and end must be YYYY-MM-DD, at most {TOTALS_MAX_DAYS} days apart")
+
+    employee = request.employee
+    rows = WorkTotal.objects.filter(employee=employee, day__range=dates).by_day_and_project()
+    timer = WorkTimer.objects.filter(employee=employee).select_related('task__project').first()
+    return JsonResponse({
+        'start': dates[0].isoformat(),
+        'end': dates[1].isoformat(),
+        'totals': _totals_json(rows),
+        # As of the last rollup; time since credited_until isn't in the totals yet
+        'timer': timer and {
+            'running': timer.running,
+            'task': timer.task_id,
+            'project': timer.task.project.code if timer.task else None,
+            'credited_until': timer.credited_until and timer.credited_until.isoformat(),
+        },
+    })
+
+@staff_member_required
+@require_GET
+def project_totals(request):
+    """Worked seconds per day and project across all employees (?start=&end=, optional ?project=ID)"""
+    dates = _date_range(request)
+    if dates is None:
+        return HttpResponseBadRequest(f"start and end must be YYYY-MM-DD, at most {TOTALS_MAX_DAYS} days apart")
+
+    totals = WorkTotal.objects.filter(day__range=dates)
+    project_id = request.GET.get('project')
+    if project_id:
+        if not project_id.isdigit():
+            return HttpResponseBadRequest("project must be a project id")
+        totals = totals.filter(project_id=project_id)
+    return JsonResponse({
+        'start': dates[0].isoformat(),
+        'end': dates[1].isoformat(),
+        'totals': _totals_json(totals.by_day_and_project()),
+    })